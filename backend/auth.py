@@ -1,18 +1,128 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
+from uuid import UUID
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, event, inspect
+from sqlalchemy.orm import make_transient_to_detached
 from config import get_settings
 from database import get_db
-from models import User
+from models import User, Subscription
+from services.ttl_cache import TTLCache
 
 settings = get_settings()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Changing bcrypt_rounds makes existing hashes "need update"; they are
+# rehashed on the user's next successful login.
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+# Resolved users keyed by (user_id, token).  Entries are dropped when this
+# process writes the user or their subscription; other workers see the change
+# once the TTL runs out.
+principal_cache = TTLCache(
+    max_entries=settings.principal_cache_max_entries,
+    ttl_seconds=settings.principal_cache_ttl_seconds
+)
+claims_trusted = 0
+
+@dataclass(frozen=True)
+class Principal:
+    """The caller as described by their signed token, with no database lookup."""
+    id: UUID
+    subscription_tier: str
+    role: Optional[str] = None
+
+def invalidate_principal(user_id):
+    principal_cache.invalidate_where(lambda key: key[0] == user_id)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target):
+    invalidate_principal(target.id)
+
+@event.listens_for(Subscription, "after_insert")
+@event.listens_for(Subscription, "after_update")
+@event.listens_for(Subscription, "after_delete")
+def _subscription_changed(mapper, connection, target):
+    if target.user_id is not None:
+        invalidate_principal(target.user_id)
+
+def principal_cache_stats() -> dict:
+    return {**principal_cache.stats(), "claims_trusted": claims_trusted}
+
+class HashingPoolSaturated(Exception):
+    pass
+
+class PasswordHashingPool:
+    """A small thread pool for bcrypt, with a cap on queued work.
+
+    bcrypt releases the GIL while hashing, so a few threads keep the event
+    loop free.  Once ``workers + max_queue`` calls are in flight, new calls
+    are refused instead of queueing behind seconds of CPU work.
+    """
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_ms = 0.0
+
+    async def run(self, fn, *args):
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise HashingPoolSaturated()
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            started = time.perf_counter()
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+            self.total_ms += (time.perf_counter() - started) * 1000
+            self.completed += 1
+            return result
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": max(0, self.in_flight - self.workers),
+            "peak_in_flight": self.peak_in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_ms": round(self.total_ms / self.completed, 1) if self.completed else 0.0,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+hashing_pool = PasswordHashingPool(
+    workers=settings.password_hash_workers or min(4, os.cpu_count() or 1),
+    max_queue=settings.password_hash_max_queue
+)
+
+async def _hash_call(fn, *args):
+    try:
+        return await hashing_pool.run(fn, *args)
+    except HashingPoolSaturated:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many sign-in attempts in progress, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -20,32 +130,100 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+async def hash_password(password: str) -> str:
+    """Hash a password on the hashing pool; raises a 429 when it is saturated."""
+    return await _hash_call(pwd_context.hash, password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """Verify a password on the hashing pool.
+
+    Returns ``(valid, new_hash)``; ``new_hash`` is set when the stored hash
+    uses outdated cost parameters and should be replaced.
+    """
+    return await _hash_call(pwd_context.verify_and_update, plain_password, hashed_password)
+
+def token_claims(user: User) -> dict:
+    """Claims issued for a user; ``tier`` and ``role`` feed ``get_current_principal``."""
+    return {"sub": str(user.id), "tier": user.subscription_tier or "free", "role": user.role}
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.access_token_expire_minutes))
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, settings.jwt_secret, algorithm=settings.jwt_algorithm)
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: AsyncSession = Depends(get_db)
-) -> User:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _decode_token(token: str) -> tuple[UUID, dict]:
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+        return UUID(payload["sub"]), payload
+    except (JWTError, KeyError, TypeError, ValueError):
+        raise _credentials_exception()
+
+def _detached_copy(user: User) -> User:
+    """A session-free copy of ``user`` that is safe to share between requests."""
+    copy = User(**{attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs})
+    make_transient_to_detached(copy)
+    return copy
+
+async def _resolve_user(token: str, db: AsyncSession) -> User:
+    user_id, _ = _decode_token(token)
+    cache_key = (user_id, token)
+    cached = principal_cache.get(cache_key)
+    if cached is not None:
+        # Attach a copy to this session without a SELECT.
+        return await db.merge(cached, load=False)
     
     result = await db.execute(select(User).where(User.id == user_id))
     user = result.scalar_one_or_none()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    principal_cache.set(cache_key, _detached_copy(user))
     return user
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    return await _resolve_user(credentials.credentials, db)
+
+async def get_current_principal(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+):
+    """The caller for read-only endpoints.
+
+    GET requests with a token carrying a ``tier`` claim are answered from the
+    signed claims alone.  A tier change is then only seen once the user gets a
+    new token, so this must not guard writes or anything billed by tier.
+    Everything else goes through ``get_current_user``.
+    """
+    global claims_trusted
+    token = credentials.credentials
+    user_id, payload = _decode_token(token)
+    if request.method == "GET" and payload.get("tier"):
+        claims_trusted += 1
+        return Principal(id=user_id, subscription_tier=payload["tier"], role=payload.get("role"))
+    return await _resolve_user(token, db)
+
+async def get_stream_principal(
+    token: Optional[str] = Query(None),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+) -> Principal:
+    """The caller for event streams, from the signed token alone.
+
+    Browsers' EventSource cannot set headers, so the token may also be passed
+    as a ``token`` query parameter.
+    """
+    token = credentials.credentials if credentials else token
+    if not token:
+        raise _credentials_exception()
+    user_id, payload = _decode_token(token)
+    return Principal(id=user_id, subscription_tier=payload.get("tier") or "free", role=payload.get("role"))
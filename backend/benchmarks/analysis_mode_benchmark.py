@@ -0,0 +1,113 @@
+"""Single vs batched resume analysis benchmark.
+
+Analyzes the same resumes against one job both ways, calling Gemini
+directly (the analysis cache is not used), and reports:
+
+* throughput: wall time and resumes per second;
+* cost: Gemini requests and estimated input/output tokens;
+* agreement: how closely batched scores track single-resume scores.
+
+    GEMINI_API_KEY=... python -m benchmarks.analysis_mode_benchmark \\
+        --resumes path/to/resumes --job job.txt --skills Python FastAPI --limit 100
+
+Resumes may be any format the extractor supports.
+"""
+import argparse
+import asyncio
+import os
+import time
+import numpy as np
+from config import get_settings
+from services import ai
+from services.ai import analyze_resume, analyze_resumes_batched, estimate_tokens
+from services.extraction import extract_resume_text, shutdown_extraction_pool
+
+class Meter:
+    """Counts Gemini requests and estimated tokens by wrapping the client."""
+    def __init__(self):
+        self.requests = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self._generate = ai.llm_client.generate
+
+    async def generate(self, prompt, tenant_id=None, timeout=None):
+        self.requests += 1
+        self.input_tokens += estimate_tokens(prompt)
+        text = await self._generate(prompt, tenant_id=tenant_id, timeout=timeout)
+        self.output_tokens += estimate_tokens(text)
+        return text
+
+async def _load_resumes(directory: str, limit: int) -> list[str]:
+    paths = sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if os.path.isfile(os.path.join(directory, name))
+    )[:limit]
+    texts = []
+    for path in paths:
+        extraction = await extract_resume_text(path)
+        if extraction.text.strip():
+            texts.append(extraction.text)
+    return texts
+
+async def _measure(label: str, run):
+    meter = Meter()
+    ai.llm_client.generate = meter.generate
+    try:
+        started = time.perf_counter()
+        results = await run()
+        elapsed = time.perf_counter() - started
+    finally:
+        ai.llm_client.generate = meter._generate
+    failed = sum(1 for r in results if r.get("fallback"))
+    print(
+        f"{label:<8} {elapsed:7.1f} s  {len(results) / elapsed:6.2f} resumes/s  "
+        f"{meter.requests:5d} requests  ~{meter.input_tokens:8d} in / ~{meter.output_tokens:6d} out tokens  "
+        f"{failed} failed"
+    )
+    return results
+
+async def main(args):
+    if not get_settings().gemini_api_key:
+        raise SystemExit("GEMINI_API_KEY is not set; both modes would return mock results.")
+
+    with open(args.job) as f:
+        job_description = f.read()
+    resumes = await _load_resumes(args.resumes, args.limit)
+    print(f"{len(resumes)} resumes, job description ~{estimate_tokens(job_description)} tokens")
+
+    async def single():
+        return await asyncio.gather(*(
+            analyze_resume(text, job_description, args.skills) for text in resumes
+        ))
+
+    async def batched():
+        return await analyze_resumes_batched(resumes, job_description, args.skills)
+
+    single_results = await _measure("single", single)
+    batched_results = await _measure("batched", batched)
+
+    pairs = [
+        (s["score"], b["score"]) for s, b in zip(single_results, batched_results)
+        if not s.get("fallback") and not b.get("fallback")
+    ]
+    if len(pairs) < 2:
+        print("Not enough successful pairs to compare scores.")
+        return
+    single_scores, batched_scores = np.array(pairs, dtype=float).T
+    diff = np.abs(single_scores - batched_scores)
+    print(
+        f"agreement over {len(pairs)} resumes: mean |diff| {diff.mean():.1f}, "
+        f"within 10 points {np.mean(diff <= 10) * 100:.0f}%, "
+        f"pearson r {np.corrcoef(single_scores, batched_scores)[0, 1]:.3f}"
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resumes", required=True, help="directory of resume files")
+    parser.add_argument("--job", required=True, help="text file with the job description")
+    parser.add_argument("--skills", nargs="*", default=[])
+    parser.add_argument("--limit", type=int, default=100)
+    try:
+        asyncio.run(main(parser.parse_args()))
+    finally:
+        shutdown_extraction_pool()
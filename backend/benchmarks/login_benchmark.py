@@ -0,0 +1,89 @@
+"""Login throughput benchmark.
+
+Local mode (default) verifies passwords the way /auth/login does and compares
+running bcrypt inline on the event loop with running it on the hashing pool.
+It reports logins per second and the worst event-loop stall seen by a 10 ms
+ticker, which is what other requests on the worker would feel.
+
+    python -m benchmarks.login_benchmark --logins 200 --concurrency 50
+
+HTTP mode drives a running server instead:
+
+    python -m benchmarks.login_benchmark --url http://localhost:8000 \\
+        --email user@example.com --password secret --logins 500
+"""
+import argparse
+import asyncio
+import time
+import httpx
+from auth import pwd_context, hashing_pool, HashingPoolSaturated
+
+async def _ticker(stop: asyncio.Event, interval: float = 0.01) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
+
+async def _run(label: str, logins: int, concurrency: int, login):
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_ticker(stop))
+    semaphore = asyncio.Semaphore(concurrency)
+    rejected = 0
+
+    async def one():
+        nonlocal rejected
+        async with semaphore:
+            try:
+                await login()
+            except HashingPoolSaturated:
+                rejected += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    worst_stall = await ticker
+    print(
+        f"{label:<8} {logins / elapsed:8.1f} logins/s  "
+        f"max loop stall {worst_stall * 1000:8.1f} ms  rejected {rejected}"
+    )
+
+async def local(args):
+    stored = pwd_context.hash(args.password)
+    print(f"bcrypt rounds {pwd_context.to_dict().get('bcrypt__rounds')}, pool {hashing_pool.stats()['workers']} workers")
+
+    async def inline():
+        pwd_context.verify_and_update(args.password, stored)
+
+    async def pooled():
+        await hashing_pool.run(pwd_context.verify_and_update, args.password, stored)
+
+    await _run("inline", args.logins, args.concurrency, inline)
+    await _run("pool", args.logins, args.concurrency, pooled)
+    print(hashing_pool.stats())
+
+async def http(args):
+    async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+        statuses = {}
+
+        async def login():
+            response = await client.post("/auth/login", json={"email": args.email, "password": args.password})
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        await _run("http", args.logins, args.concurrency, login)
+        print(f"status codes: {statuses}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--password", default="correct horse battery staple")
+    parser.add_argument("--url")
+    parser.add_argument("--email")
+    args = parser.parse_args()
+    asyncio.run(http(args) if args.url else local(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""SQL query budgets per endpoint, for catching N+1 regressions in CI.
+
+Runs the app in-process against ``DATABASE_URL`` (a scratch Postgres with
+schema.sql applied) with the query profiler on.  For each scale it seeds a
+throwaway user with jobs and candidates, calls every endpoint in
+``QUERY_BUDGETS`` and reads the ``X-Query-Count`` header.  An endpoint fails
+when it runs more statements than its budget, or when its count changes
+between scales: a query per row shows up as a count that grows with the data.
+The seeded users are deleted afterwards.
+
+    python -m benchmarks.query_budget
+    python -m benchmarks.query_budget --jobs 20 --candidates 50
+
+Exits with status 1 if any endpoint is over budget; the backend workflow
+(.github/workflows/backend.yml) runs it against a Postgres service on every
+push and pull request that touches backend/.
+Caches that would hide queries (principals, dashboard stats, analyses) are
+cleared or bypassed before each call, so the counts are the uncached ones.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import uuid
+
+os.environ["QUERY_PROFILER_ENABLED"] = "true"
+
+import httpx
+from sqlalchemy import delete, insert
+from auth import create_access_token, token_claims, principal_cache
+from database import AsyncSessionLocal
+from models import User, Job, Candidate
+from routes.dashboard import stats_cache
+from main import app
+
+# (method, path, statements allowed, JSON body)
+QUERY_BUDGETS = [
+    ("GET", "/jobs", 1, None),
+    ("GET", "/jobs/{job_id}", 1, None),
+    ("GET", "/candidates/job/{job_id}", 2, None),
+    ("GET", "/candidates/job/{job_id}?sort_by=created_at&status_filter=new", 2, None),
+    ("GET", "/candidates/search?q=python", 1, None),
+    ("GET", "/candidates/{candidate_id}", 1, None),
+    ("GET", "/dashboard/stats", 2, None),
+    ("PUT", "/candidates/{candidate_id}/status", 4, {"status": "reviewing"}),
+    ("POST", "/candidates/{candidate_id}/reanalyze?bypass_cache=true", 6, None),
+]
+
+RESUME = "Senior Python engineer. 7 years of experience with FastAPI, PostgreSQL, Docker and AWS."
+
+async def _seed(jobs: int, candidates: int) -> tuple[User, list[Job], list[uuid.UUID]]:
+    async with AsyncSessionLocal() as db:
+        user = User(
+            email=f"query-budget-{uuid.uuid4().hex[:12]}@example.com",
+            password_hash="!",
+            full_name="Query Budget",
+            subscription_tier="business",
+        )
+        db.add(user)
+        await db.flush()
+        job_rows = [
+            Job(user_id=user.id, title=f"Backend Engineer {i}", description="Python APIs", skills=["python", "sql"])
+            for i in range(jobs)
+        ]
+        db.add_all(job_rows)
+        await db.flush()
+        candidate_ids = []
+        for job in job_rows:
+            rows = [
+                {
+                    "id": uuid.uuid4(),
+                    "job_id": job.id,
+                    "name": f"Candidate {i}",
+                    "email": f"candidate{i}@example.com",
+                    "resume_text": RESUME,
+                    "ai_score": i % 100,
+                    "skills_matched": ["python"],
+                }
+                for i in range(candidates)
+            ]
+            await db.execute(insert(Candidate), rows)
+            candidate_ids.append(rows[0]["id"])
+        await db.commit()
+        return user, job_rows, candidate_ids
+
+async def _delete(user_id: uuid.UUID):
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(User).where(User.id == user_id))
+        await db.commit()
+
+async def _measure(jobs: int, candidates: int) -> dict[str, int]:
+    user, job_rows, candidate_ids = await _seed(jobs, candidates)
+    headers = {
+        "Authorization": f"Bearer {create_access_token(token_claims(user))}",
+        "X-Query-Profile": "1",
+    }
+    counts = {}
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://budget") as client:
+            # Connection setup and dialect initialization are not the endpoint's queries.
+            await client.get("/jobs", headers=headers)
+            for method, path, _, body in QUERY_BUDGETS:
+                principal_cache.clear()
+                stats_cache.clear()
+                url = path.format(job_id=job_rows[0].id, candidate_id=candidate_ids[0])
+                response = await client.request(method, url, headers=headers, json=body)
+                if response.status_code >= 400:
+                    print(f"{method} {path}: HTTP {response.status_code} {response.text[:200]}")
+                counts[f"{method} {path}"] = int(response.headers.get("X-Query-Count", -1))
+    finally:
+        await _delete(user.id)
+    return counts
+
+async def main(args) -> int:
+    small = await _measure(1, 3)
+    large = await _measure(args.jobs, args.candidates)
+    failures = 0
+    print(f"{'endpoint':<70} {'budget':>6} {'small':>6} {'large':>6}")
+    for method, path, budget, _ in QUERY_BUDGETS:
+        key = f"{method} {path}"
+        ok = 0 <= small[key] <= budget and 0 <= large[key] <= budget and small[key] == large[key]
+        failures += not ok
+        print(f"{key:<70} {budget:>6} {small[key]:>6} {large[key]:>6}  {'ok' if ok else 'OVER BUDGET'}")
+    if failures:
+        print(f"\n{failures} endpoint(s) over their query budget; the query profiles above show the repeated shapes")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=10)
+    parser.add_argument("--candidates", type=int, default=100, help="candidates per job")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -3,17 +3,114 @@ from functools import lru_cache
 
 class Settings(BaseSettings):
     database_url: str = "postgresql://localhost:5432/hiremind"
+    db_echo: bool = False
+    db_pool_size: int = 10
+    db_max_overflow: int = 10
+    db_pool_timeout_seconds: float = 30.0
+    db_pool_recycle_seconds: int = 1800
+    db_pool_pre_ping: bool = True
+    db_prepared_statement_cache_size: int = 100
+    db_pgbouncer: bool = False  # transaction-pooling PgBouncer in front of Postgres
     jwt_secret: str = "change-this-secret-in-production"
     jwt_algorithm: str = "HS256"
     access_token_expire_minutes: int = 60 * 24 * 7  # 7 days
+    principal_cache_ttl_seconds: float = 60.0
+    principal_cache_max_entries: int = 10000
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 0  # 0 = min(4, CPU cores)
+    password_hash_max_queue: int = 32
     
     gemini_api_key: str = ""
+    gemini_model: str = "gemini-1.5-flash"
+    llm_max_concurrency: int = 16
+    llm_per_tenant_concurrency: int = 4
+    llm_timeout_seconds: float = 60.0
+    
+    # Per-tenant rate limits (rates and weights come from the plan)
+    rate_limit_enabled: bool = True
+    rate_limit_store_url: str = ""  # e.g. redis://localhost:6379/0 to share buckets between workers
+    rate_limit_max_buckets: int = 100000
+    
+    # Resume compaction: prompt budget per resume (0 = unlimited)
+    resume_token_budget: int = 1500
+    
+    # Batched analysis (jobs with analysis_mode = "batched")
+    analysis_batch_token_budget: int = 24000
+    analysis_batch_max_resumes: int = 10
+    analysis_batch_output_tokens_per_resume: int = 400
+    analysis_batch_linger_seconds: float = 0.5
+    
+    # Resume analysis cache
+    analysis_cache_enabled: bool = True
+    analysis_cache_memory_size: int = 2048
+    analysis_cache_ttl_seconds: int = 60 * 60 * 24 * 30  # 30 days
     
     stripe_secret_key: str = ""
     stripe_webhook_secret: str = ""
     stripe_price_pro: str = ""
     stripe_price_business: str = ""
     
+    # Uploaded resumes (content-addressed blob store)
+    blob_store_dir: str = "uploads/blobs"
+    max_upload_bytes: int = 10 * 1024 * 1024  # per resume
+    max_archive_bytes: int = 500 * 1024 * 1024  # per ZIP upload
+    upload_chunk_size: int = 1024 * 1024
+    
+    # Resume text extraction (runs in a process pool)
+    extraction_workers: int = 0  # 0 = one per CPU core
+    extraction_max_chars: int = 50000
+    extraction_max_pages: int = 30
+    extraction_timeout_seconds: float = 20.0
+    
+    # Bulk ingestion pipeline
+    pipeline_max_files: int = 2000
+    pipeline_storage_concurrency: int = 8
+    pipeline_extract_concurrency: int = 4
+    pipeline_analysis_concurrency: int = 4
+    pipeline_insert_batch_size: int = 50
+    pipeline_flush_interval_seconds: float = 2.0
+    pipeline_max_tracked_batches: int = 100
+    
+    # ATS import (CSV manifest + ZIP of resumes)
+    import_batch_size: int = 500
+    import_lease_seconds: float = 300.0  # a running import not heartbeated for this long is taken over
+    import_heartbeat_seconds: float = 30.0
+    import_sweep_interval_seconds: float = 60.0
+    import_max_manifest_bytes: int = 200 * 1024 * 1024
+    import_max_archive_bytes: int = 20 * 1024 * 1024 * 1024
+    
+    # Candidate export (rows fetched and encoded per chunk)
+    export_chunk_rows: int = 2000
+    
+    # Local pre-scoring: candidates below a job's threshold skip Gemini analysis
+    prescore_default_threshold: int = 15
+    
+    # Background re-scoring after job edits
+    rescore_debounce_seconds: float = 10.0
+    rescore_concurrency: int = 2
+    rescore_llm_share: float = 0.5  # back off while interactive calls use this share of Gemini slots
+    rescore_backoff_seconds: float = 1.0
+    rescore_max_tracked_jobs: int = 1000
+    
+    # Server-Sent Events
+    events_heartbeat_seconds: float = 15.0
+    events_subscriber_queue_size: int = 1000
+    events_replay_size: int = 256
+    events_max_channels: int = 10000
+    
+    # Prometheus metrics (set metrics_dir to aggregate across uvicorn workers)
+    metrics_dir: str = ""
+    metrics_snapshot_interval_seconds: float = 5.0
+    
+    # Per-request SQL profiler, switched on per request with "X-Query-Profile: 1"
+    query_profiler_enabled: bool = False
+    query_profiler_max_reports: int = 100
+    
+    # Dashboard stats
+    dashboard_cache_ttl_seconds: float = 15.0
+    dashboard_cache_max_entries: int = 10000
+    dashboard_max_series_days: int = 365
+    
     class Config:
         env_file = ".env"
 
@@ -1,13 +1,124 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import time
+from uuid import uuid4
+from sqlalchemy import exc, event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
-from config import get_settings
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+from config import get_settings, Settings
+from services.telemetry import db_pool_wait, record_query
 
 settings = get_settings()
 
-# Convert postgresql:// to postgresql+asyncpg://
-database_url = settings.database_url.replace("postgresql://", "postgresql+asyncpg://")
+class PoolStats:
+    """Connection pool counters, shared by every pool the engine recreates."""
+    def __init__(self):
+        self.checkouts = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.overflow_events = 0
+        self.timeouts = 0
 
-engine = create_async_engine(database_url, echo=True)
+    def record_checkout(self, wait_ms: float, overflowed: bool):
+        self.checkouts += 1
+        self.wait_ms_total += wait_ms
+        self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+        if overflowed:
+            self.overflow_events += 1
+
+    def to_dict(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "wait_ms_avg": round(self.wait_ms_total / self.checkouts, 2) if self.checkouts else 0.0,
+            "wait_ms_max": round(self.wait_ms_max, 2),
+            "overflow_events": self.overflow_events,
+            "timeouts": self.timeouts,
+        }
+
+pool_stats = PoolStats()
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that times how long each checkout waits for a connection."""
+    def _do_get(self):
+        overflow_before = self._overflow
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_stats.timeouts += 1
+            raise
+        waited = time.perf_counter() - started
+        db_pool_wait.observe(waited)
+        pool_stats.record_checkout(
+            waited * 1000,
+            overflowed=self._overflow > overflow_before and self._overflow > 0
+        )
+        return connection
+
+def create_engine_from_settings(config: Settings) -> AsyncEngine:
+    """Build the async engine from ``Settings``.
+
+    In ``db_pgbouncer`` mode (transaction pooling) SQLAlchemy keeps no pool of
+    its own and prepared statements are neither cached nor reused by name,
+    since consecutive statements may run on different server connections.
+    """
+    # Convert postgresql:// to postgresql+asyncpg://
+    url = config.database_url.replace("postgresql://", "postgresql+asyncpg://")
+    is_asyncpg = url.startswith("postgresql+asyncpg://")
+    
+    connect_args = {}
+    kwargs = {"echo": config.db_echo}
+    if config.db_pgbouncer:
+        kwargs["poolclass"] = NullPool
+        if is_asyncpg:
+            connect_args["statement_cache_size"] = 0
+            connect_args["prepared_statement_cache_size"] = 0
+            connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+    else:
+        kwargs.update(
+            poolclass=InstrumentedPool,
+            pool_size=config.db_pool_size,
+            max_overflow=config.db_max_overflow,
+            pool_timeout=config.db_pool_timeout_seconds,
+            pool_recycle=config.db_pool_recycle_seconds,
+            pool_pre_ping=config.db_pool_pre_ping,
+        )
+        if is_asyncpg:
+            connect_args["prepared_statement_cache_size"] = config.db_prepared_statement_cache_size
+    
+    return create_async_engine(url, connect_args=connect_args, **kwargs)
+
+def pool_metrics() -> dict:
+    pool = engine.pool
+    if not isinstance(pool, AsyncAdaptedQueuePool):
+        return {"pool": type(pool).__name__, "pgbouncer": settings.db_pgbouncer}
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "in_use": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": settings.db_max_overflow,
+        **pool_stats.to_dict(),
+    }
+
+def instrument_engine(engine: AsyncEngine):
+    """Time every SQL statement for /metrics and the current request's profile."""
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        record_query(time.perf_counter() - conn.info["query_started_at"].pop(), statement)
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def _handle_error(context):
+        started = context.connection.info.get("query_started_at") if context.connection else None
+        if started:
+            record_query(time.perf_counter() - started.pop(), context.statement or "")
+
+engine = create_engine_from_settings(settings)
+instrument_engine(engine)
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 Base = declarative_base()
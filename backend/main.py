@@ -1,9 +1,21 @@
+import asyncio
+import traceback
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from routes.auth import router as auth_router
 from routes.jobs import router as jobs_router
 from routes.candidates import router as candidates_router
+from routes.metrics import router as metrics_router
+from routes.dashboard import router as dashboard_router
+from routes.events import router as events_router
+from services.extraction import shutdown_extraction_pool
+from services.ats_import import run_import_sweeper
+from auth import hashing_pool
+from config import get_settings
+from services.telemetry import MetricsMiddleware, http_exceptions, route_label, run_snapshot_writer, write_snapshot
+
+settings = get_settings()
 
 app = FastAPI(
     title="HireMind AI",
@@ -18,12 +30,33 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Query-Count", "X-Query-Time-Ms", "X-Query-Duplicates"],
 )
+app.add_middleware(MetricsMiddleware)
 
 # Include routers
 app.include_router(auth_router)
 app.include_router(jobs_router)
 app.include_router(candidates_router)
+app.include_router(metrics_router)
+app.include_router(dashboard_router)
+app.include_router(events_router)
+
+_background_tasks: set[asyncio.Task] = set()
+
+@app.on_event("startup")
+async def startup():
+    if settings.metrics_dir:
+        _background_tasks.add(asyncio.create_task(run_snapshot_writer()))
+    _background_tasks.add(asyncio.create_task(run_import_sweeper()))
+
+@app.on_event("shutdown")
+async def shutdown():
+    for task in _background_tasks:
+        task.cancel()
+    write_snapshot()
+    shutdown_extraction_pool()
+    hashing_pool.shutdown()
 
 @app.get("/")
 async def root():
@@ -41,6 +74,9 @@ async def health_check():
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
+    http_exceptions.inc(route_label(request.scope), type(exc).__name__)
+    print(f"Unhandled error on {request.method} {request.url.path}:")
+    traceback.print_exception(exc)
     return JSONResponse(
         status_code=500,
         content={"detail": "Internal server error", "error": str(exc)}
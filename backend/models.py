@@ -1,6 +1,6 @@
-from sqlalchemy import Column, String, Text, Integer, ARRAY, TIMESTAMP, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Text, Integer, BigInteger, Boolean, Float, ARRAY, TIMESTAMP, Date, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 import uuid
 from database import Base
@@ -36,14 +36,48 @@ class Job(Base):
     salary_range = Column(String(100))
     job_type = Column(String(50), default="full-time")
     status = Column(String(50), default="active", index=True)
+    prescore_threshold = Column(Integer)  # NULL = use the configured default, 0 = analyze everyone
+    analysis_mode = Column(String(20), default="single")  # single, batched
+    resume_token_budget = Column(Integer)  # NULL = use the configured default, 0 = unlimited
+    # Candidate counters, maintained by database triggers on candidates
+    candidate_count = Column(Integer, nullable=False, default=0)
+    new_count = Column(Integer, nullable=False, default=0)
+    reviewing_count = Column(Integer, nullable=False, default=0)
+    shortlisted_count = Column(Integer, nullable=False, default=0)
+    rejected_count = Column(Integer, nullable=False, default=0)
+    hired_count = Column(Integer, nullable=False, default=0)
+    score_total = Column(BigInteger, nullable=False, default=0)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
     
     user = relationship("User", back_populates="jobs")
     candidates = relationship("Candidate", back_populates="job", cascade="all, delete-orphan")
+    
+    @property
+    def status_counts(self) -> dict:
+        return {
+            "new": self.new_count or 0,
+            "reviewing": self.reviewing_count or 0,
+            "shortlisted": self.shortlisted_count or 0,
+            "rejected": self.rejected_count or 0,
+            "hired": self.hired_count or 0,
+        }
+    
+    @property
+    def avg_score(self):
+        if not self.candidate_count:
+            return None
+        return round(self.score_total / self.candidate_count, 1)
 
 class Candidate(Base):
     __tablename__ = "candidates"
+    __table_args__ = (
+        # Keyset pagination of a job's candidates by score or recency
+        Index("idx_candidates_job_score", "job_id", text("ai_score DESC"), "id"),
+        Index("idx_candidates_job_created", "job_id", text("created_at DESC"), "id"),
+        Index("idx_candidates_search_vector", "search_vector", postgresql_using="gin"),
+        Index("idx_candidates_skills_matched", "skills_matched", postgresql_using="gin"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     job_id = Column(UUID(as_uuid=True), ForeignKey("jobs.id", ondelete="CASCADE"))
@@ -51,12 +85,21 @@ class Candidate(Base):
     email = Column(String(255), nullable=False)
     phone = Column(String(50))
     resume_url = Column(Text)
-    resume_text = Column(Text)
-    ai_score = Column(Integer, default=0, index=True)
+    resume_text = deferred(Column(Text))  # often 50-100 KB; load with undefer() when needed
+    resume_compact = deferred(Column(Text))  # what the analysis prompt sees
+    compact_budget = Column(Integer)  # token budget resume_compact was built for
+    resume_tokens = Column(Integer)
+    compact_tokens = Column(Integer)
+    ai_score = Column(Integer, nullable=False, default=0, index=True)
     ai_summary = Column(Text)
     skills_matched = Column(ARRAY(Text))
     experience_years = Column(Integer)
+    prescore = Column(Integer)
+    analysis_source = Column(String(20), default="llm")  # llm, prescore, pending
+    scoring_key = Column(String(64))  # job inputs the score was computed against
     status = Column(String(50), default="new", index=True)
+    # Maintained by the candidates_search_vector_trigger database trigger
+    search_vector = deferred(Column(TSVECTOR))
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
     
@@ -82,8 +125,11 @@ class EmailLog(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     candidate_id = Column(UUID(as_uuid=True), ForeignKey("candidates.id", ondelete="CASCADE"))
     template_id = Column(UUID(as_uuid=True), ForeignKey("email_templates.id"))
+    recipient = Column(String(255))
+    subject = Column(String(255))
+    body = Column(Text)
     sent_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
-    status = Column(String(50), default="sent")
+    status = Column(String(50), default="sent")  # queued, sent, failed
     
     candidate = relationship("Candidate", back_populates="email_logs")
 
@@ -100,3 +146,59 @@ class Subscription(Base):
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     
     user = relationship("User", back_populates="subscription")
+
+class CandidateImport(Base):
+    """A bulk import from another ATS; resumable from ``rows_done``."""
+    __tablename__ = "candidate_imports"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"))
+    job_id = Column(UUID(as_uuid=True), ForeignKey("jobs.id", ondelete="CASCADE"))
+    manifest_path = Column(Text, nullable=False)
+    archive_path = Column(Text)
+    analyze = Column(Boolean, nullable=False, default=True)
+    status = Column(String(20), nullable=False, default="pending", index=True)  # pending, running, completed, failed
+    total_rows = Column(Integer, nullable=False, default=0)
+    rows_done = Column(Integer, nullable=False, default=0)
+    inserted = Column(Integer, nullable=False, default=0)
+    failed_rows = Column(Integer, nullable=False, default=0)
+    missing_resumes = Column(Integer, nullable=False, default=0)
+    rows_per_sec = Column(Float)
+    error = Column(Text)
+    owner = Column(String(255))  # "<hostname>:<pid>" of the worker running it
+    heartbeat_at = Column(TIMESTAMP(timezone=True))
+    started_at = Column(TIMESTAMP(timezone=True))
+    finished_at = Column(TIMESTAMP(timezone=True))
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+
+class AnalysisCacheEntry(Base):
+    __tablename__ = "analysis_cache"
+    
+    key = Column(String(64), primary_key=True)
+    prompt_version = Column(String(20), nullable=False)
+    result = Column(JSONB, nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+    expires_at = Column(TIMESTAMP(timezone=True), nullable=False, index=True)
+
+class UserStats(Base):
+    """Dashboard totals per user, maintained by database triggers."""
+    __tablename__ = "user_stats"
+    
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    total_jobs = Column(Integer, nullable=False, default=0)
+    active_jobs = Column(Integer, nullable=False, default=0)
+    total_candidates = Column(Integer, nullable=False, default=0)
+    shortlisted = Column(Integer, nullable=False, default=0)
+    score_total = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+
+class UserStatsDaily(Base):
+    """Daily (UTC) activity buckets per user, maintained by database triggers."""
+    __tablename__ = "user_stats_daily"
+    
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    jobs_created = Column(Integer, nullable=False, default=0)
+    candidates_added = Column(Integer, nullable=False, default=0)
+    shortlisted = Column(Integer, nullable=False, default=0)
+    score_total = Column(BigInteger, nullable=False, default=0)
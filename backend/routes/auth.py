@@ -4,7 +4,7 @@ from sqlalchemy import select
 from database import get_db
 from models import User
 from schemas import UserCreate, UserLogin, UserResponse, Token
-from auth import get_password_hash, verify_password, create_access_token
+from auth import hash_password, verify_and_update_password, create_access_token, token_claims
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -22,7 +22,7 @@ async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     # Create user
     user = User(
         email=user_data.email,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=await hash_password(user_data.password),
         full_name=user_data.full_name,
         company_name=user_data.company_name
     )
@@ -31,7 +31,7 @@ async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     await db.refresh(user)
     
     # Create token
-    access_token = create_access_token(data={"sub": str(user.id)})
+    access_token = create_access_token(data=token_claims(user))
     
     return Token(
         access_token=access_token,
@@ -44,13 +44,25 @@ async def login(credentials: UserLogin, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.email == credentials.email))
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(credentials.password, user.password_hash):
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
     
-    access_token = create_access_token(data={"sub": str(user.id)})
+    valid, new_hash = await verify_and_update_password(credentials.password, user.password_hash)
+    if not valid:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password"
+        )
+    
+    if new_hash:
+        # Stored hash predates the current cost settings.
+        user.password_hash = new_hash
+        await db.commit()
+    
+    access_token = create_access_token(data=token_claims(user))
     
     return Token(
         access_token=access_token,
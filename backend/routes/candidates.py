@@ -1,65 +1,180 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List
+from sqlalchemy import select, update, insert, and_, or_
+from sqlalchemy.orm import load_only, undefer
+from typing import List, Optional
 from uuid import UUID
-import aiofiles
-import os
+from datetime import datetime
 from database import get_db
-from models import User, Job, Candidate
-from schemas import CandidateCreate, CandidateResponse, CandidateUpdateStatus, AIAnalysisResponse
-from auth import get_current_user
-from services.ai import analyze_resume
-import PyPDF2
-from io import BytesIO
+from models import User, Job, Candidate, UserStats, EmailTemplate, EmailLog, CandidateImport
+from schemas import (
+    CandidateCreate, CandidateResponse, CandidateUpdateStatus, AIAnalysisResponse,
+    CandidateBulkStatusUpdate, CandidateBulkStatusResponse,
+    BatchCreatedResponse, BatchStatusResponse, BatchItemStatus, ImportStatusResponse,
+    CandidateSearchHit, CandidateSearchResponse
+)
+from auth import get_current_user, get_current_principal, Principal
+from config import get_settings
+from services.analysis_cache import cached_analyze_resume
+from services.extraction import extract_resume_text
+from services.prescoring import JobProfile, prescore_threshold, local_analysis
+from services.pipeline import stage_upload, start_batch, get_batch
+from services.rescoring import scoring_key
+from services.compaction import compact_resume, resume_token_budget
+from services.storage import blob_store, BlobTooLargeError
+from services.search import search_candidates
+from services.pagination import encode_cursor, decode_cursor
+from services.events import event_bus, job_channel
+from services.rate_limit import rate_limit, check_quota
+from services.emails import status_template, render_status_emails
+from services.export import EXPORT_FORMATS, parse_columns, export_candidates
+from services.ats_import import inspect_manifest, start_import
+import asyncio
+import csv
+import zipfile
 
 router = APIRouter(prefix="/candidates", tags=["Candidates"])
 
-UPLOAD_DIR = "uploads/resumes"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+settings = get_settings()
 
-async def extract_text_from_pdf(file_content: bytes) -> str:
-    """Extract text from a PDF file."""
-    try:
-        pdf_reader = PyPDF2.PdfReader(BytesIO(file_content))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() or ""
-        return text
-    except Exception as e:
-        return ""
+CANDIDATE_STATUSES = ("new", "reviewing", "shortlisted", "rejected", "hired")
+MAX_BULK_STATUS_IDS = 5000
+
+# Columns needed to build a CandidateResponse; large text columns stay in the database.
+LIST_COLUMNS = (
+    Candidate.id, Candidate.job_id, Candidate.name, Candidate.email, Candidate.phone,
+    Candidate.resume_url, Candidate.ai_score, Candidate.ai_summary, Candidate.skills_matched,
+    Candidate.experience_years, Candidate.prescore, Candidate.analysis_source,
+    Candidate.resume_tokens, Candidate.compact_tokens, Candidate.status, Candidate.created_at
+)
+
+@router.get("/search", response_model=CandidateSearchResponse)
+async def search(
+    q: Optional[str] = None,
+    skills: List[str] = Query(default=[]),
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Search candidates across all of the user's jobs by text and skills."""
+    if not (q and q.strip()) and not skills:
+        raise HTTPException(status_code=400, detail="Provide a search query or at least one skill")
+    
+    hits, next_cursor = await search_candidates(
+        db, current_user.id, q.strip() if q else None, skills, limit, cursor
+    )
+    
+    return CandidateSearchResponse(
+        items=[CandidateSearchHit(**hit) for hit in hits],
+        next_cursor=next_cursor
+    )
 
 @router.get("/job/{job_id}", response_model=List[CandidateResponse])
 async def get_candidates(
     job_id: UUID,
+    response: Response,
     status_filter: str = None,
     sort_by: str = "ai_score",
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
-    """Get all candidates for a job, sorted by AI score."""
+    """Get a page of candidates for a job, sorted by AI score or newest first.
+
+    Pages are keyset-paginated on (ai_score DESC, id) or (created_at DESC, id).
+    When more rows may follow, the X-Next-Cursor header holds the cursor for
+    the next page.
+    """
     # Verify job ownership
     job_result = await db.execute(
-        select(Job).where(Job.id == job_id, Job.user_id == current_user.id)
+        select(Job.id).where(Job.id == job_id, Job.user_id == current_user.id)
     )
     if not job_result.scalar_one_or_none():
         raise HTTPException(status_code=404, detail="Job not found")
     
-    query = select(Candidate).where(Candidate.job_id == job_id)
+    query = (
+        select(Candidate)
+        .options(load_only(*LIST_COLUMNS))
+        .where(Candidate.job_id == job_id)
+    )
     if status_filter:
         query = query.where(Candidate.status == status_filter)
     
-    if sort_by == "ai_score":
-        query = query.order_by(Candidate.ai_score.desc())
-    else:
-        query = query.order_by(Candidate.created_at.desc())
+    sort_column = Candidate.ai_score if sort_by == "ai_score" else Candidate.created_at
+    if cursor:
+        last_value, last_id = decode_cursor(cursor, 2)
+        try:
+            last_value = int(last_value) if sort_by == "ai_score" else datetime.fromisoformat(last_value)
+            last_id = UUID(last_id)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(or_(
+            sort_column < last_value,
+            and_(sort_column == last_value, Candidate.id > last_id)
+        ))
+    query = query.order_by(sort_column.desc(), Candidate.id).limit(limit)
     
     result = await db.execute(query)
     candidates = result.scalars().all()
     
+    if len(candidates) == limit:
+        last = candidates[-1]
+        last_value = last.ai_score if sort_by == "ai_score" else last.created_at.isoformat()
+        response.headers["X-Next-Cursor"] = encode_cursor(last_value, str(last.id))
+    
     return [CandidateResponse.model_validate(c) for c in candidates]
 
-@router.post("/job/{job_id}/upload", response_model=CandidateResponse)
+@router.get("/job/{job_id}/export")
+async def export_job_candidates(
+    job_id: UUID,
+    format: str = "csv",
+    columns: Optional[str] = None,
+    status_filter: str = None,
+    sort_by: str = "ai_score",
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Download all of a job's candidates as CSV or NDJSON.
+
+    ``columns`` is a comma-separated list (see services.export.EXPORT_COLUMNS).
+    Rows are streamed from a server-side cursor as they are read.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format must be one of: {', '.join(EXPORT_FORMATS)}")
+    try:
+        selected = parse_columns(columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    job_result = await db.execute(
+        select(Job.id).where(Job.id == job_id, Job.user_id == current_user.id)
+    )
+    if not job_result.scalar_one_or_none():
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    # The export reads through its own session and connection.
+    await db.close()
+    
+    return StreamingResponse(
+        export_candidates(job_id, selected, format, status_filter, sort_by),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="candidates-{job_id}.{format}"'}
+    )
+
+def _emit_upload(job_id: UUID, filename: str, status: str, **extra):
+    event_bus.publish(
+        job_channel(job_id), "candidate",
+        {"job_id": job_id, "filename": filename, "status": status, **extra}
+    )
+
+@router.post(
+    "/job/{job_id}/upload",
+    response_model=CandidateResponse,
+    dependencies=[Depends(rate_limit("uploads"))]
+)
 async def upload_resume(
     job_id: UUID,
     name: str,
@@ -69,36 +184,54 @@ async def upload_resume(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Upload a resume and create a candidate with AI analysis."""
-    # Verify job ownership
+    """Upload a resume and create a candidate with AI analysis.
+
+    Progress is also published to the job's event stream (/events/jobs/{job_id}).
+    """
+    # Verify job ownership; the plan's resume count comes along in the same query
     job_result = await db.execute(
-        select(Job).where(Job.id == job_id, Job.user_id == current_user.id)
+        select(Job, UserStats.total_candidates)
+        .outerjoin(UserStats, UserStats.user_id == Job.user_id)
+        .where(Job.id == job_id, Job.user_id == current_user.id)
     )
-    job = job_result.scalar_one_or_none()
-    if not job:
+    row = job_result.first()
+    if not row:
         raise HTTPException(status_code=404, detail="Job not found")
+    job, total_candidates = row
+    check_quota(current_user.subscription_tier, "resumes_limit", total_candidates)
     
-    # Read file content
-    file_content = await file.read()
-    
-    # Save file
-    file_path = f"{UPLOAD_DIR}/{job_id}_{email.replace('@', '_')}_{file.filename}"
-    async with aiofiles.open(file_path, 'wb') as f:
-        await f.write(file_content)
+    # Stream file into the blob store
+    try:
+        blob = await blob_store.save_upload(file)
+    except BlobTooLargeError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    filename = file.filename or "resume"
+    _emit_upload(job_id, filename, "stored")
     
     # Extract text from resume
-    resume_text = ""
-    if file.filename.lower().endswith('.pdf'):
-        resume_text = await extract_text_from_pdf(file_content)
-    else:
-        resume_text = file_content.decode('utf-8', errors='ignore')
+    extraction = await extract_resume_text(blob.path)
+    resume_text = extraction.text
+    _emit_upload(job_id, filename, "extracted")
     
-    # AI Analysis
-    analysis = await analyze_resume(
-        resume_text,
-        job.description or "",
-        job.skills or []
-    )
+    # Local pre-screen, then AI analysis for candidates above the job's threshold
+    prescore = JobProfile.from_job(job).score(resume_text)
+    threshold = prescore_threshold(job)
+    if prescore.score < threshold:
+        analysis = local_analysis(prescore, threshold)
+        analysis_source = "prescore"
+    else:
+        analysis_source = "llm"
+    _emit_upload(job_id, filename, "prescored", prescore=prescore.score, analysis_source=analysis_source)
+    budget = resume_token_budget(job)
+    compact = compact_resume(resume_text, budget)
+    if analysis_source == "llm":
+        analysis = await cached_analyze_resume(
+            compact.text,
+            job.description or "",
+            job.skills or [],
+            tenant_id=str(current_user.id)
+        )
+        _emit_upload(job_id, filename, "analyzed", score=analysis["score"])
     
     # Create candidate
     candidate = Candidate(
@@ -106,24 +239,274 @@ async def upload_resume(
         name=name,
         email=email,
         phone=phone,
-        resume_url=file_path,
+        resume_url=blob.path,
         resume_text=resume_text,
+        resume_compact=compact.text,
+        compact_budget=budget,
+        resume_tokens=compact.original_tokens,
+        compact_tokens=compact.compact_tokens,
         ai_score=analysis["score"],
         ai_summary=analysis["summary"],
         skills_matched=analysis["skills_matched"],
-        experience_years=analysis["experience_years"]
+        experience_years=analysis["experience_years"],
+        prescore=prescore.score,
+        analysis_source=analysis_source,
+        scoring_key=None if analysis_source == "llm" and analysis.get("fallback") else scoring_key(job)
     )
     db.add(candidate)
     await db.commit()
     await db.refresh(candidate)
+    _emit_upload(job_id, filename, "completed", candidate_id=candidate.id)
     
     return CandidateResponse.model_validate(candidate)
 
+@router.post(
+    "/job/{job_id}/bulk-upload",
+    response_model=BatchCreatedResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(rate_limit("uploads"))]
+)
+async def bulk_upload_resumes(
+    job_id: UUID,
+    files: List[UploadFile] = File(...),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Upload many resumes (or ZIP archives of resumes) for background analysis.
+
+    The whole batch must fit within the plan's resume limit.
+    """
+    job_result = await db.execute(
+        select(Job, UserStats.total_candidates)
+        .outerjoin(UserStats, UserStats.user_id == Job.user_id)
+        .where(Job.id == job_id, Job.user_id == current_user.id)
+    )
+    row = job_result.first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Job not found")
+    job, total_candidates = row
+    check_quota(current_user.subscription_tier, "resumes_limit", total_candidates)
+    
+    items = []
+    for file in files:
+        try:
+            items.extend(await stage_upload(file))
+        except zipfile.BadZipFile:
+            raise HTTPException(status_code=400, detail=f"Invalid ZIP archive: {file.filename}")
+        except BlobTooLargeError as e:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"{file.filename}: {e}"
+            )
+        if len(items) > settings.pipeline_max_files:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"A batch may contain at most {settings.pipeline_max_files} resumes"
+            )
+    
+    if not items:
+        raise HTTPException(status_code=400, detail="No resumes found in upload")
+    check_quota(current_user.subscription_tier, "resumes_limit", total_candidates, len(items))
+    
+    batch = start_batch(job, current_user.id, items)
+    
+    return BatchCreatedResponse(batch_id=batch.id, job_id=job_id, total=len(batch.items))
+
+@router.post(
+    "/job/{job_id}/import",
+    response_model=ImportStatusResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(rate_limit("uploads"))]
+)
+async def import_candidates(
+    job_id: UUID,
+    manifest: UploadFile = File(...),
+    archive: Optional[UploadFile] = File(None),
+    analyze: bool = True,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Import candidates exported from another ATS.
+
+    ``manifest`` is a CSV with a row per candidate (name or first/last name,
+    email, phone, status, resume filename); ``archive`` is an optional ZIP of
+    the resumes it references.  The import runs in the background without
+    calling Gemini; with ``analyze`` the candidates are analyzed by a
+    background re-score once it completes.  Poll /candidates/imports/{id} or
+    follow the job's event stream for progress.
+    """
+    job_result = await db.execute(
+        select(Job.id, UserStats.total_candidates)
+        .outerjoin(UserStats, UserStats.user_id == Job.user_id)
+        .where(Job.id == job_id, Job.user_id == current_user.id)
+    )
+    row = job_result.first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Job not found")
+    total_candidates = row.total_candidates
+    check_quota(current_user.subscription_tier, "resumes_limit", total_candidates)
+    
+    try:
+        manifest_blob = await blob_store.save_upload(manifest, max_bytes=settings.import_max_manifest_bytes)
+        archive_blob = (
+            await blob_store.save_upload(archive, max_bytes=settings.import_max_archive_bytes)
+            if archive is not None else None
+        )
+    except BlobTooLargeError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    
+    try:
+        total_rows = await asyncio.to_thread(inspect_manifest, manifest_blob.path)
+    except (ValueError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid manifest: {e}")
+    if not total_rows:
+        raise HTTPException(status_code=400, detail="The manifest has no candidate rows")
+    if archive_blob is not None and not await asyncio.to_thread(zipfile.is_zipfile, archive_blob.path):
+        raise HTTPException(status_code=400, detail=f"Invalid ZIP archive: {archive.filename}")
+    check_quota(current_user.subscription_tier, "resumes_limit", total_candidates, total_rows)
+    
+    record = CandidateImport(
+        user_id=current_user.id,
+        job_id=job_id,
+        manifest_path=manifest_blob.path,
+        archive_path=archive_blob.path if archive_blob else None,
+        analyze=analyze,
+        total_rows=total_rows
+    )
+    db.add(record)
+    await db.commit()
+    await db.refresh(record)
+    start_import(record.id)
+    
+    return ImportStatusResponse.model_validate(record)
+
+@router.get("/imports/{import_id}", response_model=ImportStatusResponse)
+async def get_import_status(
+    import_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Progress and throughput of a candidate import."""
+    result = await db.execute(
+        select(CandidateImport).where(
+            CandidateImport.id == import_id,
+            CandidateImport.user_id == current_user.id
+        )
+    )
+    record = result.scalar_one_or_none()
+    if not record:
+        raise HTTPException(status_code=404, detail="Import not found")
+    
+    return ImportStatusResponse.model_validate(record)
+
+@router.get("/batches/{batch_id}", response_model=BatchStatusResponse)
+async def get_batch_status(
+    batch_id: str,
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Get the progress of a bulk upload, per resume."""
+    batch = get_batch(batch_id)
+    if not batch or batch.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    
+    return BatchStatusResponse(
+        batch_id=batch.id,
+        job_id=batch.job_id,
+        status=batch.status,
+        total=len(batch.items),
+        counts=batch.counts(),
+        items=[BatchItemStatus.model_validate(item) for item in batch.items],
+        created_at=batch.created_at,
+        finished_at=batch.finished_at
+    )
+
+@router.post("/bulk-status", response_model=CandidateBulkStatusResponse)
+async def bulk_update_status(
+    data: CandidateBulkStatusUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Move many candidates to a status at once and queue their status emails.
+
+    Candidates are given as IDs or as a job with optional status and score
+    filters.  The change is one UPDATE joined to jobs, so candidates of other
+    users are never touched; candidates already in the status are skipped.
+    At most MAX_BULK_STATUS_IDS candidates change per request: when a job
+    filter matches more, has_more is set and repeating the request moves the
+    next ones.  Emails use the user's template for the status (matched on
+    template_type) or the built-in one, and are logged as queued with one
+    multi-row INSERT; candidates without an email address get none.
+    """
+    if data.status not in CANDIDATE_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Status must be one of: {', '.join(CANDIDATE_STATUSES)}")
+    if not data.candidate_ids and data.job_id is None:
+        raise HTTPException(status_code=400, detail="Provide candidate_ids or a job_id")
+    if data.candidate_ids and len(data.candidate_ids) > MAX_BULK_STATUS_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_STATUS_IDS} candidates per request")
+    
+    conditions = [
+        Job.user_id == current_user.id,
+        Candidate.status.is_distinct_from(data.status),
+    ]
+    if data.candidate_ids:
+        conditions.append(Candidate.id.in_(data.candidate_ids))
+    if data.job_id is not None:
+        conditions.append(Candidate.job_id == data.job_id)
+    if data.current_status:
+        conditions.append(Candidate.status == data.current_status)
+    if data.min_score is not None:
+        conditions.append(Candidate.ai_score >= data.min_score)
+    if data.max_score is not None:
+        conditions.append(Candidate.ai_score <= data.max_score)
+    
+    targets = (
+        select(Candidate.id)
+        .join(Job)
+        .where(*conditions)
+        .order_by(Candidate.id)
+        .limit(MAX_BULK_STATUS_IDS)
+    )
+    # Core UPDATE: the ORM form drops the jobs column from RETURNING.
+    result = await db.execute(
+        update(Candidate.__table__)
+        .where(Candidate.job_id == Job.id, Candidate.id.in_(targets.scalar_subquery()))
+        .values(status=data.status)
+        .returning(Candidate.id, Candidate.name, Candidate.email, Job.title)
+    )
+    rows = result.all()
+    
+    emails = []
+    emails_skipped = 0
+    if data.send_emails and rows:
+        template_result = await db.execute(
+            select(EmailTemplate)
+            .where(EmailTemplate.user_id == current_user.id, EmailTemplate.template_type == data.status)
+            .order_by(EmailTemplate.created_at.desc())
+            .limit(1)
+        )
+        template = status_template(data.status, template_result.scalar_one_or_none())
+        if template is not None:
+            emails = render_status_emails(template, rows, current_user.company_name)
+            emails_skipped = len(rows) - len(emails)
+            if emails:
+                await db.execute(insert(EmailLog), [{**email, "status": "queued"} for email in emails])
+    
+    await db.commit()
+    
+    return CandidateBulkStatusResponse(
+        status=data.status,
+        updated=len(rows),
+        emails_queued=len(emails),
+        emails_skipped=emails_skipped,
+        has_more=len(rows) == MAX_BULK_STATUS_IDS,
+        candidate_ids=[row.id for row in rows]
+    )
+
 @router.get("/{candidate_id}", response_model=CandidateResponse)
 async def get_candidate(
     candidate_id: UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Get a specific candidate."""
     result = await db.execute(
@@ -164,31 +547,51 @@ async def update_candidate_status(
     
     return CandidateResponse.model_validate(candidate)
 
-@router.post("/{candidate_id}/reanalyze", response_model=AIAnalysisResponse)
+@router.post(
+    "/{candidate_id}/reanalyze",
+    response_model=AIAnalysisResponse,
+    dependencies=[Depends(rate_limit("ai"))]
+)
 async def reanalyze_candidate(
     candidate_id: UUID,
+    bypass_cache: bool = False,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Re-run AI analysis on a candidate."""
+    """Re-run AI analysis on a candidate.
+
+    The stored compacted resume is reused unless the job's token budget has
+    changed.  Unchanged inputs are served from the analysis cache unless
+    bypass_cache is set.
+    """
+    # The ownership join already reads the job row, so load it alongside
     result = await db.execute(
-        select(Candidate).join(Job).where(
+        select(Candidate, Job).options(undefer(Candidate.resume_compact)).join(Job).where(
             Candidate.id == candidate_id,
             Job.user_id == current_user.id
         )
     )
-    candidate = result.scalar_one_or_none()
+    row = result.one_or_none()
     
-    if not candidate:
+    if not row:
         raise HTTPException(status_code=404, detail="Candidate not found")
+    candidate, job = row
     
-    job_result = await db.execute(select(Job).where(Job.id == candidate.job_id))
-    job = job_result.scalar_one()
+    budget = resume_token_budget(job)
+    if candidate.resume_compact is None or candidate.compact_budget != budget:
+        await db.refresh(candidate, ["resume_text"])
+        compact = compact_resume(candidate.resume_text or "", budget)
+        candidate.resume_compact = compact.text
+        candidate.compact_budget = budget
+        candidate.resume_tokens = compact.original_tokens
+        candidate.compact_tokens = compact.compact_tokens
     
-    analysis = await analyze_resume(
-        candidate.resume_text or "",
+    analysis = await cached_analyze_resume(
+        candidate.resume_compact,
         job.description or "",
-        job.skills or []
+        job.skills or [],
+        tenant_id=str(current_user.id),
+        bypass_cache=bypass_cache
     )
     
     # Update candidate
@@ -196,6 +599,8 @@ async def reanalyze_candidate(
     candidate.ai_summary = analysis["summary"]
     candidate.skills_matched = analysis["skills_matched"]
     candidate.experience_years = analysis["experience_years"]
+    candidate.analysis_source = "llm"
+    candidate.scoring_key = None if analysis.get("fallback") else scoring_key(job)
     
     await db.commit()
     
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from config import get_settings
+from database import get_db
+from models import UserStats, UserStatsDaily
+from schemas import DashboardStats, DashboardStatsBucket
+from auth import get_current_principal, Principal
+from services.ttl_cache import TTLCache
+
+settings = get_settings()
+router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+
+# Stats are trigger-maintained, so a short TTL only hides a few seconds of writes.
+stats_cache = TTLCache(
+    max_entries=settings.dashboard_cache_max_entries,
+    ttl_seconds=settings.dashboard_cache_ttl_seconds
+)
+
+@router.get("/stats", response_model=DashboardStats)
+async def get_dashboard_stats(
+    days: int = Query(30, ge=0, le=settings.dashboard_max_series_days),
+    db: AsyncSession = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Dashboard totals and a daily (UTC) trend series for the current user.
+
+    Totals are one primary-key lookup on user_stats and the series is a range
+    scan of at most ``days`` rows, so the cost does not depend on how many
+    jobs or candidates the user has.
+    """
+    cache_key = (current_user.id, days)
+    cached = stats_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    totals = await db.get(UserStats, current_user.id)
+    
+    series = []
+    if days:
+        today = datetime.now(timezone.utc).date()
+        start = today - timedelta(days=days - 1)
+        result = await db.execute(
+            select(UserStatsDaily)
+            .where(UserStatsDaily.user_id == current_user.id, UserStatsDaily.day >= start)
+            .order_by(UserStatsDaily.day)
+        )
+        buckets = {row.day: row for row in result.scalars().all()}
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            row = buckets.get(day)
+            series.append(DashboardStatsBucket(
+                day=day,
+                jobs_created=row.jobs_created if row else 0,
+                candidates_added=row.candidates_added if row else 0,
+                shortlisted=row.shortlisted if row else 0,
+                avg_score=round(row.score_total / row.candidates_added, 1) if row and row.candidates_added else None
+            ))
+    
+    stats = DashboardStats(
+        total_jobs=totals.total_jobs if totals else 0,
+        active_jobs=totals.active_jobs if totals else 0,
+        total_candidates=totals.total_candidates if totals else 0,
+        shortlisted=totals.shortlisted if totals else 0,
+        avg_score=round(totals.score_total / totals.total_candidates, 1) if totals and totals.total_candidates else 0.0,
+        series=series
+    )
+    stats_cache.set(cache_key, stats)
+    return stats
@@ -0,0 +1,68 @@
+from contextlib import aclosing
+from typing import Optional
+from uuid import UUID
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from database import AsyncSessionLocal
+from models import Job
+from auth import get_stream_principal, Principal
+from services.events import event_bus, job_channel, batch_channel, format_sse
+from services.pipeline import get_batch
+
+router = APIRouter(prefix="/events", tags=["Events"])
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def _stream(request: Request, channel: str, last_event_id: Optional[int], until_batch_done: bool = False):
+    async def body():
+        yield "retry: 3000\n\n"
+        async with aclosing(event_bus.subscribe(channel, last_event_id)) as messages:
+            async for message in messages:
+                if await request.is_disconnected():
+                    return
+                yield format_sse(message)
+                if until_batch_done and message and message[1] == "batch" and message[2]["status"] == "completed":
+                    return
+    return StreamingResponse(body(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+def _parse_event_id(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+@router.get("/jobs/{job_id}")
+async def stream_job_events(
+    job_id: UUID,
+    request: Request,
+    last_event_id: Optional[str] = Header(None),
+    current_user: Principal = Depends(get_stream_principal)
+):
+    """Server-Sent Events for every upload, batch and re-score of a job."""
+    # Own short-lived session: a request-scoped one would hold a pooled
+    # connection for as long as the stream stays open.
+    async with AsyncSessionLocal() as db:
+        owned = await db.scalar(select(Job.id).where(Job.id == job_id, Job.user_id == current_user.id))
+    if owned is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return _stream(request, job_channel(job_id), _parse_event_id(last_event_id))
+
+@router.get("/batches/{batch_id}")
+async def stream_batch_events(
+    batch_id: str,
+    request: Request,
+    last_event_id: Optional[str] = Header(None),
+    current_user: Principal = Depends(get_stream_principal)
+):
+    """Server-Sent Events for one bulk upload; the stream ends when the batch does.
+
+    Events already published for the batch are replayed on connect.
+    """
+    batch = get_batch(batch_id)
+    if not batch or batch.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    
+    event_id = _parse_event_id(last_event_id)
+    return _stream(request, batch_channel(batch_id), 0 if event_id is None else event_id, until_batch_done=True)
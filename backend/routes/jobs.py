@@ -1,23 +1,35 @@
+import time
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select
 from typing import List
 from uuid import UUID
 from database import get_db
-from models import User, Job, Candidate
-from schemas import JobCreate, JobUpdate, JobResponse
-from auth import get_current_user
-from services.ai import generate_job_description
+from models import User, Job, UserStats
+from schemas import JobCreate, JobUpdate, JobResponse, RescoreStatus
+from auth import get_current_user, get_current_principal, Principal
+from services.ai import generate_job_description, stream_job_description
+from services.rescoring import schedule_rescore, get_rescore
+from services.rate_limit import rate_limit, check_quota
 
 router = APIRouter(prefix="/jobs", tags=["Jobs"])
 
+# Starts the final chunk of a description stream that failed part-way
+# (ASCII record separator; never part of generated text).
+STREAM_ERROR_MARKER = "\x1e"
+
 @router.get("", response_model=List[JobResponse])
 async def get_jobs(
     status_filter: str = None,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
-    """Get all jobs for the current user."""
+    """Get all jobs for the current user.
+
+    Candidate counts come from the counter columns on jobs, so this is a
+    single query regardless of how many candidates each job has.
+    """
     query = select(Job).where(Job.user_id == current_user.id)
     if status_filter:
         query = query.where(Job.status == status_filter)
@@ -26,18 +38,7 @@ async def get_jobs(
     result = await db.execute(query)
     jobs = result.scalars().all()
     
-    # Add candidate counts
-    job_responses = []
-    for job in jobs:
-        count_result = await db.execute(
-            select(func.count(Candidate.id)).where(Candidate.job_id == job.id)
-        )
-        count = count_result.scalar()
-        job_dict = JobResponse.model_validate(job)
-        job_dict.candidate_count = count
-        job_responses.append(job_dict)
-    
-    return job_responses
+    return [JobResponse.model_validate(job) for job in jobs]
 
 @router.post("", response_model=JobResponse, status_code=status.HTTP_201_CREATED)
 async def create_job(
@@ -45,7 +46,10 @@ async def create_job(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Create a new job posting."""
+    """Create a new job posting, within the plan's job limit."""
+    stats = await db.get(UserStats, current_user.id)
+    check_quota(current_user.subscription_tier, "jobs_limit", stats.total_jobs if stats else 0)
+    
     job = Job(
         user_id=current_user.id,
         title=job_data.title,
@@ -54,7 +58,10 @@ async def create_job(
         skills=job_data.skills,
         location=job_data.location,
         salary_range=job_data.salary_range,
-        job_type=job_data.job_type
+        job_type=job_data.job_type,
+        prescore_threshold=job_data.prescore_threshold,
+        analysis_mode=job_data.analysis_mode or "single",
+        resume_token_budget=job_data.resume_token_budget
     )
     db.add(job)
     await db.commit()
@@ -66,7 +73,7 @@ async def create_job(
 async def get_job(
     job_id: UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """Get a specific job."""
     result = await db.execute(
@@ -86,7 +93,11 @@ async def update_job(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Update a job posting."""
+    """Update a job posting.
+
+    Changing the description, requirements, skills, pre-score threshold or
+    resume token budget queues a background re-score of the job's candidates.
+    """
     result = await db.execute(
         select(Job).where(Job.id == job_id, Job.user_id == current_user.id)
     )
@@ -96,14 +107,33 @@ async def update_job(
         raise HTTPException(status_code=404, detail="Job not found")
     
     update_data = job_data.model_dump(exclude_unset=True)
+    changed = {key for key, value in update_data.items() if getattr(job, key) != value}
     for key, value in update_data.items():
         setattr(job, key, value)
     
     await db.commit()
     await db.refresh(job)
     
+    if changed & {"description", "requirements", "skills", "prescore_threshold", "resume_token_budget"}:
+        schedule_rescore(
+            job.id, current_user.id,
+            llm_inputs_changed=bool(changed & {"description", "skills", "resume_token_budget"})
+        )
+    
     return JobResponse.model_validate(job)
 
+@router.get("/{job_id}/rescore", response_model=RescoreStatus)
+async def get_rescore_status(
+    job_id: UUID,
+    current_user: Principal = Depends(get_current_principal)
+):
+    """Progress of the latest background re-score of a job's candidates."""
+    run = get_rescore(job_id)
+    if not run or run.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="No re-score found for this job")
+    
+    return RescoreStatus.model_validate(run)
+
 @router.delete("/{job_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_job(
     job_id: UUID,
@@ -122,7 +152,7 @@ async def delete_job(
     await db.delete(job)
     await db.commit()
 
-@router.post("/{job_id}/generate-description")
+@router.post("/{job_id}/generate-description", dependencies=[Depends(rate_limit("ai"))])
 async def generate_description(
     job_id: UUID,
     db: AsyncSession = Depends(get_db),
@@ -137,6 +167,55 @@ async def generate_description(
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    description = await generate_job_description(job.title, job.skills or [])
+    description = await generate_job_description(
+        job.title, job.skills or [], tenant_id=str(current_user.id)
+    )
     
     return {"description": description}
+
+@router.post("/{job_id}/generate-description/stream", dependencies=[Depends(rate_limit("ai"))])
+async def stream_description(
+    job_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Generate an AI job description, streamed as plain text while it is written.
+
+    If the client disconnects, the Gemini call is cancelled.  If generation
+    fails after text has been sent, the stream ends with STREAM_ERROR_MARKER
+    followed by an error message instead of ending normally.
+    """
+    result = await db.execute(
+        select(Job.title, Job.skills).where(Job.id == job_id, Job.user_id == current_user.id)
+    )
+    job = result.first()
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    # Release the pooled connection; the stream can run for several seconds.
+    await db.close()
+    
+    async def body():
+        started = time.perf_counter()
+        first_token_ms = None
+        outcome = "cancelled"
+        try:
+            async for chunk in stream_job_description(job.title, job.skills or [], tenant_id=str(current_user.id)):
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - started) * 1000
+                yield chunk
+            outcome = "completed"
+        except Exception as e:
+            outcome = f"failed ({e})"
+            yield f"{STREAM_ERROR_MARKER}The description could not be completed. Please try again."
+        finally:
+            total_ms = (time.perf_counter() - started) * 1000
+            ttft = f"{first_token_ms:.0f} ms" if first_token_ms is not None else "n/a"
+            print(f"Job description stream {job_id} {outcome}: first token {ttft}, total {total_ms:.0f} ms")
+    
+    return StreamingResponse(
+        body(),
+        media_type="text/plain; charset=utf-8",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,74 @@
+from fastapi import APIRouter, Query, Response
+from auth import principal_cache_stats, hashing_pool
+from database import pool_metrics
+from services.events import event_bus
+from services.llm import llm_client
+from services.compaction import compaction_stats
+from services.rate_limit import rate_limiter
+from services.telemetry import render_metrics
+from services.query_profiler import recent_profiles
+from services.analysis_cache import analysis_cache
+from services.extraction import extraction_stats
+from services.storage import blob_store
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+@router.get("")
+async def get_prometheus_metrics():
+    """Request, database, Gemini, extraction and upload metrics in Prometheus text format."""
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@router.get("/analysis-cache")
+async def get_analysis_cache_stats():
+    """Hit/miss counters for the resume analysis cache."""
+    return analysis_cache.stats()
+
+@router.get("/extraction")
+async def get_extraction_stats():
+    """Resume text extraction cost: time and pages parsed."""
+    return extraction_stats.to_dict()
+
+@router.get("/storage")
+async def get_storage_stats():
+    """Bytes written to and deduplicated by the resume blob store."""
+    return blob_store.stats()
+
+@router.get("/auth-cache")
+async def get_auth_cache_stats():
+    """Principal cache hits (DB lookups saved) and requests served from token claims."""
+    return principal_cache_stats()
+
+@router.get("/password-hashing")
+async def get_password_hashing_stats():
+    """Queue depth and throughput of the bcrypt hashing pool."""
+    return hashing_pool.stats()
+
+@router.get("/db-pool")
+async def get_db_pool_stats():
+    """Connections in use, overflow and checkout wait times for the database pool."""
+    return pool_metrics()
+
+@router.get("/events")
+async def get_event_stats():
+    """Open event streams and events published or dropped for slow clients."""
+    return event_bus.stats()
+
+@router.get("/llm")
+async def get_llm_stats():
+    """Gemini concurrency, streams and time to first token."""
+    return llm_client.stats()
+
+@router.get("/compaction")
+async def get_compaction_stats():
+    """Prompt tokens saved by resume compaction."""
+    return compaction_stats.to_dict()
+
+@router.get("/rate-limits")
+async def get_rate_limit_stats():
+    """Requests allowed and refused by the per-plan rate limits and quotas."""
+    return rate_limiter.stats()
+
+@router.get("/query-profiles")
+async def get_query_profiles(limit: int = Query(20, ge=1, le=1000)):
+    """SQL statement counts, time and repeated query shapes of recently profiled requests."""
+    return recent_profiles(limit)
@@ -30,6 +30,17 @@ CREATE TABLE jobs (
     salary_range VARCHAR(100),
     job_type VARCHAR(50) DEFAULT 'full-time',
     status VARCHAR(50) DEFAULT 'active',
+    prescore_threshold INTEGER,
+    analysis_mode VARCHAR(20) DEFAULT 'single',
+    resume_token_budget INTEGER,
+    -- Candidate counters, maintained by candidates_job_counters_* triggers
+    candidate_count INTEGER NOT NULL DEFAULT 0,
+    new_count INTEGER NOT NULL DEFAULT 0,
+    reviewing_count INTEGER NOT NULL DEFAULT 0,
+    shortlisted_count INTEGER NOT NULL DEFAULT 0,
+    rejected_count INTEGER NOT NULL DEFAULT 0,
+    hired_count INTEGER NOT NULL DEFAULT 0,
+    score_total BIGINT NOT NULL DEFAULT 0,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
@@ -43,15 +54,224 @@ CREATE TABLE candidates (
     phone VARCHAR(50),
     resume_url TEXT,
     resume_text TEXT,
-    ai_score INTEGER DEFAULT 0,
+    resume_compact TEXT,
+    compact_budget INTEGER,
+    resume_tokens INTEGER,
+    compact_tokens INTEGER,
+    ai_score INTEGER NOT NULL DEFAULT 0, -- NOT NULL so the (ai_score DESC, id) keyset never meets a NULL
     ai_summary TEXT,
     skills_matched TEXT[],
     experience_years INTEGER,
+    prescore INTEGER,
+    analysis_source VARCHAR(20) DEFAULT 'llm',
+    scoring_key VARCHAR(64),
     status VARCHAR(50) DEFAULT 'new',
+    search_vector TSVECTOR,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Keep candidates.search_vector in sync for full-text search
+CREATE OR REPLACE FUNCTION candidates_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    -- Names and emails are indexed both as written and stemmed: search queries
+    -- are parsed with both configs (services/search.py), so "Williams" matches
+    -- whether or not the rest of the query is stemmed.
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.name, '') || ' ' || coalesce(NEW.email, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.name, '') || ' ' || coalesce(NEW.email, '')), 'A') ||
+        setweight(to_tsvector('english', array_to_string(coalesce(NEW.skills_matched, '{}'), ' ')), 'B') ||
+        setweight(to_tsvector('english', coalesce(NEW.resume_text, '')), 'C');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER candidates_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, email, skills_matched, resume_text ON candidates
+    FOR EACH ROW EXECUTE FUNCTION candidates_search_vector_update();
+
+-- Keep the per-job candidate counters on jobs up to date. Statement-level
+-- triggers aggregate each INSERT/UPDATE/DELETE (including multi-row inserts
+-- and COPY) into a single UPDATE per affected job.
+CREATE OR REPLACE FUNCTION candidates_job_counters_update() RETURNS trigger AS $$
+DECLARE
+    changes TEXT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        changes := 'SELECT 1 AS sign, job_id, status, ai_score FROM new_rows';
+    ELSIF TG_OP = 'DELETE' THEN
+        changes := 'SELECT -1 AS sign, job_id, status, ai_score FROM old_rows';
+    ELSE
+        changes := 'SELECT 1 AS sign, job_id, status, ai_score FROM new_rows
+                    UNION ALL
+                    SELECT -1 AS sign, job_id, status, ai_score FROM old_rows';
+    END IF;
+
+    EXECUTE format($sql$
+        UPDATE jobs j SET
+            candidate_count = j.candidate_count + d.total,
+            new_count = j.new_count + d.new,
+            reviewing_count = j.reviewing_count + d.reviewing,
+            shortlisted_count = j.shortlisted_count + d.shortlisted,
+            rejected_count = j.rejected_count + d.rejected,
+            hired_count = j.hired_count + d.hired,
+            score_total = j.score_total + d.score
+        FROM (
+            SELECT job_id,
+                   sum(sign) AS total,
+                   coalesce(sum(sign) FILTER (WHERE status = 'new'), 0) AS new,
+                   coalesce(sum(sign) FILTER (WHERE status = 'reviewing'), 0) AS reviewing,
+                   coalesce(sum(sign) FILTER (WHERE status = 'shortlisted'), 0) AS shortlisted,
+                   coalesce(sum(sign) FILTER (WHERE status = 'rejected'), 0) AS rejected,
+                   coalesce(sum(sign) FILTER (WHERE status = 'hired'), 0) AS hired,
+                   sum(sign * coalesce(ai_score, 0)) AS score
+            FROM (%s) changes
+            WHERE job_id IS NOT NULL
+            GROUP BY job_id
+        ) d
+        WHERE j.id = d.job_id
+          AND (d.total <> 0 OR d.new <> 0 OR d.reviewing <> 0 OR d.shortlisted <> 0
+               OR d.rejected <> 0 OR d.hired <> 0 OR d.score <> 0)
+    $sql$, changes);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER candidates_job_counters_insert
+    AFTER INSERT ON candidates REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION candidates_job_counters_update();
+
+CREATE TRIGGER candidates_job_counters_update
+    AFTER UPDATE ON candidates REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION candidates_job_counters_update();
+
+CREATE TRIGGER candidates_job_counters_delete
+    AFTER DELETE ON candidates REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION candidates_job_counters_update();
+
+-- Per-user dashboard aggregates, maintained incrementally by triggers
+CREATE TABLE user_stats (
+    user_id UUID PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    total_jobs INTEGER NOT NULL DEFAULT 0,
+    active_jobs INTEGER NOT NULL DEFAULT 0,
+    total_candidates INTEGER NOT NULL DEFAULT 0,
+    shortlisted INTEGER NOT NULL DEFAULT 0,
+    score_total BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Daily (UTC) activity buckets for dashboard trend charts
+CREATE TABLE user_stats_daily (
+    user_id UUID REFERENCES users(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    jobs_created INTEGER NOT NULL DEFAULT 0,
+    candidates_added INTEGER NOT NULL DEFAULT 0,
+    shortlisted INTEGER NOT NULL DEFAULT 0,
+    score_total BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day)
+);
+
+-- Roll job rows (and through them the candidate counters) up into user_stats.
+-- Candidate writes update the job counters, which fires this trigger in turn.
+CREATE OR REPLACE FUNCTION jobs_user_stats_update() RETURNS trigger AS $$
+DECLARE
+    changes TEXT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        changes := 'SELECT 1 AS sign, user_id, status, candidate_count, shortlisted_count, score_total FROM new_rows';
+    ELSIF TG_OP = 'DELETE' THEN
+        changes := 'SELECT -1 AS sign, user_id, status, candidate_count, shortlisted_count, score_total FROM old_rows';
+    ELSE
+        changes := 'SELECT 1 AS sign, user_id, status, candidate_count, shortlisted_count, score_total FROM new_rows
+                    UNION ALL
+                    SELECT -1 AS sign, user_id, status, candidate_count, shortlisted_count, score_total FROM old_rows';
+    END IF;
+
+    EXECUTE format($sql$
+        INSERT INTO user_stats AS s (user_id, total_jobs, active_jobs, total_candidates, shortlisted, score_total)
+        SELECT user_id,
+               sum(sign),
+               coalesce(sum(sign) FILTER (WHERE status = 'active'), 0),
+               sum(sign * candidate_count),
+               sum(sign * shortlisted_count),
+               sum(sign * score_total)
+        FROM (%s) changes
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id
+        HAVING sum(sign) <> 0
+            OR coalesce(sum(sign) FILTER (WHERE status = 'active'), 0) <> 0
+            OR sum(sign * candidate_count) <> 0
+            OR sum(sign * shortlisted_count) <> 0
+            OR sum(sign * score_total) <> 0
+        ON CONFLICT (user_id) DO UPDATE SET
+            total_jobs = s.total_jobs + EXCLUDED.total_jobs,
+            active_jobs = s.active_jobs + EXCLUDED.active_jobs,
+            total_candidates = s.total_candidates + EXCLUDED.total_candidates,
+            shortlisted = s.shortlisted + EXCLUDED.shortlisted,
+            score_total = s.score_total + EXCLUDED.score_total,
+            updated_at = NOW()
+    $sql$, changes);
+
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO user_stats_daily AS d (user_id, day, jobs_created)
+        SELECT user_id, (NOW() AT TIME ZONE 'UTC')::date, count(*)
+        FROM new_rows
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id
+        ON CONFLICT (user_id, day) DO UPDATE SET
+            jobs_created = d.jobs_created + EXCLUDED.jobs_created;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER jobs_user_stats_insert
+    AFTER INSERT ON jobs REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION jobs_user_stats_update();
+
+CREATE TRIGGER jobs_user_stats_update
+    AFTER UPDATE ON jobs REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION jobs_user_stats_update();
+
+CREATE TRIGGER jobs_user_stats_delete
+    AFTER DELETE ON jobs REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION jobs_user_stats_update();
+
+-- Daily buckets for candidates added and newly shortlisted
+CREATE OR REPLACE FUNCTION candidates_daily_stats_update() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO user_stats_daily AS d (user_id, day, candidates_added, score_total)
+        SELECT j.user_id, (NOW() AT TIME ZONE 'UTC')::date, count(*), coalesce(sum(n.ai_score), 0)
+        FROM new_rows n
+        JOIN jobs j ON j.id = n.job_id
+        GROUP BY j.user_id
+        ON CONFLICT (user_id, day) DO UPDATE SET
+            candidates_added = d.candidates_added + EXCLUDED.candidates_added,
+            score_total = d.score_total + EXCLUDED.score_total;
+    ELSE
+        INSERT INTO user_stats_daily AS d (user_id, day, shortlisted)
+        SELECT j.user_id, (NOW() AT TIME ZONE 'UTC')::date, count(*)
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        JOIN jobs j ON j.id = n.job_id
+        WHERE n.status = 'shortlisted' AND o.status IS DISTINCT FROM 'shortlisted'
+        GROUP BY j.user_id
+        ON CONFLICT (user_id, day) DO UPDATE SET
+            shortlisted = d.shortlisted + EXCLUDED.shortlisted;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER candidates_daily_stats_insert
+    AFTER INSERT ON candidates REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION candidates_daily_stats_update();
+
+CREATE TRIGGER candidates_daily_stats_update
+    AFTER UPDATE ON candidates REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION candidates_daily_stats_update();
+
 -- Email Templates Table
 CREATE TABLE email_templates (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -68,8 +288,11 @@ CREATE TABLE email_logs (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     candidate_id UUID REFERENCES candidates(id) ON DELETE CASCADE,
     template_id UUID REFERENCES email_templates(id),
+    recipient VARCHAR(255),
+    subject VARCHAR(255),
+    body TEXT,
     sent_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-    status VARCHAR(50) DEFAULT 'sent'
+    status VARCHAR(50) DEFAULT 'sent' -- queued, sent, failed
 );
 
 -- Subscriptions Table
@@ -84,9 +307,79 @@ CREATE TABLE subscriptions (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Analysis Cache Table (content-addressed resume analysis results)
+CREATE TABLE analysis_cache (
+    key VARCHAR(64) PRIMARY KEY,
+    prompt_version VARCHAR(20) NOT NULL,
+    result JSONB NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+-- Candidate Imports Table (bulk imports from another ATS; rows_done is the
+-- resume checkpoint and is committed together with each batch of candidates)
+CREATE TABLE candidate_imports (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    user_id UUID REFERENCES users(id) ON DELETE CASCADE,
+    job_id UUID REFERENCES jobs(id) ON DELETE CASCADE,
+    manifest_path TEXT NOT NULL,
+    archive_path TEXT,
+    analyze BOOLEAN NOT NULL DEFAULT TRUE,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending', -- pending, running, completed, failed
+    total_rows INTEGER NOT NULL DEFAULT 0,
+    rows_done INTEGER NOT NULL DEFAULT 0,
+    inserted INTEGER NOT NULL DEFAULT 0,
+    failed_rows INTEGER NOT NULL DEFAULT 0,
+    missing_resumes INTEGER NOT NULL DEFAULT 0,
+    rows_per_sec REAL,
+    error TEXT,
+    owner VARCHAR(255), -- "<hostname>:<pid>" of the worker running it
+    heartbeat_at TIMESTAMP WITH TIME ZONE,
+    started_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
 -- Indexes for performance
 CREATE INDEX idx_jobs_user_id ON jobs(user_id);
 CREATE INDEX idx_jobs_status ON jobs(status);
-CREATE INDEX idx_candidates_job_id ON candidates(job_id);
+CREATE INDEX idx_candidates_job_score ON candidates(job_id, ai_score DESC, id);
+CREATE INDEX idx_candidates_job_created ON candidates(job_id, created_at DESC, id);
 CREATE INDEX idx_candidates_ai_score ON candidates(ai_score DESC);
 CREATE INDEX idx_candidates_status ON candidates(status);
+CREATE INDEX idx_candidates_search_vector ON candidates USING GIN(search_vector);
+CREATE INDEX idx_candidates_skills_matched ON candidates USING GIN(skills_matched);
+CREATE INDEX idx_analysis_cache_expires_at ON analysis_cache(expires_at);
+CREATE INDEX idx_email_templates_user_type ON email_templates(user_id, template_type);
+CREATE INDEX idx_candidate_imports_status ON candidate_imports(status);
+
+-- Rebuild search vectors (run once after changing candidates_search_vector_update)
+-- UPDATE candidates SET name = name;
+
+-- Backfill job counters (run once when adding the counter columns to an existing database)
+-- UPDATE jobs j SET
+--     candidate_count = c.total, new_count = c.new, reviewing_count = c.reviewing,
+--     shortlisted_count = c.shortlisted, rejected_count = c.rejected, hired_count = c.hired,
+--     score_total = c.score
+-- FROM (
+--     SELECT job_id, count(*) AS total,
+--            count(*) FILTER (WHERE status = 'new') AS new,
+--            count(*) FILTER (WHERE status = 'reviewing') AS reviewing,
+--            count(*) FILTER (WHERE status = 'shortlisted') AS shortlisted,
+--            count(*) FILTER (WHERE status = 'rejected') AS rejected,
+--            count(*) FILTER (WHERE status = 'hired') AS hired,
+--            coalesce(sum(ai_score), 0) AS score
+--     FROM candidates GROUP BY job_id
+-- ) c
+-- WHERE j.id = c.job_id;
+
+-- Make ai_score NOT NULL on an existing database (run once)
+-- UPDATE candidates SET ai_score = 0 WHERE ai_score IS NULL;
+-- ALTER TABLE candidates ALTER COLUMN ai_score SET NOT NULL;
+
+-- Backfill user_stats (run once, after the job counter backfill above)
+-- INSERT INTO user_stats (user_id, total_jobs, active_jobs, total_candidates, shortlisted, score_total)
+-- SELECT user_id, count(*), count(*) FILTER (WHERE status = 'active'),
+--        sum(candidate_count), sum(shortlisted_count), sum(score_total)
+-- FROM jobs WHERE user_id IS NOT NULL GROUP BY user_id
+-- ON CONFLICT (user_id) DO NOTHING;
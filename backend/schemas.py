@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
-from datetime import datetime
+from typing import Optional, List, Dict, Literal
+from datetime import datetime, date
 from uuid import UUID
 
 # Auth Schemas
@@ -40,6 +40,9 @@ class JobCreate(BaseModel):
     location: Optional[str] = None
     salary_range: Optional[str] = None
     job_type: Optional[str] = "full-time"
+    prescore_threshold: Optional[int] = None
+    analysis_mode: Optional[Literal["single", "batched"]] = None
+    resume_token_budget: Optional[int] = None
 
 class JobUpdate(BaseModel):
     title: Optional[str] = None
@@ -50,6 +53,9 @@ class JobUpdate(BaseModel):
     salary_range: Optional[str] = None
     job_type: Optional[str] = None
     status: Optional[str] = None
+    prescore_threshold: Optional[int] = None
+    analysis_mode: Optional[Literal["single", "batched"]] = None
+    resume_token_budget: Optional[int] = None
 
 class JobResponse(BaseModel):
     id: UUID
@@ -62,8 +68,13 @@ class JobResponse(BaseModel):
     salary_range: Optional[str]
     job_type: str
     status: str
+    prescore_threshold: Optional[int] = None
+    analysis_mode: Optional[str] = None  # single, batched
+    resume_token_budget: Optional[int] = None
     created_at: datetime
     candidate_count: Optional[int] = 0
+    status_counts: Optional[Dict[str, int]] = None
+    avg_score: Optional[float] = None
 
     class Config:
         from_attributes = True
@@ -85,6 +96,10 @@ class CandidateResponse(BaseModel):
     ai_summary: Optional[str]
     skills_matched: Optional[List[str]]
     experience_years: Optional[int]
+    prescore: Optional[int] = None
+    analysis_source: Optional[str] = None  # llm, prescore, pending
+    resume_tokens: Optional[int] = None
+    compact_tokens: Optional[int] = None
     status: str
     created_at: datetime
 
@@ -94,6 +109,91 @@ class CandidateResponse(BaseModel):
 class CandidateUpdateStatus(BaseModel):
     status: str  # new, reviewing, shortlisted, rejected, hired
 
+class CandidateBulkStatusUpdate(BaseModel):
+    status: str
+    # Either explicit candidates, or a job plus optional filters
+    candidate_ids: Optional[List[UUID]] = None
+    job_id: Optional[UUID] = None
+    current_status: Optional[str] = None
+    min_score: Optional[int] = None
+    max_score: Optional[int] = None
+    send_emails: bool = True
+
+class CandidateBulkStatusResponse(BaseModel):
+    status: str
+    updated: int
+    emails_queued: int
+    emails_skipped: int  # updated candidates with no email address
+    has_more: bool  # a job filter matched more than one request's worth; repeat to continue
+    candidate_ids: List[UUID]
+
+class CandidateSearchHit(BaseModel):
+    id: UUID
+    job_id: UUID
+    name: str
+    email: str
+    ai_score: Optional[int]
+    status: Optional[str]
+    skills_matched: Optional[List[str]]
+    rank: float
+    highlight: Optional[str] = None
+
+class CandidateSearchResponse(BaseModel):
+    items: List[CandidateSearchHit]
+    next_cursor: Optional[str] = None
+
+# Bulk Upload Schemas
+class BatchCreatedResponse(BaseModel):
+    batch_id: str
+    job_id: UUID
+    total: int
+
+class BatchItemStatus(BaseModel):
+    index: int
+    filename: str
+    status: str  # queued, stored, extracted, prescored, analyzed, completed, failed
+    error: Optional[str] = None
+    candidate_id: Optional[UUID] = None
+    prescore: Optional[int] = None
+    analysis_source: Optional[str] = None
+    resume_tokens: Optional[int] = None
+    compact_tokens: Optional[int] = None
+    pages: Optional[int] = None
+    extraction_ms: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+class BatchStatusResponse(BaseModel):
+    batch_id: str
+    job_id: UUID
+    status: str  # processing, completed
+    total: int
+    counts: Dict[str, int]
+    items: List[BatchItemStatus]
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+# ATS Import Schemas
+class ImportStatusResponse(BaseModel):
+    id: UUID
+    job_id: UUID
+    status: str  # pending, running, completed, failed
+    analyze: bool
+    total_rows: int
+    rows_done: int
+    inserted: int
+    failed_rows: int
+    missing_resumes: int
+    rows_per_sec: Optional[float] = None
+    error: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
 # AI Analysis Response
 class AIAnalysisResponse(BaseModel):
     score: int
@@ -103,13 +203,39 @@ class AIAnalysisResponse(BaseModel):
     strengths: List[str]
     concerns: List[str]
 
+class RescoreStatus(BaseModel):
+    job_id: UUID
+    status: str  # pending, running, completed, failed, cancelled
+    total: int
+    processed: int
+    unchanged: int
+    prescored: int
+    cache_hits: int
+    llm_calls: int
+    failed: int
+    error: Optional[str] = None
+    queued_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
 # Dashboard Stats
+class DashboardStatsBucket(BaseModel):
+    day: date
+    jobs_created: int
+    candidates_added: int
+    shortlisted: int
+    avg_score: Optional[float] = None
+
 class DashboardStats(BaseModel):
     total_jobs: int
     active_jobs: int
     total_candidates: int
     shortlisted: int
     avg_score: float
+    series: List[DashboardStatsBucket] = []
 
 # Subscription
 class SubscriptionCreate(BaseModel):
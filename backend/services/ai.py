@@ -1,5 +1,9 @@
+import asyncio
 import google.generativeai as genai
 from config import get_settings
+from services.llm import llm_client
+from services.emails import DEFAULT_TEMPLATES
+from typing import AsyncIterator, Optional
 import json
 import re
 
@@ -8,23 +12,11 @@ settings = get_settings()
 if settings.gemini_api_key:
     genai.configure(api_key=settings.gemini_api_key)
 
-async def analyze_resume(resume_text: str, job_description: str, required_skills: list[str]) -> dict:
-    """Analyze a resume against a job description using Gemini AI."""
-    
-    if not settings.gemini_api_key:
-        # Return mock data if no API key
-        return {
-            "score": 75,
-            "summary": "Strong candidate with relevant experience.",
-            "skills_matched": required_skills[:3] if required_skills else ["Python", "JavaScript"],
-            "experience_years": 5,
-            "strengths": ["Good technical background", "Relevant industry experience"],
-            "concerns": ["May need training on specific tools"]
-        }
-    
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    
-    prompt = f"""You are an expert HR recruiter AI. Analyze the following resume against the job description.
+# Bump whenever the analysis prompt changes so cached results are not reused.
+PROMPT_VERSION = "1"
+
+def resume_analysis_prompt(resume_text: str, job_description: str, required_skills: list[str]) -> str:
+    return f"""You are an expert HR recruiter AI. Analyze the following resume against the job description.
 
 JOB DESCRIPTION:
 {job_description}
@@ -45,15 +37,41 @@ Provide your analysis in the following JSON format ONLY (no other text):
     "concerns": ["<any red flags or areas of concern>"]
 }}
 """
+
+async def analyze_resume(
+    resume_text: str,
+    job_description: str,
+    required_skills: list[str],
+    tenant_id: Optional[str] = None
+) -> dict:
+    """Analyze a resume against a job description using Gemini AI.
+
+    Mock and error results carry ``"fallback": True`` so callers can avoid
+    caching them.
+    """
+    
+    if not settings.gemini_api_key:
+        # Return mock data if no API key
+        return {
+            "score": 75,
+            "summary": "Strong candidate with relevant experience.",
+            "skills_matched": required_skills[:3] if required_skills else ["Python", "JavaScript"],
+            "experience_years": 5,
+            "strengths": ["Good technical background", "Relevant industry experience"],
+            "concerns": ["May need training on specific tools"],
+            "fallback": True
+        }
+    
+    prompt = resume_analysis_prompt(resume_text, job_description, required_skills)
     
     try:
-        response = model.generate_content(prompt)
-        text = response.text.strip()
+        text = (await llm_client.generate(prompt, tenant_id=tenant_id)).strip()
         
         # Extract JSON from response
         json_match = re.search(r'\{[\s\S]*\}', text)
-        if json_match:
-            return json.loads(json_match.group())
+        analysis = _valid_analysis(json.loads(json_match.group())) if json_match else None
+        if analysis:
+            return analysis
         
         return {
             "score": 50,
@@ -61,7 +79,8 @@ Provide your analysis in the following JSON format ONLY (no other text):
             "skills_matched": [],
             "experience_years": 0,
             "strengths": [],
-            "concerns": ["AI analysis incomplete"]
+            "concerns": ["AI analysis incomplete"],
+            "fallback": True
         }
     except Exception as e:
         print(f"AI Analysis error: {e}")
@@ -71,18 +90,153 @@ Provide your analysis in the following JSON format ONLY (no other text):
             "skills_matched": [],
             "experience_years": 0,
             "strengths": [],
-            "concerns": [str(e)]
+            "concerns": [str(e) or type(e).__name__],
+            "fallback": True
         }
 
-async def generate_job_description(title: str, skills: list[str]) -> str:
-    """Generate a job description using AI."""
-    
-    if not settings.gemini_api_key:
-        return f"We are looking for a talented {title} to join our team. The ideal candidate will have experience with {', '.join(skills) if skills else 'relevant technologies'}."
-    
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    
-    prompt = f"""Generate a professional job description for the following role:
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token) for budgeting prompts."""
+    return len(text or "") // 4 + 1
+
+def batch_analysis_prompt(resume_texts: list[str], job_description: str, required_skills: list[str]) -> str:
+    resumes = "\n\n".join(
+        f"<<<RESUME r{i}>>>\n{text}\n<<<END r{i}>>>" for i, text in enumerate(resume_texts)
+    )
+    return f"""You are an expert HR recruiter AI. Analyze each of the following resumes against the job description, independently of each other.
+
+JOB DESCRIPTION:
+{job_description}
+
+REQUIRED SKILLS:
+{', '.join(required_skills) if required_skills else 'Not specified'}
+
+RESUMES:
+{resumes}
+
+Provide your analysis as a JSON array ONLY (no other text), with exactly one object per resume:
+[
+    {{
+        "id": "<resume id, e.g. r0>",
+        "score": <0-100 integer representing match percentage>,
+        "summary": "<2-3 sentence summary of the candidate>",
+        "skills_matched": ["<list of skills from required that candidate has>"],
+        "experience_years": <estimated years of relevant experience>,
+        "strengths": ["<3-5 key strengths>"],
+        "concerns": ["<any red flags or areas of concern>"]
+    }}
+]
+"""
+
+def plan_analysis_batches(resume_texts: list[str], job_description: str, required_skills: list[str]) -> list[list[int]]:
+    """Group resume indexes so each batched prompt fits the token budget."""
+    base = estimate_tokens(batch_analysis_prompt([], job_description, required_skills))
+    groups, current, used = [], [], base
+    for i, text in enumerate(resume_texts):
+        cost = estimate_tokens(text) + settings.analysis_batch_output_tokens_per_resume
+        if current and (used + cost > settings.analysis_batch_token_budget or len(current) >= settings.analysis_batch_max_resumes):
+            groups.append(current)
+            current, used = [], base
+        current.append(i)
+        used += cost
+    if current:
+        groups.append(current)
+    return groups
+
+def _valid_analysis(entry) -> Optional[dict]:
+    """``entry`` with an integer score and every analysis field, or None if it has no usable score."""
+    if not isinstance(entry, dict):
+        return None
+    try:
+        entry["score"] = int(entry["score"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    entry.setdefault("summary", "")
+    entry.setdefault("skills_matched", [])
+    entry.setdefault("experience_years", 0)
+    entry.setdefault("strengths", [])
+    entry.setdefault("concerns", [])
+    return entry
+
+def _parse_batch_response(text: str, count: int) -> dict[int, dict]:
+    """Map resume index -> analysis for every well-formed entry in the reply."""
+    match = re.search(r'\[[\s\S]*\]', text)
+    if not match:
+        return {}
+    results = {}
+    for entry in json.loads(match.group()):
+        if not isinstance(entry, dict):
+            continue
+        id_match = re.fullmatch(r"r(\d+)", str(entry.pop("id", "")))
+        if not id_match or int(id_match.group(1)) >= count:
+            continue
+        entry = _valid_analysis(entry)
+        if entry:
+            results[int(id_match.group(1))] = entry
+    return results
+
+async def _analyze_group(
+    resume_texts: list[str],
+    job_description: str,
+    required_skills: list[str],
+    tenant_id: Optional[str]
+) -> list[dict]:
+    if len(resume_texts) == 1:
+        return [await analyze_resume(resume_texts[0], job_description, required_skills, tenant_id=tenant_id)]
+
+    prompt = batch_analysis_prompt(resume_texts, job_description, required_skills)
+    try:
+        text = await llm_client.generate(prompt, tenant_id=tenant_id)
+        results = _parse_batch_response(text, len(resume_texts))
+    except Exception as e:
+        print(f"AI batch analysis error ({len(resume_texts)} resumes): {e}")
+        results = {}
+
+    missing = [i for i in range(len(resume_texts)) if i not in results]
+    if missing:
+        # Split whatever failed in half and retry; single resumes use the normal prompt.
+        half = (len(missing) + 1) // 2
+        parts = [part for part in (missing[:half], missing[half:]) if part]
+        retried = await asyncio.gather(*(
+            _analyze_group([resume_texts[i] for i in part], job_description, required_skills, tenant_id)
+            for part in parts
+        ))
+        for part, analyses in zip(parts, retried):
+            results.update(zip(part, analyses))
+    return [results[i] for i in range(len(resume_texts))]
+
+async def analyze_resumes_batched(
+    resume_texts: list[str],
+    job_description: str,
+    required_skills: list[str],
+    tenant_id: Optional[str] = None
+) -> list[dict]:
+    """Analyze several resumes for one job, packing them into shared prompts.
+
+    The job description and skills are sent once per prompt instead of once
+    per resume.  Resumes a batched reply does not cover are split off and
+    retried, down to single-resume requests.  Results come back in input
+    order, with ``"fallback": True`` on mock and error results as in
+    ``analyze_resume``.
+    """
+    if not settings.gemini_api_key or len(resume_texts) <= 1:
+        return [
+            await analyze_resume(text, job_description, required_skills, tenant_id=tenant_id)
+            for text in resume_texts
+        ]
+
+    groups = plan_analysis_batches(resume_texts, job_description, required_skills)
+    analyses = await asyncio.gather(*(
+        _analyze_group([resume_texts[i] for i in group], job_description, required_skills, tenant_id)
+        for group in groups
+    ))
+    results = [None] * len(resume_texts)
+    for group, group_analyses in zip(groups, analyses):
+        for i, analysis in zip(group, group_analyses):
+            results[i] = analysis
+    return results
+
+def _job_description_prompt(title: str, skills: list[str]) -> str:
+    return f"""Generate a professional job description for the following role:
 
 Title: {title}
 Required Skills: {', '.join(skills) if skills else 'To be determined'}
@@ -94,28 +248,43 @@ Write a compelling 2-3 paragraph job description that includes:
 
 Keep it concise and professional."""
 
+async def generate_job_description(title: str, skills: list[str], tenant_id: Optional[str] = None) -> str:
+    """Generate a job description using AI."""
+    
+    if not settings.gemini_api_key:
+        return f"We are looking for a talented {title} to join our team. The ideal candidate will have experience with {', '.join(skills) if skills else 'relevant technologies'}."
+    
+    prompt = _job_description_prompt(title, skills)
+
     try:
-        response = model.generate_content(prompt)
-        return response.text.strip()
+        return (await llm_client.generate(prompt, tenant_id=tenant_id)).strip()
     except Exception as e:
         return f"We are looking for a talented {title} to join our team."
 
-async def generate_candidate_email(candidate_name: str, status: str, job_title: str) -> dict:
-    """Generate an email for a candidate based on their status."""
+async def stream_job_description(title: str, skills: list[str], tenant_id: Optional[str] = None) -> AsyncIterator[str]:
+    """Generate a job description, yielding text as it is produced.
+
+    Errors before any text fall back to a stock description; errors after
+    some text has been yielded are raised, so callers can tell a truncated
+    description from a finished one.
+    """
     
-    templates = {
-        "received": {
-            "subject": f"Application Received - {job_title}",
-            "body": f"Dear {candidate_name},\n\nThank you for applying for the {job_title} position. We have received your application and our team is reviewing it carefully.\n\nWe will be in touch soon regarding next steps.\n\nBest regards,\nThe Hiring Team"
-        },
-        "shortlisted": {
-            "subject": f"Great News! You've Been Shortlisted - {job_title}",
-            "body": f"Dear {candidate_name},\n\nWe are pleased to inform you that you have been shortlisted for the {job_title} position!\n\nOur team was impressed with your qualifications. We will reach out shortly to schedule an interview.\n\nBest regards,\nThe Hiring Team"
-        },
-        "rejected": {
-            "subject": f"Application Update - {job_title}",
-            "body": f"Dear {candidate_name},\n\nThank you for your interest in the {job_title} position. After careful consideration, we have decided to move forward with other candidates whose experience more closely matches our current needs.\n\nWe appreciate your time and wish you success in your job search.\n\nBest regards,\nThe Hiring Team"
-        }
-    }
+    if not settings.gemini_api_key:
+        yield await generate_job_description(title, skills)
+        return
     
-    return templates.get(status, templates["received"])
+    sent_any = False
+    try:
+        async for chunk in llm_client.stream(_job_description_prompt(title, skills), tenant_id=tenant_id):
+            sent_any = True
+            yield chunk
+    except Exception as e:
+        if sent_any:
+            raise
+        print(f"Job description stream error: {e}")
+        yield f"We are looking for a talented {title} to join our team."
+
+async def generate_candidate_email(candidate_name: str, status: str, job_title: str) -> dict:
+    """Generate an email for a candidate based on their status."""
+    template = DEFAULT_TEMPLATES.get(status, DEFAULT_TEMPLATES["received"])
+    return template.render(candidate_name=candidate_name, job_title=job_title)
@@ -0,0 +1,197 @@
+"""Content-addressed cache for resume analysis results.
+
+Results are keyed by a hash of the normalized resume text, job description,
+skills and prompt version, so re-analyzing unchanged inputs never reaches
+Gemini.  Lookups check an in-process LRU first and the ``analysis_cache``
+table second; both tiers expire entries after ``analysis_cache_ttl_seconds``.
+"""
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.postgresql import insert
+from config import get_settings
+from database import AsyncSessionLocal
+from models import AnalysisCacheEntry
+from services.ai import analyze_resume, analyze_resumes_batched, PROMPT_VERSION
+
+settings = get_settings()
+
+# Expired rows are pruned from the table once every this many writes.
+PRUNE_EVERY_WRITES = 500
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def _normalize(text: str) -> str:
+    return _WHITESPACE_RE.sub(" ", text or "").strip()
+
+def cache_key(resume_text: str, job_description: str, skills: list[str]) -> str:
+    """Hash the analysis inputs into a stable cache key."""
+    normalized_skills = sorted({s.strip().lower() for s in skills or [] if s and s.strip()})
+    payload = json.dumps(
+        [PROMPT_VERSION, _normalize(resume_text), _normalize(job_description), normalized_skills],
+        ensure_ascii=False,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class AnalysisCache:
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+        self._writes = 0
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.evictions = 0
+
+    def _get_memory(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.evictions += 1
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+    def _put_memory(self, key: str, result: dict, ttl_seconds: Optional[float] = None):
+        self._entries[key] = (time.monotonic() + (ttl_seconds or self.ttl_seconds), result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get(self, key: str) -> Optional[dict]:
+        result = self._get_memory(key)
+        if result is not None:
+            self.memory_hits += 1
+            return result
+
+        try:
+            async with AsyncSessionLocal() as db:
+                row = (await db.execute(
+                    select(AnalysisCacheEntry.result, AnalysisCacheEntry.expires_at).where(
+                        AnalysisCacheEntry.key == key,
+                        AnalysisCacheEntry.expires_at > datetime.now(timezone.utc)
+                    )
+                )).first()
+        except Exception as e:
+            print(f"Analysis cache read error: {e}")
+            row = None
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.db_hits += 1
+        remaining = (row.expires_at - datetime.now(timezone.utc)).total_seconds()
+        self._put_memory(key, row.result, max(remaining, 1))
+        return row.result
+
+    async def put(self, key: str, result: dict):
+        self._put_memory(key, result)
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds)
+        stmt = insert(AnalysisCacheEntry).values(
+            key=key, prompt_version=PROMPT_VERSION, result=result, expires_at=expires_at
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AnalysisCacheEntry.key],
+            set_={"result": stmt.excluded.result, "expires_at": stmt.excluded.expires_at}
+        )
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(stmt)
+                self._writes += 1
+                if self._writes % PRUNE_EVERY_WRITES == 0:
+                    await db.execute(
+                        delete(AnalysisCacheEntry).where(
+                            AnalysisCacheEntry.expires_at <= datetime.now(timezone.utc)
+                        )
+                    )
+                await db.commit()
+        except Exception as e:
+            print(f"Analysis cache write error: {e}")
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.db_hits + self.misses
+        return {
+            "memory_entries": len(self._entries),
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "bypasses": self.bypasses,
+            "evictions": self.evictions,
+            "hit_rate": (self.memory_hits + self.db_hits) / lookups if lookups else 0.0,
+        }
+
+analysis_cache = AnalysisCache(
+    max_entries=settings.analysis_cache_memory_size,
+    ttl_seconds=settings.analysis_cache_ttl_seconds
+)
+
+async def cached_analyze_resume(
+    resume_text: str,
+    job_description: str,
+    required_skills: list[str],
+    tenant_id: Optional[str] = None,
+    bypass_cache: bool = False
+) -> dict:
+    """Return a cached analysis for these inputs, running Gemini only on a miss.
+
+    With ``bypass_cache`` the lookup is skipped but the fresh result is still
+    stored.  Fallback results (mock data or errors) are never cached.
+    """
+    if not settings.analysis_cache_enabled:
+        return await analyze_resume(resume_text, job_description, required_skills, tenant_id=tenant_id)
+
+    key = cache_key(resume_text, job_description, required_skills)
+    if bypass_cache:
+        analysis_cache.bypasses += 1
+    else:
+        cached = await analysis_cache.get(key)
+        if cached is not None:
+            return dict(cached)
+
+    analysis = await analyze_resume(resume_text, job_description, required_skills, tenant_id=tenant_id)
+    if not analysis.get("fallback"):
+        await analysis_cache.put(key, analysis)
+    return analysis
+
+async def cached_analyze_resumes(
+    resume_texts: list[str],
+    job_description: str,
+    required_skills: list[str],
+    tenant_id: Optional[str] = None
+) -> list[dict]:
+    """Batched counterpart of ``cached_analyze_resume`` for resumes of one job.
+
+    Cache misses are analyzed together with ``analyze_resumes_batched``.
+    """
+    if not settings.analysis_cache_enabled:
+        return await analyze_resumes_batched(resume_texts, job_description, required_skills, tenant_id=tenant_id)
+
+    keys = [cache_key(text, job_description, required_skills) for text in resume_texts]
+    results = []
+    for key in keys:
+        cached = await analysis_cache.get(key)
+        results.append(dict(cached) if cached is not None else None)
+
+    misses = [i for i, result in enumerate(results) if result is None]
+    if misses:
+        analyses = await analyze_resumes_batched(
+            [resume_texts[i] for i in misses], job_description, required_skills, tenant_id=tenant_id
+        )
+        for i, analysis in zip(misses, analyses):
+            results[i] = analysis
+            if not analysis.get("fallback"):
+                await analysis_cache.put(keys[i], analysis)
+    return results
@@ -0,0 +1,410 @@
+"""Bulk import of candidates from another ATS.
+
+An import is a CSV manifest (one row per candidate) plus an optional ZIP of
+resumes referenced by filename from the manifest.  Both are streamed into the
+blob store when uploaded; the archive is never unpacked as a whole.  The
+import then runs in the background, ``import_batch_size`` manifest rows at a
+time:
+
+1. read the next rows from the manifest;
+2. decompress the resumes they reference into the blob store, one member at
+   a time, and extract their text in the extraction pool;
+3. pre-score them in one vectorized pass; candidates below the job's
+   threshold get their local analysis straight away;
+4. write the candidates with one multi-row INSERT, and advance the import's
+   ``rows_done`` checkpoint in the same transaction.
+
+Gemini is not called during the import.  Candidates above the threshold are
+stored with ``analysis_source = "pending"``.  If the import was started with
+``analyze``, a background re-score of the job analyzes them once the import
+completes.
+
+Because the checkpoint and the rows are committed together, a crashed import
+resumes exactly where it stopped.  The worker running an import records
+itself as ``owner`` and heartbeats every ``import_heartbeat_seconds``; every
+``import_sweep_interval_seconds`` each worker picks up, from ``rows_done``,
+imports whose heartbeat is older than ``import_lease_seconds`` or whose owner
+was a process on the same host that has since exited (a restarted worker).
+A batch is only committed while its worker still owns the import at the
+expected checkpoint, so a taken-over import never inserts a batch twice.
+"""
+import asyncio
+import csv
+import itertools
+import os
+import socket
+import time
+import uuid
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from uuid import UUID
+from sqlalchemy import select, update, insert, or_, and_
+from config import get_settings
+from database import AsyncSessionLocal
+from models import Job, Candidate, CandidateImport
+from services.extraction import extract_resume_text
+from services.prescoring import JobProfile, prescore_threshold, local_analysis
+from services.rescoring import scoring_key, schedule_rescore
+from services.storage import StoredBlob, blob_store
+from services.events import event_bus, job_channel
+
+settings = get_settings()
+
+# Manifest column -> header names used by common ATS exports (lowercased)
+MANIFEST_HEADERS = {
+    "name": ("name", "full name", "candidate name", "candidate"),
+    "first_name": ("first name", "firstname", "given name"),
+    "last_name": ("last name", "lastname", "surname", "family name"),
+    "email": ("email", "email address", "e-mail", "candidate email"),
+    "phone": ("phone", "phone number", "mobile", "telephone"),
+    "resume": ("resume", "resume file", "resume filename", "cv", "attachment", "file", "filename"),
+    "status": ("status", "stage"),
+}
+_HEADERS = {alias: field for field, aliases in MANIFEST_HEADERS.items() for alias in aliases}
+
+CANDIDATE_STATUSES = ("new", "reviewing", "shortlisted", "rejected", "hired")
+
+@dataclass
+class ManifestRow:
+    name: str
+    email: str
+    phone: Optional[str]
+    resume: Optional[str]
+    status: str
+
+def _open_manifest(path: str):
+    return open(path, newline="", encoding="utf-8-sig", errors="replace")
+
+def _read_header(path: str) -> dict[str, int]:
+    """Map manifest fields to column positions; raises ``ValueError``."""
+    with _open_manifest(path) as f:
+        header = next(csv.reader(f), None)
+    if not header:
+        raise ValueError("The manifest is empty")
+    columns = {}
+    for i, title in enumerate(header):
+        field = _HEADERS.get(" ".join(title.strip().lower().replace("_", " ").split()))
+        if field and field not in columns:
+            columns[field] = i
+    if not {"name", "first_name", "last_name", "email"} & columns.keys():
+        raise ValueError("The manifest needs a name or email column")
+    return columns
+
+def inspect_manifest(path: str) -> int:
+    """Validate the header and count data rows; raises ``ValueError``."""
+    _read_header(path)
+    with _open_manifest(path) as f:
+        return max(0, sum(1 for _ in csv.reader(f)) - 1)
+
+def _parse_row(row: list[str], columns: dict[str, int]) -> Optional[ManifestRow]:
+    def get(field):
+        i = columns.get(field)
+        value = row[i].strip() if i is not None and i < len(row) else ""
+        return value or None
+
+    email = get("email") or ""
+    name = get("name") or " ".join(filter(None, (get("first_name"), get("last_name"))))
+    if not name and email:
+        name = email.split("@")[0]
+    if not name:
+        return None
+    status = (get("status") or "new").lower()
+    phone = get("phone")
+    return ManifestRow(
+        name=name[:255],
+        email=email[:255],
+        phone=phone[:50] if phone else None,
+        resume=get("resume"),
+        status=status if status in CANDIDATE_STATUSES else "new",
+    )
+
+def _archive_index(archive_path: str) -> dict[str, str]:
+    """Archive members by lowercased basename, read from the central directory only."""
+    index = {}
+    with zipfile.ZipFile(archive_path) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or info.filename.startswith("__MACOSX/"):
+                continue
+            index.setdefault(os.path.basename(info.filename).lower(), info.filename)
+    return index
+
+def _emit(record: CandidateImport):
+    event_bus.publish(job_channel(record.job_id), "import", {
+        "import_id": record.id,
+        "job_id": record.job_id,
+        "status": record.status,
+        "total_rows": record.total_rows,
+        "rows_done": record.rows_done,
+        "inserted": record.inserted,
+        "rows_per_sec": record.rows_per_sec,
+    })
+
+class LeaseLost(Exception):
+    """Another worker has taken over the import."""
+
+_HOST = socket.gethostname()
+_tasks: set[asyncio.Task] = set()
+_running: set[UUID] = set()
+
+def _owner() -> str:
+    # Computed per call: workers forked after import have their own pid.
+    return f"{_HOST}:{os.getpid()}"
+
+def _owner_is_gone(owner: Optional[str]) -> bool:
+    """Whether ``owner`` was a process on this host that is no longer running the import."""
+    host, _, pid = (owner or "").rpartition(":")
+    if host != _HOST or not pid.isdigit():
+        return False
+    if int(pid) == os.getpid():
+        # Our pid, but not one of our tasks: a restarted container reusing the pid.
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        return False
+    return False
+
+def start_import(import_id: UUID, takeover_owner: Optional[str] = None):
+    if import_id in _running:
+        return
+    _running.add(import_id)
+    task = asyncio.create_task(_run_import(import_id, takeover_owner))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    task.add_done_callback(lambda _: _running.discard(import_id))
+
+async def resume_imports():
+    """Restart imports left unfinished by a crashed or restarted worker."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.import_lease_seconds)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(CandidateImport.id, CandidateImport.owner, CandidateImport.heartbeat_at).where(
+                CandidateImport.status.in_(("pending", "running"))
+            )
+        )
+        rows = result.all()
+    for import_id, owner, heartbeat_at in rows:
+        if import_id in _running:
+            continue
+        if heartbeat_at is None or heartbeat_at < cutoff:
+            print(f"Resuming candidate import {import_id}")
+            start_import(import_id)
+        elif _owner_is_gone(owner):
+            print(f"Resuming candidate import {import_id} from exited worker {owner}")
+            start_import(import_id, takeover_owner=owner)
+
+async def run_import_sweeper():
+    """Resume orphaned imports now and every ``import_sweep_interval_seconds``."""
+    while True:
+        try:
+            await resume_imports()
+        except Exception as e:
+            print(f"Could not resume candidate imports: {e}")
+        await asyncio.sleep(settings.import_sweep_interval_seconds)
+
+async def _claim(import_id: UUID, takeover_owner: Optional[str] = None) -> Optional[CandidateImport]:
+    """Mark the import as running here, unless another live worker holds it."""
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(seconds=settings.import_lease_seconds)
+    takeover = [CandidateImport.heartbeat_at.is_(None), CandidateImport.heartbeat_at < cutoff]
+    if takeover_owner:
+        takeover.append(CandidateImport.owner == takeover_owner)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(CandidateImport)
+            .where(
+                CandidateImport.id == import_id,
+                or_(
+                    CandidateImport.status == "pending",
+                    and_(CandidateImport.status == "running", or_(*takeover))
+                )
+            )
+            .values(status="running", owner=_owner(), heartbeat_at=now, started_at=now)
+            .returning(CandidateImport)
+            .execution_options(synchronize_session=False)
+        )
+        record = result.scalar_one_or_none()
+        await db.commit()
+        return record
+
+async def _load_resumes(
+    record: CandidateImport,
+    index: dict[str, str],
+    rows: list[ManifestRow]
+) -> tuple[list[str], list[Optional[str]]]:
+    """Store and extract the resumes referenced by ``rows``; returns their texts and blob paths."""
+    members = {}
+    for i, row in enumerate(rows):
+        if row.resume and record.archive_path:
+            member = index.get(os.path.basename(row.resume.replace("\\", "/")).lower())
+            if member:
+                members[i] = member
+    blobs = await blob_store.save_archive_members(record.archive_path, sorted(set(members.values()))) if members else {}
+
+    slots = asyncio.Semaphore(max(1, settings.pipeline_extract_concurrency))
+    texts = [""] * len(rows)
+    paths: list[Optional[str]] = [None] * len(rows)
+
+    async def extract(i: int, blob: StoredBlob):
+        async with slots:
+            extraction = await extract_resume_text(blob.path)
+        texts[i] = extraction.text
+        paths[i] = blob.path
+
+    await asyncio.gather(*(
+        extract(i, blobs[member]) for i, member in members.items()
+        if isinstance(blobs.get(member), StoredBlob)
+    ))
+    record.missing_resumes += sum(1 for i, row in enumerate(rows) if row.resume and paths[i] is None)
+    return texts, paths
+
+async def _heartbeat(import_id: UUID):
+    """Keep the lease fresh however long a batch takes; stops once the lease is lost."""
+    while True:
+        await asyncio.sleep(settings.import_heartbeat_seconds)
+        try:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    update(CandidateImport)
+                    .where(
+                        CandidateImport.id == import_id,
+                        CandidateImport.owner == _owner(),
+                        CandidateImport.status == "running"
+                    )
+                    .values(heartbeat_at=datetime.now(timezone.utc))
+                )
+                await db.commit()
+            if result.rowcount == 0:
+                return
+        except Exception as e:
+            print(f"Candidate import {import_id} heartbeat failed: {e}")
+
+async def _run_import(import_id: UUID, takeover_owner: Optional[str] = None):
+    record = await _claim(import_id, takeover_owner)
+    if record is None:
+        return
+    _emit(record)
+    heartbeat = asyncio.create_task(_heartbeat(import_id))
+
+    try:
+        async with AsyncSessionLocal() as db:
+            job = await db.get(Job, record.job_id)
+            if job is None:
+                raise ValueError("Job not found")
+            profile = JobProfile.from_job(job)
+            threshold = prescore_threshold(job)
+            key = scoring_key(job)
+
+        columns = await asyncio.to_thread(_read_header, record.manifest_path)
+        index = await asyncio.to_thread(_archive_index, record.archive_path) if record.archive_path else {}
+        manifest = await asyncio.to_thread(_open_manifest, record.manifest_path)
+        started = time.perf_counter()
+        rows_this_run = 0
+        try:
+            reader = csv.reader(manifest)
+            # Skip the header and every row committed before a restart.
+            await asyncio.to_thread(lambda: sum(1 for _ in itertools.islice(reader, record.rows_done + 1)))
+            while True:
+                raw = await asyncio.to_thread(lambda: list(itertools.islice(reader, settings.import_batch_size)))
+                if not raw:
+                    break
+                parsed = [_parse_row(row, columns) for row in raw]
+                rows = [row for row in parsed if row is not None]
+                texts, paths = await _load_resumes(record, index, rows)
+                scores = profile.score_many(texts) if rows else []
+
+                candidates = []
+                for row, text, path, prescore in zip(rows, texts, paths, scores):
+                    values = {
+                        "id": uuid.uuid4(),
+                        "job_id": record.job_id,
+                        "name": row.name,
+                        "email": row.email,
+                        "phone": row.phone,
+                        "resume_url": path,
+                        "resume_text": text,
+                        "status": row.status,
+                        "prescore": prescore.score,
+                    }
+                    if prescore.score < threshold:
+                        analysis = local_analysis(prescore, threshold)
+                        values.update(
+                            ai_score=analysis["score"],
+                            ai_summary=analysis["summary"],
+                            skills_matched=analysis["skills_matched"],
+                            experience_years=analysis["experience_years"],
+                            analysis_source="prescore",
+                            scoring_key=key,
+                        )
+                    else:
+                        values.update(ai_score=0, analysis_source="pending", scoring_key=None)
+                    candidates.append(values)
+
+                checkpoint = record.rows_done
+                record.rows_done += len(raw)
+                record.inserted += len(candidates)
+                record.failed_rows += len(raw) - len(rows)
+                rows_this_run += len(raw)
+                record.rows_per_sec = round(rows_this_run / max(time.perf_counter() - started, 1e-6), 1)
+                async with AsyncSessionLocal() as db:
+                    if candidates:
+                        await db.execute(insert(Candidate), candidates)
+                    result = await db.execute(
+                        update(CandidateImport)
+                        .where(
+                            CandidateImport.id == import_id,
+                            CandidateImport.owner == _owner(),
+                            CandidateImport.rows_done == checkpoint
+                        )
+                        .values(
+                            rows_done=record.rows_done,
+                            inserted=record.inserted,
+                            failed_rows=record.failed_rows,
+                            missing_resumes=record.missing_resumes,
+                            rows_per_sec=record.rows_per_sec,
+                            heartbeat_at=datetime.now(timezone.utc),
+                        )
+                    )
+                    if result.rowcount != 1:
+                        await db.rollback()
+                        raise LeaseLost(f"taken over by another worker at row {checkpoint}")
+                    await db.commit()
+                _emit(record)
+        finally:
+            manifest.close()
+
+        record.status = "completed"
+        elapsed = time.perf_counter() - started
+        print(
+            f"Candidate import {import_id}: {record.inserted} candidates from {record.rows_done} rows, "
+            f"{rows_this_run} rows this run in {elapsed:.1f} s ({record.rows_per_sec or 0:.0f} rows/s)"
+        )
+    except LeaseLost as e:
+        print(f"Candidate import {import_id} stopped here: {e}")
+        return
+    except Exception as e:
+        print(f"Candidate import {import_id} failed: {e}")
+        record.status = "failed"
+        record.error = str(e)
+    finally:
+        heartbeat.cancel()
+
+    record.finished_at = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(CandidateImport)
+            .where(CandidateImport.id == import_id, CandidateImport.owner == _owner())
+            .values(status=record.status, error=record.error, finished_at=record.finished_at)
+        )
+        await db.commit()
+    if result.rowcount != 1:
+        print(f"Candidate import {import_id} was taken over before it finished here")
+        return
+    _emit(record)
+
+    if record.status == "completed" and record.analyze:
+        schedule_rescore(record.job_id, record.user_id, llm_inputs_changed=False)
@@ -0,0 +1,251 @@
+"""Resume compaction: the text that is actually sent to Gemini.
+
+Extracted resume text is full of material that costs tokens without helping
+the analysis: repeated page headers and footers, page numbers, contact
+details, references and hobbies.  ``compact_resume``:
+
+1. normalizes whitespace and drops page furniture (repeated headers and
+   footers, page numbers) and contact lines;
+2. splits the text into sections by their headings;
+3. drops low-value sections (references, interests, personal details);
+4. fits the rest into the job's token budget, filling sections in priority
+   order (summary, skills, experience, ...) and truncating at line and word
+   boundaries.
+
+The result only depends on the text and the budget, so it is computed once
+per candidate, stored, and reused by re-analysis.  Pre-scoring still uses the
+full text.
+"""
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional
+from config import get_settings
+from services.ai import estimate_tokens
+
+settings = get_settings()
+
+SECTION_ALIASES = {
+    "summary": ("summary", "professional summary", "profile", "professional profile", "objective",
+                "career objective", "about me", "about"),
+    "skills": ("skills", "technical skills", "key skills", "core skills", "competencies", "core competencies",
+               "technologies", "tech stack", "tools", "skills and tools"),
+    "experience": ("experience", "work experience", "professional experience", "employment",
+                   "employment history", "work history", "career history", "relevant experience"),
+    "projects": ("projects", "key projects", "personal projects", "selected projects"),
+    "education": ("education", "academic background", "qualifications", "education and training"),
+    "certifications": ("certifications", "certificates", "licenses", "licenses and certifications",
+                       "courses", "training", "awards", "achievements", "honors and awards"),
+    "languages": ("languages",),
+    "references": ("references", "referees"),
+    "interests": ("interests", "hobbies", "hobbies and interests", "activities", "extracurricular activities"),
+    "personal": ("personal details", "personal information", "personal data", "declaration"),
+}
+_HEADINGS = {alias: section for section, aliases in SECTION_ALIASES.items() for alias in aliases}
+
+DROPPED_SECTIONS = frozenset({"references", "interests", "personal"})
+
+# Sections are filled in this order when the budget is tight.
+SECTION_PRIORITY = ("summary", "skills", "experience", "projects", "education", "certifications", "languages", "other")
+
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_PHONE_RE = re.compile(r"\+?\d[\d\s().-]{7,}\d")
+_YEAR_RANGE_RE = re.compile(r"\(?(?:19|20)\d{2}\)?(?:\s*[-\u2013\u2014]\s*\(?(?:19|20)\d{2}\)?)*")
+_URL_RE = re.compile(r"(?:https?://|www\.)\S+|\b(?:linkedin|github)\.com/\S*", re.IGNORECASE)
+_PAGE_RE = re.compile(r"^page\s*\d+(?:\s*(?:of|/)\s*\d+)?$", re.IGNORECASE)
+_BARE_NUMBER_RE = re.compile(r"^-?\s*(\d{1,3})\s*-?$")
+_SPACE_RE = re.compile(r"[^\S\n]+")
+_HEADING_RE = re.compile(r"[^a-z& ]+")
+
+@dataclass
+class CompactResume:
+    text: str
+    original_tokens: int
+    compact_tokens: int
+    truncated: bool
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.original_tokens - self.compact_tokens)
+
+class CompactionStats:
+    def __init__(self):
+        self.resumes = 0
+        self.original_tokens = 0
+        self.compact_tokens = 0
+        self.truncated = 0
+
+    def record(self, result: CompactResume):
+        self.resumes += 1
+        self.original_tokens += result.original_tokens
+        self.compact_tokens += result.compact_tokens
+        self.truncated += int(result.truncated)
+
+    def to_dict(self) -> dict:
+        saved = self.original_tokens - self.compact_tokens
+        return {
+            "resumes": self.resumes,
+            "original_tokens": self.original_tokens,
+            "compact_tokens": self.compact_tokens,
+            "tokens_saved": saved,
+            "avg_tokens_saved": round(saved / self.resumes, 1) if self.resumes else 0.0,
+            "saved_ratio": round(saved / self.original_tokens, 3) if self.original_tokens else 0.0,
+            "truncated": self.truncated,
+        }
+
+compaction_stats = CompactionStats()
+
+def resume_token_budget(job) -> int:
+    """The job's prompt budget for one resume; 0 means unlimited."""
+    budget: Optional[int] = getattr(job, "resume_token_budget", None)
+    return settings.resume_token_budget if budget is None else budget
+
+def _heading(line: str) -> Optional[str]:
+    if len(line) > 40:
+        return None
+    key = _HEADING_RE.sub("", line.lower().replace("&", " and ")).strip()
+    return _HEADINGS.get(" ".join(key.split()))
+
+def _strip_phone(match: re.Match) -> str:
+    # Employment dates ("2018 - 2021") look like digit runs too.
+    value = match.group()
+    if len(re.sub(r"\D", "", value)) <= 8 or _YEAR_RANGE_RE.fullmatch(value):
+        return value
+    return ""
+
+def _is_noise(line: str) -> bool:
+    if _PAGE_RE.match(line):
+        return True
+    # Lines that are nothing but contact details.
+    stripped = _URL_RE.sub("", _PHONE_RE.sub(_strip_phone, _EMAIL_RE.sub("", line)))
+    return stripped != line and len(re.sub(r"[\W_]+", "", stripped)) < 4
+
+def _page_number_lines(lines: list[str]) -> set[int]:
+    """Indexes of bare-number lines that count pages up in order (1, 2, 3...).
+
+    Other bare numbers, and a count that never reaches a second page, are content.
+    """
+    pages = []
+    expected = None
+    for i, line in enumerate(lines):
+        match = _BARE_NUMBER_RE.match(line)
+        if not match:
+            continue
+        value = int(match.group(1))
+        if value == expected or (expected is None and value in (1, 2)):
+            pages.append(i)
+            expected = value + 1
+    return set(pages) if len(pages) >= 2 else set()
+
+# Lines this close to a page break or a page number can be headers or footers.
+_PAGE_EDGE_LINES = 2
+
+def _page_edges(pages: list[int], page_numbers: set[int]) -> set[int]:
+    """Indexes of lines at the top or bottom of a page, or next to a page number."""
+    edges = set()
+    if len(set(pages)) > 1:
+        padded = [None] * _PAGE_EDGE_LINES + pages + [None] * _PAGE_EDGE_LINES
+        for i, page in enumerate(pages):
+            if set(padded[i:i + 2 * _PAGE_EDGE_LINES + 1]) != {page}:
+                edges.add(i)
+    for i in page_numbers:
+        edges.update(range(i - _PAGE_EDGE_LINES, i + _PAGE_EDGE_LINES + 1))
+    return edges
+
+def _clean_lines(text: str) -> list[str]:
+    text = unicodedata.normalize("NFKC", text or "").replace("\r", "\n")
+    # Paged extractors separate pages with form feeds.
+    lines = []
+    pages = []
+    for page, page_text in enumerate(text.split("\f")):
+        for line in page_text.split("\n"):
+            line = _SPACE_RE.sub(" ", line).strip(" \t|•·-_=*")
+            if line:
+                lines.append(line)
+                pages.append(page)
+
+    # Short lines repeated at page edges are headers or footers; keep the first.
+    # The same line elsewhere (a job title held at several employers) is content.
+    page_numbers = _page_number_lines(lines)
+    edges = _page_edges(pages, page_numbers)
+    counts = Counter(lines[i].lower() for i in edges if 0 <= i < len(lines) and len(lines[i]) < 80)
+    seen = set()
+    cleaned = []
+    for i, line in enumerate(lines):
+        if i in page_numbers:
+            continue
+        key = line.lower()
+        if i in edges and counts.get(key, 0) >= 2:
+            if key in seen:
+                continue
+            seen.add(key)
+        if _is_noise(line):
+            continue
+        cleaned.append(line)
+    return cleaned
+
+def _sections(lines: list[str]) -> list[tuple[str, list[str]]]:
+    sections = [("other", [])]
+    for line in lines:
+        section = _heading(line)
+        if section:
+            sections.append((section, []))
+        else:
+            sections[-1][1].append(line)
+    return [(name, body) for name, body in sections if body and name not in DROPPED_SECTIONS]
+
+def _truncate_words(line: str, tokens: int) -> str:
+    cut = line[:max(0, tokens * 4)]
+    if len(cut) < len(line):
+        cut = cut[:cut.rindex(" ")] if " " in cut else ""
+    return cut
+
+def compact_resume(resume_text: str, token_budget: int) -> CompactResume:
+    """Compact a resume for the analysis prompt; deterministic for a given budget."""
+    original_tokens = estimate_tokens(resume_text)
+    sections = _sections(_clean_lines(resume_text))
+
+    kept: list[list[str]] = [[] for _ in sections]
+    truncated = False
+    remaining = token_budget if token_budget > 0 else None
+    order = sorted(range(len(sections)), key=lambda i: (SECTION_PRIORITY.index(sections[i][0]), i))
+    for i in order:
+        name, body = sections[i]
+        # Heading line plus separator.
+        cost = estimate_tokens(name) + 1
+        if remaining is not None:
+            if remaining <= cost:
+                truncated = True
+                break
+            remaining -= cost
+        for line in body:
+            line_tokens = estimate_tokens(line)
+            if remaining is not None and line_tokens > remaining:
+                partial = _truncate_words(line, remaining - 1)
+                if partial:
+                    kept[i].append(partial)
+                truncated = True
+                remaining = 0
+                break
+            kept[i].append(line)
+            if remaining is not None:
+                remaining -= line_tokens
+        if truncated:
+            break
+
+    blocks = []
+    for (name, _), lines in zip(sections, kept):
+        if lines:
+            heading = "" if name == "other" else f"{name.upper()}:\n"
+            blocks.append(heading + "\n".join(lines))
+    text = "\n\n".join(blocks)
+
+    result = CompactResume(
+        text=text,
+        original_tokens=original_tokens,
+        compact_tokens=estimate_tokens(text),
+        truncated=truncated
+    )
+    compaction_stats.record(result)
+    return result
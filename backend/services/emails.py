@@ -0,0 +1,70 @@
+"""Candidate status emails rendered from precompiled templates.
+
+Templates use ``string.Template`` placeholders (``$candidate_name``,
+``$job_title``, ``$company_name``).  The built-in templates are compiled once
+at import; a user's own ``EmailTemplate`` for a status (matched on
+``template_type``) is compiled once per bulk request and rendered for every
+candidate in it.
+"""
+from dataclasses import dataclass
+from string import Template
+from typing import Optional
+from uuid import UUID
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    subject: Template
+    body: Template
+    template_id: Optional[UUID] = None
+
+    @classmethod
+    def compile(cls, subject: str, body: str, template_id: Optional[UUID] = None) -> "CompiledTemplate":
+        return cls(Template(subject), Template(body), template_id)
+
+    def render(self, **fields) -> dict:
+        # Unknown placeholders are left as written rather than failing the batch.
+        return {
+            "subject": self.subject.safe_substitute(fields),
+            "body": self.body.safe_substitute(fields),
+        }
+
+DEFAULT_TEMPLATES = {
+    "received": CompiledTemplate.compile(
+        "Application Received - $job_title",
+        "Dear $candidate_name,\n\nThank you for applying for the $job_title position. We have received your application and our team is reviewing it carefully.\n\nWe will be in touch soon regarding next steps.\n\nBest regards,\nThe Hiring Team"
+    ),
+    "shortlisted": CompiledTemplate.compile(
+        "Great News! You've Been Shortlisted - $job_title",
+        "Dear $candidate_name,\n\nWe are pleased to inform you that you have been shortlisted for the $job_title position!\n\nOur team was impressed with your qualifications. We will reach out shortly to schedule an interview.\n\nBest regards,\nThe Hiring Team"
+    ),
+    "rejected": CompiledTemplate.compile(
+        "Application Update - $job_title",
+        "Dear $candidate_name,\n\nThank you for your interest in the $job_title position. After careful consideration, we have decided to move forward with other candidates whose experience more closely matches our current needs.\n\nWe appreciate your time and wish you success in your job search.\n\nBest regards,\nThe Hiring Team"
+    ),
+}
+
+def status_template(status: str, user_template=None) -> Optional[CompiledTemplate]:
+    """The template for ``status``: the user's own if they have one, else the built-in one."""
+    if user_template is not None:
+        return CompiledTemplate.compile(user_template.subject, user_template.body, user_template.id)
+    return DEFAULT_TEMPLATES.get(status)
+
+def render_status_emails(template: CompiledTemplate, rows, company_name: Optional[str]) -> list[dict]:
+    """Render one email per ``(id, name, email, title)`` row of updated candidates.
+
+    Rows without an email address are skipped.
+    """
+    company = company_name or "our company"
+    emails = []
+    for row in rows:
+        if not (row.email or "").strip():
+            continue
+        email = template.render(candidate_name=row.name, job_title=row.title, company_name=company)
+        emails.append({
+            "candidate_id": row.id,
+            "recipient": row.email,
+            "template_id": template.template_id,
+            "subject": email["subject"][:255],
+            "body": email["body"],
+        })
+    return emails
@@ -0,0 +1,98 @@
+"""In-process event bus behind the Server-Sent Events endpoints.
+
+Events are published to named channels (``job:<id>`` and ``batch:<id>``).
+Each subscriber gets a bounded queue; a subscriber that falls behind loses
+its oldest events rather than slowing down the publisher.  Every channel
+keeps its last few events, so a client reconnecting with ``Last-Event-ID``
+picks up where it left off.
+
+Like batch state, events only reach subscribers connected to the worker that
+publishes them.
+"""
+import asyncio
+import itertools
+import json
+import time
+from collections import deque, OrderedDict
+from typing import AsyncIterator, Optional
+from config import get_settings
+
+settings = get_settings()
+
+class EventBus:
+    def __init__(self, subscriber_queue_size: int, replay_size: int, max_channels: int):
+        self.subscriber_queue_size = subscriber_queue_size
+        self.replay_size = replay_size
+        self.max_channels = max_channels
+        self._ids = itertools.count(1)
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+        self._recent: "OrderedDict[str, deque]" = OrderedDict()
+        self.published = 0
+        self.dropped = 0
+
+    def publish(self, channel: str, event: str, data: dict):
+        """Send an event to every subscriber of ``channel``; never blocks."""
+        message = (next(self._ids), event, data)
+        self.published += 1
+
+        recent = self._recent.get(channel)
+        if recent is None:
+            recent = self._recent[channel] = deque(maxlen=self.replay_size)
+            while len(self._recent) > self.max_channels:
+                self._recent.popitem(last=False)
+        else:
+            self._recent.move_to_end(channel)
+        recent.append(message)
+
+        for queue in self._subscribers.get(channel, ()):
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(message)
+
+    async def subscribe(self, channel: str, last_event_id: Optional[int] = None) -> AsyncIterator[tuple]:
+        """Yield ``(id, event, data)`` tuples, or None after a quiet heartbeat interval."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.subscriber_queue_size)
+        self._subscribers.setdefault(channel, set()).add(queue)
+        try:
+            if last_event_id is not None:
+                for message in list(self._recent.get(channel, ())):
+                    if message[0] > last_event_id:
+                        yield message
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=settings.events_heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            subscribers = self._subscribers.get(channel)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[channel]
+
+    def stats(self) -> dict:
+        return {
+            "channels": len(self._subscribers),
+            "subscribers": sum(len(s) for s in self._subscribers.values()),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+event_bus = EventBus(
+    subscriber_queue_size=settings.events_subscriber_queue_size,
+    replay_size=settings.events_replay_size,
+    max_channels=settings.events_max_channels
+)
+
+def job_channel(job_id) -> str:
+    return f"job:{job_id}"
+
+def batch_channel(batch_id) -> str:
+    return f"batch:{batch_id}"
+
+def format_sse(message: Optional[tuple]) -> str:
+    if message is None:
+        return f": keepalive {int(time.time())}\n\n"
+    event_id, event, data = message
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n"
@@ -0,0 +1,125 @@
+"""Streaming export of a job's candidates as CSV or NDJSON.
+
+Rows are read through a server-side cursor (``AsyncSession.stream`` with
+``yield_per``) and encoded one partition of ``export_chunk_rows`` rows at a
+time, so memory stays flat however many candidates a job has.  Rows are
+plain tuples of the selected columns; no ORM objects or response models are
+built.
+"""
+import csv
+import io
+import json
+import re
+from datetime import datetime
+from typing import AsyncIterator, Optional
+from uuid import UUID
+from sqlalchemy import select
+from config import get_settings
+from database import AsyncSessionLocal
+from models import Candidate
+
+settings = get_settings()
+
+EXPORT_COLUMNS = {
+    "id": Candidate.id,
+    "job_id": Candidate.job_id,
+    "name": Candidate.name,
+    "email": Candidate.email,
+    "phone": Candidate.phone,
+    "status": Candidate.status,
+    "ai_score": Candidate.ai_score,
+    "prescore": Candidate.prescore,
+    "analysis_source": Candidate.analysis_source,
+    "ai_summary": Candidate.ai_summary,
+    "skills_matched": Candidate.skills_matched,
+    "experience_years": Candidate.experience_years,
+    "resume_tokens": Candidate.resume_tokens,
+    "compact_tokens": Candidate.compact_tokens,
+    "resume_url": Candidate.resume_url,
+    "created_at": Candidate.created_at,
+    "updated_at": Candidate.updated_at,
+}
+
+DEFAULT_EXPORT_COLUMNS = (
+    "id", "name", "email", "phone", "status", "ai_score", "skills_matched", "experience_years", "created_at"
+)
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+def parse_columns(value: Optional[str]) -> list[str]:
+    """Validate a comma-separated column list; raises ``ValueError``."""
+    if not value:
+        return list(DEFAULT_EXPORT_COLUMNS)
+    columns = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in columns if name not in EXPORT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+    if not columns:
+        raise ValueError("Select at least one column")
+    return list(dict.fromkeys(columns))
+
+# Cells starting with these run as formulas when the CSV is opened in a
+# spreadsheet; names, emails and summaries come from resumes and ATS files.
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+# Phone numbers ("+1 (555) 010-0199") start with "+" but cannot call anything.
+_PHONE_RE = re.compile(r"[+-]?[\d\s().\-/]*\d[\d\s().\-/]*")
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        value = "; ".join(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES) and not _PHONE_RE.fullmatch(value):
+        return "'" + value
+    return value
+
+def _json_default(value):
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def _encode_csv(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+def _encode_ndjson(columns: list[str], rows) -> str:
+    return "".join(
+        json.dumps(dict(zip(columns, row)), default=_json_default, ensure_ascii=False) + "\n"
+        for row in rows
+    )
+
+async def export_candidates(
+    job_id: UUID,
+    columns: list[str],
+    export_format: str,
+    status_filter: Optional[str] = None,
+    sort_by: str = "ai_score"
+) -> AsyncIterator[str]:
+    """Yield the export in chunks of ``export_chunk_rows`` rows.
+
+    Uses its own session: the request's session is closed before a streamed
+    response body runs.
+    """
+    query = select(*(EXPORT_COLUMNS[name] for name in columns)).where(Candidate.job_id == job_id)
+    if status_filter:
+        query = query.where(Candidate.status == status_filter)
+    if sort_by == "ai_score":
+        query = query.order_by(Candidate.ai_score.desc(), Candidate.id)
+    else:
+        query = query.order_by(Candidate.created_at.desc(), Candidate.id)
+    chunk_rows = settings.export_chunk_rows
+
+    if export_format == "csv":
+        yield _encode_csv([columns])
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=chunk_rows))
+        async for rows in result.partitions(chunk_rows):
+            yield _encode_csv(rows) if export_format == "csv" else _encode_ndjson(columns, rows)
@@ -0,0 +1,420 @@
+"""Resume text extraction.
+
+Extractors are registered per format and selected by file signature (magic
+bytes), never by filename.  They read stored blobs through a read-only memory
+map rather than a bytes copy.  Parsing is CPU-bound, so every extractor runs in
+a process pool sized to the machine instead of on the event loop.  Extractors
+yield text one unit at a time (a page, a paragraph) and extraction stops as
+soon as the character, page or time budget is spent, so long scanned CVs cost
+no more than the part of them the analysis prompt will actually use.
+"""
+import asyncio
+import io
+import itertools
+import mmap
+import multiprocessing
+import os
+import queue
+import re
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional
+import PyPDF2
+import docx
+from config import get_settings
+from services import telemetry
+
+settings = get_settings()
+
+@dataclass
+class ExtractionResult:
+    text: str
+    format: Optional[str] = None
+    pages: int = 0  # pages actually parsed (paged formats only)
+    total_pages: int = 0
+    elapsed_ms: float = 0.0
+    truncated: bool = False
+    error: Optional[str] = None
+
+@dataclass
+class Extractor:
+    name: str
+    # Called with the first SIGNATURE_BYTES of the file and its path
+    matches: Callable[[bytes, str], bool]
+    # Called with a read-only mmap of the file; returns
+    # (total page count or None, iterator of text units)
+    open: Callable[[mmap.mmap], tuple[Optional[int], Iterator[str]]]
+    paged: bool = False
+
+SIGNATURE_BYTES = 8192
+
+# Checked in registration order; the plain-text extractor must stay last.
+_registry: dict[str, Extractor] = {}
+
+def register_extractor(name: str, matches: Callable[[bytes, str], bool], paged: bool = False):
+    """Register an extractor for files whose signature satisfies ``matches``."""
+    def decorator(func):
+        _registry[name] = Extractor(name=name, matches=matches, open=func, paged=paged)
+        return func
+    return decorator
+
+def detect_format(path: str) -> Optional[str]:
+    """Return the name of the first extractor that recognises the file."""
+    with open(path, "rb") as f:
+        head = f.read(SIGNATURE_BYTES)
+    if not head:
+        return None
+    for extractor in _registry.values():
+        try:
+            if extractor.matches(head, path):
+                return extractor.name
+        except Exception:
+            continue
+    return None
+
+# --- PDF ---
+
+@register_extractor("pdf", lambda head, path: head[:1024].lstrip()[:5] == b"%PDF-", paged=True)
+def _open_pdf(view: mmap.mmap):
+    pdf_reader = PyPDF2.PdfReader(view)
+    return len(pdf_reader.pages), (page.extract_text() or "" for page in pdf_reader.pages)
+
+# --- DOCX ---
+
+def _is_docx(head: bytes, path: str) -> bool:
+    if head[:4] != b"PK\x03\x04":
+        return False
+    with zipfile.ZipFile(path) as archive:
+        return "word/document.xml" in archive.namelist()
+
+@register_extractor("docx", _is_docx)
+def _open_docx(view: mmap.mmap):
+    # python-docx needs a seekable file object, which an mmap is not.
+    document = docx.Document(io.BytesIO(view[:]))
+
+    def units():
+        for paragraph in document.paragraphs:
+            if paragraph.text:
+                yield paragraph.text
+        for table in document.tables:
+            for row in table.rows:
+                cells = [cell.text.strip() for cell in row.cells if cell.text.strip()]
+                if cells:
+                    yield " | ".join(cells)
+
+    return None, units()
+
+# --- RTF ---
+
+# Groups that never contain document text.  Optional destinations marked with
+# \* are skipped without being listed here.
+_RTF_DESTINATIONS = {
+    "author", "buptim", "colortbl", "comment", "company", "creatim", "datastore",
+    "doccomm", "fldinst", "fonttbl", "footer", "footerf", "footerl", "footerr",
+    "footnote", "generator", "header", "headerf", "headerl", "headerr", "info",
+    "keywords", "latentstyles", "listoverridetable", "listtable", "listtext",
+    "object", "objdata", "operator", "pict", "pntext", "printim", "revtbl",
+    "revtim", "rsidtbl", "shpinst", "stylesheet", "subject", "themedata", "title",
+    "xmlnstbl",
+}
+
+_RTF_SPECIAL_CHARS = {
+    "par": "\n", "sect": "\n\n", "page": "\n\n", "line": "\n", "tab": "\t",
+    "cell": " | ", "row": "\n", "emdash": "\u2014", "endash": "\u2013", "emspace": "\u2003",
+    "enspace": "\u2002", "qmspace": "\u2005", "bullet": "\u2022", "lquote": "\u2018",
+    "rquote": "\u2019", "ldblquote": "\u201c", "rdblquote": "\u201d",
+}
+
+_RTF_TOKEN_RE = re.compile(
+    r"\\([a-z]{1,32})(-?\d{1,10})?[ ]?|\\'([0-9a-f]{2})|\\([^a-z])|([{}])|[\r\n]+|(.)",
+    re.IGNORECASE
+)
+
+def _rtf_to_text(rtf: str) -> str:
+    """Strip RTF control words and groups, keeping the document text."""
+    stack = []
+    ignorable = False
+    unicode_skip = 1
+    skip = 0
+    out = []
+    for match in _RTF_TOKEN_RE.finditer(rtf):
+        word, arg, hexcode, char, brace, text = match.groups()
+        if brace:
+            skip = 0
+            if brace == "{":
+                stack.append((unicode_skip, ignorable))
+            elif stack:
+                unicode_skip, ignorable = stack.pop()
+        elif char:
+            skip = 0
+            if char == "*":
+                ignorable = True
+            elif not ignorable:
+                if char == "~":
+                    out.append("\xa0")
+                elif char in "{}\\":
+                    out.append(char)
+        elif word:
+            skip = 0
+            if word in _RTF_DESTINATIONS:
+                ignorable = True
+            elif ignorable:
+                continue
+            elif word in _RTF_SPECIAL_CHARS:
+                out.append(_RTF_SPECIAL_CHARS[word])
+            elif word == "uc" and arg:
+                unicode_skip = int(arg)
+            elif word == "u" and arg:
+                code = int(arg)
+                out.append(chr(code + 0x10000 if code < 0 else code))
+                skip = unicode_skip
+        elif hexcode:
+            if skip > 0:
+                skip -= 1
+            elif not ignorable:
+                out.append(bytes([int(hexcode, 16)]).decode("cp1252", errors="replace"))
+        elif text:
+            if skip > 0:
+                skip -= 1
+            elif not ignorable:
+                out.append(text)
+    return "".join(out)
+
+@register_extractor("rtf", lambda head, path: head[:5] == b"{\\rtf")
+def _open_rtf(view: mmap.mmap):
+    return None, iter([_rtf_to_text(view[:].decode("latin-1"))])
+
+# --- Plain text (fallback) ---
+
+def _decode_text(file_content: bytes) -> str:
+    if file_content[:3] == b"\xef\xbb\xbf":
+        return file_content[3:].decode("utf-8", errors="ignore")
+    if file_content[:2] in (b"\xff\xfe", b"\xfe\xff"):
+        return file_content.decode("utf-16", errors="ignore")
+    return file_content.decode("utf-8", errors="ignore")
+
+def _looks_like_text(head: bytes, path: str) -> bool:
+    sample = _decode_text(head)
+    if not sample:
+        return False
+    control = sum(1 for c in sample if ord(c) < 32 and c not in "\r\n\t\f")
+    return "\x00" not in sample and control / len(sample) < 0.05
+
+@register_extractor("text", _looks_like_text)
+def _open_text(view: mmap.mmap):
+    # Four bytes per character is enough to cover the character budget.
+    return None, iter([_decode_text(view[:settings.extraction_max_chars * 4])])
+
+# --- Process pool ---
+
+class ExtractionStats:
+    def __init__(self):
+        self.extractions = 0
+        self.pages = 0
+        self.total_ms = 0.0
+        self.truncated = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.errors = 0
+        self.formats: dict[str, int] = {}
+
+    def record(self, result: ExtractionResult):
+        self.extractions += 1
+        self.pages += result.pages
+        self.total_ms += result.elapsed_ms
+        self.truncated += int(result.truncated)
+        self.errors += int(result.error is not None)
+        fmt = result.format or "unknown"
+        self.formats[fmt] = self.formats.get(fmt, 0) + 1
+        telemetry.extraction_duration.observe(result.elapsed_ms / 1000, fmt)
+        telemetry.extraction_pages.inc(amount=result.pages)
+        if result.error is not None:
+            telemetry.extraction_errors.inc()
+
+    def to_dict(self) -> dict:
+        return {
+            "extractions": self.extractions,
+            "pages": self.pages,
+            "total_ms": round(self.total_ms, 1),
+            "avg_ms": round(self.total_ms / self.extractions, 1) if self.extractions else 0.0,
+            "truncated": self.truncated,
+            "timeouts": self.timeouts,
+            "retries": self.retries,
+            "errors": self.errors,
+            "formats": dict(self.formats),
+        }
+
+extraction_stats = ExtractionStats()
+
+# Workers report each task as they pick it up, so the hard timeout counts from
+# the start of the parse rather than from submission: time spent queued behind
+# a bulk upload or import is not held against a file.
+_pool: Optional[ProcessPoolExecutor] = None
+_started_queue = None
+_started: dict[int, float] = {}  # task id -> when the parent saw it start
+_task_ids = itertools.count()
+_POLL_SECONDS = 0.25
+
+def _init_worker(started_queue):
+    global _started_queue
+    _started_queue = started_queue
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool, _started_queue
+    if _pool is None:
+        # Forking a process that runs an event loop and threads is unsafe.
+        context = multiprocessing.get_context("spawn")
+        _started_queue = context.Queue()
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.extraction_workers or os.cpu_count() or 1,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(_started_queue,)
+        )
+    return _pool
+
+def _reset_pool(pool: ProcessPoolExecutor):
+    """Kill ``pool``'s workers so a runaway parse stops consuming a core.
+
+    A pool whose worker dies is unusable, so the other extractions running in
+    it fail with ``BrokenProcessPool`` and are retried on the replacement.
+    Does nothing if ``pool`` was already replaced.
+    """
+    global _pool
+    if _pool is not pool:
+        return
+    _pool = None
+    _started.clear()
+    for process in list(getattr(pool, "_processes", {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def shutdown_extraction_pool():
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def _drain_started(started_queue):
+    now = time.perf_counter()
+    try:
+        while True:
+            _started.setdefault(started_queue.get_nowait(), now)
+    except (queue.Empty, OSError, ValueError):
+        pass
+
+def _run_task(task_id: int, path: str, max_chars: int, max_pages: int, deadline_seconds: float) -> ExtractionResult:
+    _started_queue.put(task_id)
+    return _extract(path, max_chars, max_pages, deadline_seconds)
+
+def _extract(path: str, max_chars: int, max_pages: int, deadline_seconds: float) -> ExtractionResult:
+    """Worker-side extraction, stopping at the character, page or time budget."""
+    started = time.perf_counter()
+    fmt = detect_format(path)
+    if fmt is None:
+        return ExtractionResult(text="", error="Unsupported file type")
+    extractor = _registry[fmt]
+    parts = []
+    length = 0
+    truncated = False
+    pages = 0
+    total_pages = 0
+    error = None
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            total, units = extractor.open(view)
+            total_pages = total or 0
+            for unit in units:
+                if length >= max_chars or (extractor.paged and pages >= max_pages):
+                    truncated = True
+                    break
+                if time.perf_counter() - started > deadline_seconds:
+                    truncated = True
+                    error = "Extraction time budget exceeded"
+                    break
+                parts.append(unit)
+                length += len(unit)
+                if extractor.paged:
+                    pages += 1
+    except Exception as e:
+        error = str(e) or e.__class__.__name__
+
+    # Form feeds mark page breaks for resume compaction.
+    text = ("\f" if extractor.paged else "\n").join(parts)
+    if len(text) > max_chars:
+        text = text[:max_chars]
+        truncated = True
+    return ExtractionResult(
+        text=text,
+        format=fmt,
+        pages=pages,
+        total_pages=total_pages,
+        elapsed_ms=(time.perf_counter() - started) * 1000,
+        truncated=truncated or pages < total_pages,
+        error=error
+    )
+
+async def extract_resume_text(
+    path: str,
+    max_chars: Optional[int] = None,
+    max_pages: Optional[int] = None,
+    timeout: Optional[float] = None
+) -> ExtractionResult:
+    """Extract plain text from a stored resume in the extraction process pool.
+
+    An extraction lost to a pool reset (another file's timeout, or a crashed
+    worker) is retried once on the new pool.
+    """
+    max_chars = settings.extraction_max_chars if max_chars is None else max_chars
+    max_pages = settings.extraction_max_pages if max_pages is None else max_pages
+    timeout = settings.extraction_timeout_seconds if timeout is None else timeout
+
+    for attempt in range(2):
+        pool = _get_pool()
+        try:
+            result = await _run_in_pool(pool, path, max_chars, max_pages, timeout)
+        except asyncio.TimeoutError:
+            extraction_stats.timeouts += 1
+            _reset_pool(pool)
+            result = ExtractionResult(text="", elapsed_ms=timeout * 1000, error="Extraction timed out")
+        except BrokenProcessPool as e:
+            _reset_pool(pool)
+            result = ExtractionResult(text="", error=str(e) or "Extraction worker died")
+            if attempt == 0:
+                extraction_stats.retries += 1
+                continue
+        break
+    extraction_stats.record(result)
+    return result
+
+async def _run_in_pool(
+    pool: ProcessPoolExecutor,
+    path: str,
+    max_chars: int,
+    max_pages: int,
+    timeout: float
+) -> ExtractionResult:
+    """Run one extraction; raises ``asyncio.TimeoutError`` once it has run for ``timeout + 5`` seconds.
+
+    The worker stops itself at ``timeout``; the hard limit only fires when a
+    single page hangs the parser.
+    """
+    started_queue = _started_queue
+    task_id = next(_task_ids)
+    future = asyncio.wrap_future(pool.submit(_run_task, task_id, path, max_chars, max_pages, timeout))
+    # After a reset the abandoned future fails; retrieve that so it is not logged.
+    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+    try:
+        while True:
+            done, _ = await asyncio.wait({future}, timeout=_POLL_SECONDS)
+            if done:
+                return future.result()
+            _drain_started(started_queue)
+            started_at = _started.get(task_id)
+            if started_at is not None and time.perf_counter() - started_at > timeout + 5:
+                raise asyncio.TimeoutError()
+    finally:
+        _started.pop(task_id, None)
@@ -0,0 +1,189 @@
+"""Async Gemini client shared by every AI call in the app.
+
+The SDK's synchronous ``generate_content`` blocks the event loop for the whole
+round trip, so all calls go through ``generate_content_async`` instead.  One
+``GenerativeModel`` is reused for the life of the process, and calls are capped
+both globally and per tenant so one bulk upload cannot starve everyone else.
+Global slots are shared out by weighted fair queuing, with each tenant's
+weight set from their plan.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+import google.generativeai as genai
+from config import get_settings
+from services.fair_queue import WeightedFairQueue
+from services import telemetry
+
+settings = get_settings()
+
+def _record_call(operation: str, outcome: str, seconds: float):
+    telemetry.llm_requests.inc(operation, outcome)
+    telemetry.llm_duration.observe(seconds, operation)
+
+def _record_tokens(response, prompt: str, completion: str):
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", 0) or len(prompt) // 4 + 1
+    completion_tokens = getattr(usage, "candidates_token_count", 0) or len(completion) // 4 + 1
+    telemetry.llm_tokens.inc("prompt", amount=prompt_tokens)
+    telemetry.llm_tokens.inc("completion", amount=completion_tokens)
+
+class GeminiClient:
+    def __init__(
+        self,
+        model_name: str,
+        max_concurrency: int,
+        per_tenant_concurrency: int,
+        timeout_seconds: float
+    ):
+        self.model_name = model_name
+        self.max_concurrency = max_concurrency
+        self.per_tenant_concurrency = per_tenant_concurrency
+        self.timeout_seconds = timeout_seconds
+        self._model: Optional[genai.GenerativeModel] = None
+        self._global_slots = WeightedFairQueue(max_concurrency)
+        # tenant_id -> [semaphore, number of callers holding or waiting on it]
+        self._tenant_slots: dict[str, list] = {}
+        self.streams = 0
+        self.streams_cancelled = 0
+        self.ttft_ms_total = 0.0
+        self.ttft_ms_max = 0.0
+        self._ttft_samples = 0
+
+    @property
+    def model(self) -> genai.GenerativeModel:
+        if self._model is None:
+            self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def set_tenant_weight(self, tenant_id: str, weight: float):
+        """Share of contended Gemini slots for ``tenant_id`` relative to other tenants."""
+        self._global_slots.set_weight(tenant_id, weight)
+
+    @asynccontextmanager
+    async def _tenant_slot(self, tenant_id: Optional[str]):
+        if tenant_id is None:
+            yield
+            return
+
+        entry = self._tenant_slots.get(tenant_id)
+        if entry is None:
+            entry = self._tenant_slots[tenant_id] = [asyncio.Semaphore(self.per_tenant_concurrency), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._tenant_slots.pop(tenant_id, None)
+
+    async def generate(
+        self,
+        prompt: str,
+        tenant_id: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> str:
+        """Generate a completion without blocking the event loop.
+
+        Raises ``asyncio.TimeoutError`` if the call exceeds its timeout; time
+        spent waiting for a concurrency slot does not count towards it.
+        """
+        async with self._tenant_slot(tenant_id):
+            async with self._global_slots.slot(tenant_id):
+                started = time.perf_counter()
+                outcome = "error"
+                try:
+                    response = await asyncio.wait_for(
+                        self.model.generate_content_async(prompt),
+                        timeout=timeout or self.timeout_seconds
+                    )
+                    text = response.text
+                    outcome = "ok"
+                except asyncio.TimeoutError:
+                    outcome = "timeout"
+                    raise
+                except asyncio.CancelledError:
+                    outcome = "cancelled"
+                    raise
+                finally:
+                    _record_call("generate", outcome, time.perf_counter() - started)
+        _record_tokens(response, prompt, text)
+        return text
+
+    async def stream(
+        self,
+        prompt: str,
+        tenant_id: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """Yield the completion in chunks as Gemini produces them.
+
+        ``timeout`` applies to the wait for each chunk.  Closing or cancelling
+        the iterator (e.g. when the client disconnects) cancels the underlying
+        call and frees its concurrency slots.
+        """
+        timeout = timeout or self.timeout_seconds
+        self.streams += 1
+        async with self._tenant_slot(tenant_id):
+            async with self._global_slots.slot(tenant_id):
+                started = time.perf_counter()
+                first = True
+                outcome = "error"
+                completion = []
+                try:
+                    response = await asyncio.wait_for(
+                        self.model.generate_content_async(prompt, stream=True), timeout=timeout
+                    )
+                    chunks = response.__aiter__()
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), timeout=timeout)
+                        except StopAsyncIteration:
+                            outcome = "ok"
+                            _record_tokens(response, prompt, "".join(completion))
+                            return
+                        text = chunk.text
+                        if not text:
+                            continue
+                        if first:
+                            first = False
+                            self._record_ttft((time.perf_counter() - started) * 1000)
+                        completion.append(text)
+                        yield text
+                except asyncio.TimeoutError:
+                    outcome = "timeout"
+                    raise
+                except (asyncio.CancelledError, GeneratorExit):
+                    outcome = "cancelled"
+                    self.streams_cancelled += 1
+                    raise
+                finally:
+                    _record_call("stream", outcome, time.perf_counter() - started)
+
+    def _record_ttft(self, ttft_ms: float):
+        self._ttft_samples += 1
+        self.ttft_ms_total += ttft_ms
+        self.ttft_ms_max = max(self.ttft_ms_max, ttft_ms)
+
+    def stats(self) -> dict:
+        slots = self._global_slots.stats()
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": slots["in_use"],
+            "waiting": slots["waiting"],
+            "queued": slots["queued"],
+            "active_tenants": len(self._tenant_slots),
+            "streams": self.streams,
+            "streams_cancelled": self.streams_cancelled,
+            "ttft_ms_avg": round(self.ttft_ms_total / self._ttft_samples, 1) if self._ttft_samples else 0.0,
+            "ttft_ms_max": round(self.ttft_ms_max, 1),
+        }
+
+llm_client = GeminiClient(
+    model_name=settings.gemini_model,
+    max_concurrency=settings.llm_max_concurrency,
+    per_tenant_concurrency=settings.llm_per_tenant_concurrency,
+    timeout_seconds=settings.llm_timeout_seconds
+)
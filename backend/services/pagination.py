@@ -0,0 +1,23 @@
+"""Opaque keyset-pagination cursors.
+
+A cursor is the sort key of the last row on a page, JSON-encoded and then
+base64url-encoded.  Clients pass it back unchanged to fetch the next page.
+"""
+import base64
+import json
+from fastapi import HTTPException
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps(list(values), separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Decode a cursor holding ``size`` values, or raise a 400."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
@@ -0,0 +1,488 @@
+"""Bulk resume ingestion pipeline.
+
+Uploads are streamed into the blob store before the request returns; ZIP
+archives are stored whole and their members are listed but not unpacked.
+A batch is then processed by five stages connected with queues:
+
+    store -> extract -> prescore -> analyze -> persist
+
+The store stage decompresses archive members one at a time straight into the
+blob store, so no resume is ever held in memory as a whole.  The prescore
+stage scores whatever resumes are waiting in one vectorized pass and keeps
+candidates below the job's threshold away from Gemini.  For jobs in
+``batched`` analysis mode, the analyze stage groups waiting resumes and sends
+several per Gemini request.
+
+Each stage runs a fixed number of workers, so a 2000-resume batch never fans
+out into 2000 concurrent Gemini calls, and persisted candidates are written
+with multi-row INSERTs instead of one commit per resume.
+
+Every stage transition is published to the batch's and the job's event
+channels, which back the Server-Sent Events endpoints.
+
+Batch state lives in this process only; status lookups must reach the worker
+that accepted the upload.
+"""
+import asyncio
+import logging
+import os
+import re
+import uuid
+import zipfile
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Optional
+from uuid import UUID
+from fastapi import UploadFile
+from sqlalchemy import insert
+from config import get_settings
+from database import AsyncSessionLocal
+from models import Candidate
+from services.analysis_cache import cached_analyze_resume, cached_analyze_resumes
+from services.extraction import extract_resume_text
+from services.prescoring import JobProfile, prescore_threshold, local_analysis
+from services.rescoring import scoring_key
+from services.compaction import compact_resume, resume_token_budget
+from services.storage import blob_store, StoredBlob
+from services.events import event_bus, job_channel, batch_channel
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt", ".doc", ".docx", ".rtf")
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+PHONE_RE = re.compile(r"\+?\d[\d\s().-]{7,}\d")
+
+_DONE = object()
+
+@dataclass
+class BatchItem:
+    index: int
+    filename: str
+    status: str = "queued"  # queued, stored, extracted, analyzed, completed, failed
+    error: Optional[str] = None
+    file_path: Optional[str] = None
+    archive_path: Optional[str] = None
+    archive_member: Optional[str] = None
+    resume_text: Optional[str] = None
+    compact_text: Optional[str] = None
+    resume_tokens: Optional[int] = None
+    compact_tokens: Optional[int] = None
+    analysis: Optional[dict] = None
+    candidate_id: Optional[UUID] = None
+    pages: Optional[int] = None
+    extraction_ms: Optional[float] = None
+    prescore: Optional[int] = None
+    analysis_source: Optional[str] = None
+
+    def fail(self, error: str):
+        self.status = "failed"
+        self.error = error
+        self.resume_text = None
+        self.compact_text = None
+
+@dataclass
+class Batch:
+    id: str
+    job_id: UUID
+    user_id: UUID
+    job_description: str
+    skills: list[str]
+    items: list[BatchItem]
+    profile: JobProfile
+    prescore_threshold: int
+    scoring_key: str
+    analysis_mode: str
+    token_budget: int
+    status: str = "processing"
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    finished_at: Optional[datetime] = None
+
+    def counts(self) -> dict:
+        counts = {}
+        for item in self.items:
+            counts[item.status] = counts.get(item.status, 0) + 1
+        return counts
+
+def _emit(batch: Batch, item: BatchItem):
+    data = {
+        "batch_id": batch.id,
+        "job_id": batch.job_id,
+        "index": item.index,
+        "filename": item.filename,
+        "status": item.status,
+    }
+    if item.status == "failed":
+        data["error"] = item.error
+    if item.status == "extracted":
+        data["resume_tokens"] = item.resume_tokens
+        data["compact_tokens"] = item.compact_tokens
+    if item.status == "prescored":
+        data["prescore"] = item.prescore
+        data["analysis_source"] = item.analysis_source
+    if item.status == "analyzed":
+        data["score"] = item.analysis["score"]
+    if item.status == "completed":
+        data["candidate_id"] = item.candidate_id
+    event_bus.publish(batch_channel(batch.id), "candidate", data)
+    event_bus.publish(job_channel(batch.job_id), "candidate", data)
+
+def _emit_batch(batch: Batch):
+    data = {
+        "batch_id": batch.id,
+        "job_id": batch.job_id,
+        "status": batch.status,
+        "total": len(batch.items),
+        "counts": batch.counts(),
+    }
+    event_bus.publish(batch_channel(batch.id), "batch", data)
+    event_bus.publish(job_channel(batch.job_id), "batch", data)
+
+_batches: "OrderedDict[str, Batch]" = OrderedDict()
+_tasks: set[asyncio.Task] = set()
+
+def _list_archive(archive_path: str) -> list[str]:
+    members = []
+    with zipfile.ZipFile(archive_path) as archive:
+        for info in archive.infolist():
+            name = info.filename
+            if info.is_dir() or name.startswith("__MACOSX/"):
+                continue
+            if not name.lower().endswith(SUPPORTED_EXTENSIONS):
+                continue
+            members.append(name)
+            if len(members) > settings.pipeline_max_files:
+                break
+    return members
+
+async def stage_upload(upload: UploadFile) -> list[BatchItem]:
+    """Store one uploaded file and return the batch items it contributes.
+
+    Raises ``BlobTooLargeError`` for oversized files and
+    ``zipfile.BadZipFile`` for corrupt archives.
+    """
+    filename = upload.filename or "resume"
+    if not filename.lower().endswith(".zip"):
+        blob = await blob_store.save_upload(upload)
+        return [BatchItem(index=0, filename=filename, status="stored", file_path=blob.path)]
+
+    blob = await blob_store.save_upload(upload, max_bytes=settings.max_archive_bytes)
+    members = await asyncio.to_thread(_list_archive, blob.path)
+    return [
+        BatchItem(
+            index=0,
+            filename=os.path.basename(member),
+            archive_path=blob.path,
+            archive_member=member
+        )
+        for member in members
+    ]
+
+def get_batch(batch_id: str) -> Optional[Batch]:
+    return _batches.get(batch_id)
+
+def start_batch(job, user_id: UUID, items: list[BatchItem]) -> Batch:
+    """Register a batch and schedule it on the event loop; returns immediately."""
+    for i, item in enumerate(items):
+        item.index = i
+    batch = Batch(
+        id=uuid.uuid4().hex,
+        job_id=job.id,
+        user_id=user_id,
+        job_description=job.description or "",
+        skills=list(job.skills or []),
+        items=items,
+        profile=JobProfile.from_job(job),
+        prescore_threshold=prescore_threshold(job),
+        scoring_key=scoring_key(job),
+        analysis_mode=job.analysis_mode or "single",
+        token_budget=resume_token_budget(job),
+    )
+    _batches[batch.id] = batch
+    while len(_batches) > settings.pipeline_max_tracked_batches:
+        oldest_id, oldest = next(iter(_batches.items()))
+        if oldest.status == "processing":
+            break
+        del _batches[oldest_id]
+
+    _emit_batch(batch)
+    task = asyncio.create_task(_run_batch(batch))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return batch
+
+def _candidate_name(filename: str) -> str:
+    stem = os.path.splitext(filename)[0]
+    stem = re.sub(r"(?i)\b(resume|cv)\b", " ", stem)
+    name = " ".join(re.split(r"[\s_\-.]+", stem)).strip()
+    return name.title() or "Unknown Candidate"
+
+async def _run_store_stage(batch: Batch, inbox: asyncio.Queue, outbox: asyncio.Queue):
+    """Pass uploaded files through and unpack each archive's members in one pass."""
+    archives: dict[str, list[BatchItem]] = {}
+    while (item := await inbox.get()) is not _DONE:
+        if item.file_path is None:
+            archives.setdefault(item.archive_path, []).append(item)
+            continue
+        item.status = "stored"
+        _emit(batch, item)
+        await outbox.put(item)
+
+    slots = asyncio.Semaphore(max(1, settings.pipeline_storage_concurrency))
+
+    async def store_archive(archive_path: str, items: list[BatchItem]):
+        try:
+            async with slots:
+                blobs = await blob_store.save_archive_members(archive_path, [item.archive_member for item in items])
+        except Exception as e:
+            blobs = {item.archive_member: e for item in items}
+        for item in items:
+            blob = blobs.get(item.archive_member)
+            if not isinstance(blob, StoredBlob):
+                item.fail(str(blob) or blob.__class__.__name__)
+                _emit(batch, item)
+                continue
+            item.file_path = blob.path
+            item.status = "stored"
+            _emit(batch, item)
+            await outbox.put(item)
+
+    await asyncio.gather(*(store_archive(path, items) for path, items in archives.items()))
+    await outbox.put(_DONE)
+
+async def _extract(batch: Batch, item: BatchItem):
+    extraction = await extract_resume_text(item.file_path)
+    item.resume_text = extraction.text
+    item.pages = extraction.pages
+    item.extraction_ms = round(extraction.elapsed_ms, 1)
+    if not item.resume_text.strip():
+        raise ValueError(extraction.error or "No text could be extracted from the resume")
+    compact = compact_resume(item.resume_text, batch.token_budget)
+    item.compact_text = compact.text
+    item.resume_tokens = compact.original_tokens
+    item.compact_tokens = compact.compact_tokens
+    item.status = "extracted"
+
+async def _analyze(batch: Batch, item: BatchItem):
+    if item.analysis is None:
+        item.analysis = await cached_analyze_resume(
+            item.compact_text, batch.job_description, batch.skills, tenant_id=str(batch.user_id)
+        )
+        item.analysis_source = "llm"
+    item.status = "analyzed"
+
+async def _run_prescore_stage(batch: Batch, inbox: asyncio.Queue, outbox: asyncio.Queue):
+    """Score every resume that is already waiting in one vectorized call."""
+    done = False
+    while not done:
+        items = [await inbox.get()]
+        while not inbox.empty() and len(items) < 256:
+            items.append(inbox.get_nowait())
+        if items[-1] is _DONE:
+            items.pop()
+            done = True
+
+        if items:
+            scores = batch.profile.score_many([item.resume_text for item in items])
+            for item, prescore in zip(items, scores):
+                item.prescore = prescore.score
+                if prescore.score < batch.prescore_threshold:
+                    item.analysis = local_analysis(prescore, batch.prescore_threshold)
+                    item.analysis_source = "prescore"
+                item.status = "prescored"
+                _emit(batch, item)
+                await outbox.put(item)
+
+    await outbox.put(_DONE)
+
+async def _run_batched_analyze_stage(batch: Batch, inbox: asyncio.Queue, outbox: asyncio.Queue):
+    """Analyze resumes in groups, several per Gemini request.
+
+    After the first resume of a group arrives, the stage waits up to
+    ``analysis_batch_linger_seconds`` for more before sending the group.
+    """
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(max(1, settings.pipeline_analysis_concurrency))
+    running: set[asyncio.Task] = set()
+
+    async def analyze_group(group: list[BatchItem]):
+        try:
+            analyses = await cached_analyze_resumes(
+                [item.compact_text for item in group], batch.job_description, batch.skills,
+                tenant_id=str(batch.user_id)
+            )
+        except Exception as e:
+            for item in group:
+                item.fail(str(e) or e.__class__.__name__)
+                _emit(batch, item)
+            return
+        finally:
+            slots.release()
+        for item, analysis in zip(group, analyses):
+            item.analysis = analysis
+            item.analysis_source = "llm"
+            item.status = "analyzed"
+            _emit(batch, item)
+            await outbox.put(item)
+
+    try:
+        done = False
+        while not done:
+            group: list[BatchItem] = []
+            deadline = None
+            while len(group) < settings.analysis_batch_max_resumes:
+                timeout = None if deadline is None else max(0.0, deadline - loop.time())
+                try:
+                    item = await asyncio.wait_for(inbox.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _DONE:
+                    done = True
+                    break
+                if item.analysis is not None:
+                    # Already settled by the pre-scorer.
+                    item.status = "analyzed"
+                    _emit(batch, item)
+                    await outbox.put(item)
+                    continue
+                group.append(item)
+                if deadline is None:
+                    deadline = loop.time() + settings.analysis_batch_linger_seconds
+
+            if group:
+                await slots.acquire()
+                task = asyncio.create_task(analyze_group(group))
+                running.add(task)
+                task.add_done_callback(running.discard)
+
+        await asyncio.gather(*running)
+    finally:
+        # Only non-empty if the stage was cancelled.
+        for task in running:
+            task.cancel()
+    await outbox.put(_DONE)
+
+async def _run_stage(batch: Batch, inbox: asyncio.Queue, outbox: asyncio.Queue, concurrency: int, handler):
+    async def worker():
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                await inbox.put(_DONE)
+                return
+            try:
+                await handler(batch, item)
+            except Exception as e:
+                item.fail(str(e) or e.__class__.__name__)
+                _emit(batch, item)
+                continue
+            _emit(batch, item)
+            await outbox.put(item)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    await outbox.put(_DONE)
+
+async def _insert_candidates(batch: Batch, items: list[BatchItem]):
+    rows = []
+    for item in items:
+        text = item.resume_text or ""
+        email_match = EMAIL_RE.search(text)
+        phone_match = PHONE_RE.search(text)
+        item.candidate_id = uuid.uuid4()
+        rows.append({
+            "id": item.candidate_id,
+            "job_id": batch.job_id,
+            "name": _candidate_name(item.filename),
+            "email": email_match.group() if email_match else "",
+            "phone": phone_match.group().strip() if phone_match else None,
+            "resume_url": item.file_path,
+            "resume_text": text,
+            "resume_compact": item.compact_text,
+            "compact_budget": batch.token_budget,
+            "resume_tokens": item.resume_tokens,
+            "compact_tokens": item.compact_tokens,
+            "ai_score": item.analysis["score"],
+            "ai_summary": item.analysis["summary"],
+            "skills_matched": item.analysis["skills_matched"],
+            "experience_years": item.analysis["experience_years"],
+            "prescore": item.prescore,
+            "analysis_source": item.analysis_source,
+            "scoring_key": None if item.analysis.get("fallback") and item.analysis_source == "llm" else batch.scoring_key,
+        })
+
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.execute(insert(Candidate), rows)
+            await db.commit()
+    except Exception as e:
+        for item in items:
+            item.candidate_id = None
+            item.fail(f"Database insert failed: {e}")
+            _emit(batch, item)
+        return
+
+    for item in items:
+        item.status = "completed"
+        item.resume_text = None
+        item.compact_text = None
+        item.analysis = None
+        _emit(batch, item)
+
+async def _persist(batch: Batch, inbox: asyncio.Queue):
+    pending: list[BatchItem] = []
+    done = False
+    while not done:
+        try:
+            item = await asyncio.wait_for(inbox.get(), timeout=settings.pipeline_flush_interval_seconds)
+        except asyncio.TimeoutError:
+            item = None
+
+        if item is _DONE:
+            done = True
+        elif item is not None:
+            pending.append(item)
+
+        if pending and (done or item is None or len(pending) >= settings.pipeline_insert_batch_size):
+            await _insert_candidates(batch, pending)
+            pending = []
+
+async def _run_batch(batch: Batch):
+    store_q: asyncio.Queue = asyncio.Queue()
+    bound = max(settings.pipeline_insert_batch_size, settings.pipeline_analysis_concurrency) * 2
+    extract_q: asyncio.Queue = asyncio.Queue(maxsize=bound)
+    prescore_q: asyncio.Queue = asyncio.Queue(maxsize=bound)
+    analyze_q: asyncio.Queue = asyncio.Queue(maxsize=bound)
+    persist_q: asyncio.Queue = asyncio.Queue(maxsize=bound)
+
+    # Items uploaded directly are already stored; the store stage skips them.
+    for item in batch.items:
+        store_q.put_nowait(item)
+    store_q.put_nowait(_DONE)
+
+    stages = [
+        asyncio.create_task(stage) for stage in (
+            _run_store_stage(batch, store_q, extract_q),
+            _run_stage(batch, extract_q, prescore_q, settings.pipeline_extract_concurrency, _extract),
+            _run_prescore_stage(batch, prescore_q, analyze_q),
+            _run_batched_analyze_stage(batch, analyze_q, persist_q)
+            if batch.analysis_mode == "batched"
+            else _run_stage(batch, analyze_q, persist_q, settings.pipeline_analysis_concurrency, _analyze),
+            _persist(batch, persist_q),
+        )
+    ]
+    try:
+        await asyncio.gather(*stages)
+    except Exception as e:
+        logger.exception("Batch %s pipeline error", batch.id)
+        for item in batch.items:
+            if item.status not in ("completed", "failed"):
+                item.fail(str(e))
+    finally:
+        # A failed stage leaves the others blocked on their queues.
+        for stage in stages:
+            stage.cancel()
+        await asyncio.gather(*stages, return_exceptions=True)
+        batch.status = "completed"
+        batch.finished_at = datetime.now(timezone.utc)
+        _emit_batch(batch)
@@ -0,0 +1,128 @@
+"""Local keyword pre-scoring used to gate Gemini analysis.
+
+Each job is turned into a weighted term vector (from its description and
+requirements) plus a list of skill phrases.  Resumes are scored against it
+with NumPy in one pass per batch.  The score is deterministic, so candidates
+that are clearly unrelated to the role can be turned away without an LLM
+call.
+"""
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+from config import get_settings
+
+settings = get_settings()
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9+#]+)*")
+
+# Common English and job-ad filler that says nothing about fit.
+STOPWORDS = frozenset("""
+a about above after all also an and any are as at be been being both but by can
+could did do does for from had has have having he her his how i if in into is it
+its job looking may more most must no not of on one or other our out over own role
+she should so some such than that the their them then there these they this those
+through to under up us very was we well were what when where which while who will
+with work would you your able ability candidate candidates company experience
+excellent good great ideal including join knowledge plus preferred required
+requirements responsibilities skills strong team teams year years
+""".split())
+
+# Term counts saturate at this many occurrences.
+TERM_SATURATION = 3.0
+SKILL_WEIGHT = 0.6
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_RE.findall((text or "").lower())
+
+@dataclass
+class PreScore:
+    score: int
+    skills_matched: list[str]
+
+class JobProfile:
+    def __init__(self, description: str, requirements: str, skills: list[str]):
+        self.skills = []
+        for skill in skills or []:
+            tokens = tokenize(skill)
+            if tokens:
+                self.skills.append((skill, f" {' '.join(tokens)} "))
+
+        term_counts = Counter(
+            t for t in tokenize(f"{description or ''}\n{requirements or ''}")
+            if t not in STOPWORDS and len(t) > 1 and not t.isdigit()
+        )
+        self.index = {term: i for i, term in enumerate(term_counts)}
+        self.term_weights = np.log1p(np.fromiter(term_counts.values(), dtype=np.float32, count=len(term_counts)))
+        self.total_weight = float(self.term_weights.sum())
+
+    @classmethod
+    def from_job(cls, job) -> "JobProfile":
+        return cls(job.description or "", job.requirements or "", job.skills or [])
+
+    def score_many(self, texts: list[str]) -> list[PreScore]:
+        """Score resumes against the job; 0-100, higher is a better match."""
+        n = len(texts)
+        vocab_size = len(self.index)
+        term_counts = np.zeros((n, vocab_size), dtype=np.float32)
+        skill_hits = np.zeros((n, len(self.skills)), dtype=bool)
+
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            if vocab_size:
+                ids = [self.index[t] for t in tokens if t in self.index]
+                if ids:
+                    term_counts[row] = np.bincount(ids, minlength=vocab_size)
+            if self.skills:
+                normalized = f" {' '.join(tokens)} "
+                skill_hits[row] = [phrase in normalized for _, phrase in self.skills]
+
+        if vocab_size and self.total_weight > 0:
+            term_score = (np.minimum(term_counts, TERM_SATURATION) / TERM_SATURATION) @ self.term_weights
+            term_score /= self.total_weight
+        else:
+            term_score = None
+        skill_score = skill_hits.mean(axis=1) if self.skills else None
+
+        if term_score is not None and skill_score is not None:
+            combined = SKILL_WEIGHT * skill_score + (1 - SKILL_WEIGHT) * term_score
+        elif skill_score is not None:
+            combined = skill_score
+        elif term_score is not None:
+            combined = term_score
+        else:
+            # Nothing to compare against: never gate.
+            combined = np.ones(n, dtype=np.float32)
+
+        scores = np.rint(np.clip(combined, 0.0, 1.0) * 100).astype(int)
+        return [
+            PreScore(
+                score=int(scores[row]),
+                skills_matched=[skill for (skill, _), hit in zip(self.skills, skill_hits[row]) if hit]
+            )
+            for row in range(n)
+        ]
+
+    def score(self, text: str) -> PreScore:
+        return self.score_many([text])[0]
+
+def prescore_threshold(job) -> int:
+    """The minimum pre-score a candidate needs to get a full LLM analysis."""
+    threshold: Optional[int] = getattr(job, "prescore_threshold", None)
+    return settings.prescore_default_threshold if threshold is None else threshold
+
+def local_analysis(prescore: PreScore, threshold: int) -> dict:
+    """An analysis result for candidates rejected by the pre-scorer."""
+    return {
+        "score": prescore.score,
+        "summary": (
+            f"Pre-screened locally: {prescore.score}% keyword match with the job, "
+            f"below the threshold of {threshold}. Not sent for AI analysis."
+        ),
+        "skills_matched": prescore.skills_matched,
+        "experience_years": None,
+        "strengths": [],
+        "concerns": ["Low overlap with the job description and required skills"],
+        "fallback": True
+    }
@@ -0,0 +1,99 @@
+"""Request-scoped SQL profiler.
+
+When ``query_profiler_enabled`` is set, a request sent with an
+``X-Query-Profile: 1`` header gets a ``QueryProfile`` attached to its
+``RequestMetrics``.  Every statement the request runs is then grouped by
+shape: the SQL with its bind parameters, literals and expanded ``IN`` lists
+collapsed, so the same query run once per row (an N+1) shows up as one shape
+with a high count.
+
+The response carries ``X-Query-Count``, ``X-Query-Time-Ms`` and
+``X-Query-Duplicates`` headers (for streamed responses they cover the
+statements run before the body starts), and the full report is printed and
+kept for ``GET /metrics/query-profiles``.
+"""
+import re
+from collections import deque
+from typing import Optional
+from config import get_settings
+
+settings = get_settings()
+
+PROFILE_HEADER = b"x-query-profile"
+
+_WHITESPACE = re.compile(r"\s+")
+_PARAMS = re.compile(r"\$\d+|%\(\w+\)s|%s|\?")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|(?<![\w.])-?\d+(?:\.\d+)?(?![\w])")
+# asyncpg binds carry a cast ("$1::UUID", "$2::TIMESTAMP WITH TIME ZONE").
+_PARAM = r"\?(?:::\w+(?: \w+)*(?:\[\])?)?"
+_PARAM_LISTS = re.compile(rf"({_PARAM})(?:, \1)+")
+_VALUES_ROWS = re.compile(rf"(\({_PARAM}(?:, {_PARAM})*\))(?:, \1)+")
+
+def statement_shape(statement: str) -> str:
+    """``statement`` with parameters and literals replaced by ``?``."""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _LITERALS.sub("?", _PARAMS.sub("?", shape))
+    shape = _PARAM_LISTS.sub(r"\1, ...", _VALUES_ROWS.sub(r"\1, ...", shape))
+    return shape
+
+class QueryProfile:
+    def __init__(self):
+        # shape -> [count, seconds]
+        self.shapes: dict[str, list] = {}
+
+    def record(self, statement: str, seconds: float):
+        entry = self.shapes.setdefault(statement_shape(statement), [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    @property
+    def duplicates(self) -> int:
+        """Statements that repeated a shape already run in this request."""
+        return sum(count - 1 for count, _ in self.shapes.values())
+
+    def report(self, queries: int, seconds: float, **request) -> dict:
+        shapes = sorted(self.shapes.items(), key=lambda item: (-item[1][0], -item[1][1]))
+        return {
+            **request,
+            "queries": queries,
+            "db_ms": round(seconds * 1000, 2),
+            "duplicates": self.duplicates,
+            "shapes": [
+                {"count": count, "db_ms": round(total * 1000, 2), "statement": shape}
+                for shape, (count, total) in shapes
+            ],
+        }
+
+_reports: deque = deque(maxlen=max(1, settings.query_profiler_max_reports))
+
+def wants_profile(scope) -> bool:
+    if not settings.query_profiler_enabled:
+        return False
+    return any(
+        name == PROFILE_HEADER and value not in (b"", b"0", b"false")
+        for name, value in scope.get("headers", ())
+    )
+
+def profile_headers(profile: QueryProfile, queries: int, seconds: float) -> list[tuple[bytes, bytes]]:
+    return [
+        (b"x-query-count", str(queries).encode()),
+        (b"x-query-time-ms", f"{seconds * 1000:.2f}".encode()),
+        (b"x-query-duplicates", str(profile.duplicates).encode()),
+    ]
+
+def finish_profile(profile: QueryProfile, queries: int, seconds: float, **request) -> dict:
+    report = profile.report(queries, seconds, **request)
+    _reports.append(report)
+    print(
+        f"Query profile {report['method']} {report['path']} -> {report['status']}: "
+        f"{queries} queries, {report['db_ms']} ms, {report['duplicates']} duplicates"
+    )
+    for shape in report["shapes"]:
+        if shape["count"] > 1:
+            print(f"  {shape['count']}x {shape['db_ms']} ms  {shape['statement'][:300]}")
+    return report
+
+def recent_profiles(limit: Optional[int] = None) -> list[dict]:
+    """Most recent reports first."""
+    reports = list(reversed(_reports))
+    return reports[:limit] if limit else reports
@@ -0,0 +1,167 @@
+"""Plan-aware per-tenant rate limits and quotas.
+
+Request rates are token buckets keyed by user and kind (``ai`` or
+``uploads``), refilled at the per-minute rate of the user's plan in
+``PLANS``.  The tier comes from the already-resolved user, so enforcing a
+limit costs no database query.
+
+Buckets live in this process by default, so each worker enforces the limit
+separately.  Setting ``rate_limit_store_url`` shares them between workers
+through Redis; if the shared store fails, limits fall back to the
+in-process buckets.  Any ``BucketStore`` implementation can replace the
+store, e.g. ``MemoryBucketStore`` in tests.
+
+Plan quotas (``jobs_limit``, ``resumes_limit``) are checked against the
+trigger-maintained ``user_stats`` counters.
+"""
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+from fastapi import Depends, HTTPException, status
+from config import get_settings
+from models import User
+from auth import get_current_user
+from services.llm import llm_client
+from services.stripe_service import PLANS
+
+settings = get_settings()
+
+# Request kind -> PLANS key holding its per-minute rate
+RATE_LIMITS = {"ai": "ai_requests_per_minute", "uploads": "uploads_per_minute"}
+
+def plan_limits(tier: Optional[str]) -> dict:
+    return PLANS.get(tier or "free", PLANS["free"])
+
+class BucketStore(ABC):
+    @abstractmethod
+    async def take(self, key: str, per_minute: float, cost: float = 1.0) -> float:
+        """Take ``cost`` tokens from a bucket holding up to a minute of requests.
+
+        Returns 0 if they were taken, otherwise the seconds until they will be
+        available.
+        """
+
+class MemoryBucketStore(BucketStore):
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        # key -> (tokens, monotonic time of last update)
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, per_minute: float, cost: float = 1.0) -> float:
+        now = time.monotonic()
+        rate = per_minute / 60
+        tokens, updated_at = self._buckets.get(key, (per_minute, now))
+        tokens = min(per_minute, tokens + (now - updated_at) * rate)
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            wait = (cost - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+_TAKE_SCRIPT = """
+local per_minute = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local rate = per_minute / 60
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or per_minute
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(per_minute, tokens + math.max(0, now - updated_at) * rate)
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now)
+redis.call('EXPIRE', KEYS[1], 120)
+return tostring(wait)
+"""
+
+class RedisBucketStore(BucketStore):
+    """Buckets shared by every worker; needs the optional ``redis`` package."""
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+        self._client = redis.from_url(url)
+        self._take = self._client.register_script(_TAKE_SCRIPT)
+
+    async def take(self, key: str, per_minute: float, cost: float = 1.0) -> float:
+        wait = await self._take(keys=[f"ratelimit:{key}"], args=[per_minute, cost, time.time()])
+        return float(wait)
+
+class RateLimiter:
+    def __init__(self, store: BucketStore, fallback: BucketStore):
+        self.store = store
+        self.fallback = fallback
+        self.allowed: dict[str, int] = {}
+        self.limited: dict[str, int] = {}
+        self.quota_rejections = 0
+        self.store_errors = 0
+
+    async def check(self, user_id, tier: Optional[str], kind: str, cost: float = 1.0):
+        """Charge one ``kind`` request to the user, or raise a 429."""
+        per_minute = plan_limits(tier)[RATE_LIMITS[kind]]
+        if not settings.rate_limit_enabled or per_minute < 0:
+            return
+
+        key = f"{kind}:{user_id}"
+        try:
+            wait = await self.store.take(key, per_minute, cost)
+        except Exception as e:
+            print(f"Rate limit store error: {e}")
+            self.store_errors += 1
+            wait = await self.fallback.take(key, per_minute, cost)
+
+        if wait > 0:
+            self.limited[kind] = self.limited.get(kind, 0) + 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit for your plan reached, please retry shortly",
+                headers={"Retry-After": str(max(1, round(wait)))}
+            )
+        self.allowed[kind] = self.allowed.get(kind, 0) + 1
+
+    def stats(self) -> dict:
+        return {
+            "store": type(self.store).__name__,
+            "allowed": dict(self.allowed),
+            "limited": dict(self.limited),
+            "quota_rejections": self.quota_rejections,
+            "store_errors": self.store_errors,
+        }
+
+def _create_store() -> BucketStore:
+    if settings.rate_limit_store_url:
+        return RedisBucketStore(settings.rate_limit_store_url)
+    return MemoryBucketStore(settings.rate_limit_max_buckets)
+
+rate_limiter = RateLimiter(_create_store(), MemoryBucketStore(settings.rate_limit_max_buckets))
+
+def rate_limit(kind: str):
+    """Route dependency charging one ``kind`` request to the current user.
+
+    Also records the user's plan weight for fair scheduling of Gemini calls.
+    """
+    async def dependency(current_user: User = Depends(get_current_user)):
+        limits = plan_limits(current_user.subscription_tier)
+        llm_client.set_tenant_weight(str(current_user.id), limits["ai_weight"])
+        await rate_limiter.check(current_user.id, current_user.subscription_tier, kind)
+    return dependency
+
+def check_quota(tier: Optional[str], name: str, used: Optional[int], adding: int = 1):
+    """Raise a 403 if adding ``adding`` items would exceed the plan's ``name``."""
+    limit = plan_limits(tier)[name]
+    if limit < 0 or (used or 0) + adding <= limit:
+        return
+    rate_limiter.quota_rejections += 1
+    noun = "jobs" if name == "jobs_limit" else "resumes"
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail=f"Your plan allows {limit} {noun}; upgrade to add more"
+    )
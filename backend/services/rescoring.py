@@ -0,0 +1,243 @@
+"""Background re-scoring of a job's candidates after its scoring inputs change.
+
+Every candidate stores the ``scoring_key`` of the job inputs it was scored
+against (description, requirements, skills, pre-score threshold, resume token
+budget and prompt version).  When a job is edited, only candidates whose key differs from the
+job's current key are revisited:
+
+* candidates now below the pre-score threshold get a local analysis;
+* LLM analyses are kept as-is when only the requirements or threshold changed,
+  since neither is part of the Gemini prompt;
+* the stored compacted resume is reused unless the token budget changed;
+* otherwise the analysis cache is consulted before calling Gemini.
+
+Edits are debounced per job, so a burst of saves produces one run, and an
+edit during a run restarts it against the latest text.  Runs use a couple of
+workers and back off while interactive Gemini traffic is high.
+
+Progress is published to the job's event channel as ``rescore`` events.
+Run state lives in this process only, like bulk upload batches.
+"""
+import asyncio
+import hashlib
+import json
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timezone
+from typing import Optional
+from uuid import UUID
+from sqlalchemy import select, update, func
+from config import get_settings
+from database import AsyncSessionLocal
+from models import Job, Candidate
+from services.ai import analyze_resume, PROMPT_VERSION
+from services.analysis_cache import analysis_cache, cache_key
+from services.llm import llm_client
+from services.events import event_bus, job_channel
+from services.prescoring import JobProfile, prescore_threshold, local_analysis
+from services.compaction import compact_resume, resume_token_budget
+
+settings = get_settings()
+
+PAGE_SIZE = 100
+
+def scoring_key(job) -> str:
+    """Hash of every job input that affects a candidate's score."""
+    payload = json.dumps(
+        [
+            PROMPT_VERSION,
+            job.description or "",
+            job.requirements or "",
+            sorted(job.skills or []),
+            prescore_threshold(job),
+            resume_token_budget(job),
+        ],
+        ensure_ascii=False,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+@dataclass
+class RescoreRun:
+    job_id: UUID
+    user_id: UUID
+    llm_inputs_changed: bool
+    status: str = "pending"  # pending, running, completed, failed, cancelled
+    total: int = 0
+    processed: int = 0
+    unchanged: int = 0
+    prescored: int = 0
+    cache_hits: int = 0
+    llm_calls: int = 0
+    failed: int = 0
+    error: Optional[str] = None
+    queued_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+def _emit(run: RescoreRun):
+    event_bus.publish(job_channel(run.job_id), "rescore", asdict(run))
+
+_runs: "OrderedDict[UUID, RescoreRun]" = OrderedDict()
+_tasks: dict[UUID, asyncio.Task] = {}
+
+def get_rescore(job_id: UUID) -> Optional[RescoreRun]:
+    return _runs.get(job_id)
+
+def schedule_rescore(job_id: UUID, user_id: UUID, llm_inputs_changed: bool) -> RescoreRun:
+    """Queue a re-score of the job, replacing any pending or running one."""
+    previous = _runs.pop(job_id, None)
+    if previous and previous.status in ("pending", "running"):
+        # The superseded run may not have reached every candidate.
+        llm_inputs_changed = llm_inputs_changed or previous.llm_inputs_changed
+        previous.status = "cancelled"
+        _emit(previous)
+    task = _tasks.pop(job_id, None)
+    if task and not task.done():
+        task.cancel()
+
+    run = RescoreRun(job_id=job_id, user_id=user_id, llm_inputs_changed=llm_inputs_changed)
+    _runs[job_id] = run
+    while len(_runs) > settings.rescore_max_tracked_jobs:
+        oldest_id, oldest = next(iter(_runs.items()))
+        if oldest.status in ("pending", "running"):
+            break
+        del _runs[oldest_id]
+
+    _emit(run)
+    task = asyncio.create_task(_run_after_debounce(run))
+    _tasks[job_id] = task
+    task.add_done_callback(lambda t: _tasks.pop(job_id, None) if _tasks.get(job_id) is t else None)
+    return run
+
+async def _wait_for_llm_capacity():
+    """Hold off while interactive traffic is using most Gemini slots."""
+    limit = max(1, int(llm_client.max_concurrency * settings.rescore_llm_share))
+    while llm_client.stats()["in_flight"] >= limit:
+        await asyncio.sleep(settings.rescore_backoff_seconds)
+
+async def _rescore_one(run: RescoreRun, job, key: str, candidate, prescore, threshold: int, budget: int) -> dict:
+    """Return the column updates for one candidate."""
+    compact_updates = {}
+    resume_compact = candidate.resume_compact
+    if resume_compact is None or candidate.compact_budget != budget:
+        compact = compact_resume(candidate.resume_text or "", budget)
+        resume_compact = compact.text
+        compact_updates = {
+            "resume_compact": compact.text,
+            "compact_budget": budget,
+            "resume_tokens": compact.original_tokens,
+            "compact_tokens": compact.compact_tokens,
+        }
+
+    if prescore.score < threshold:
+        run.prescored += 1
+        analysis, source = local_analysis(prescore, threshold), "prescore"
+    elif (
+        candidate.analysis_source == "llm"
+        and candidate.scoring_key is not None
+        and not run.llm_inputs_changed
+    ):
+        run.unchanged += 1
+        return {"id": candidate.id, "prescore": prescore.score, "scoring_key": key, **compact_updates}
+    else:
+        source = "llm"
+        analysis = None
+        if settings.analysis_cache_enabled:
+            analysis = await analysis_cache.get(
+                cache_key(resume_compact, job.description or "", job.skills or [])
+            )
+        if analysis is not None:
+            run.cache_hits += 1
+        else:
+            await _wait_for_llm_capacity()
+            run.llm_calls += 1
+            analysis = await analyze_resume(
+                resume_compact,
+                job.description or "",
+                job.skills or [],
+                tenant_id=str(run.user_id)
+            )
+            if analysis.get("fallback"):
+                # Keep the old score; a NULL key makes the next run redo it in full.
+                run.failed += 1
+                return {"id": candidate.id, "scoring_key": None, **compact_updates}
+            if settings.analysis_cache_enabled:
+                await analysis_cache.put(
+                    cache_key(resume_compact, job.description or "", job.skills or []),
+                    analysis
+                )
+
+    return {
+        "id": candidate.id,
+        "ai_score": analysis["score"],
+        "ai_summary": analysis["summary"],
+        "skills_matched": analysis["skills_matched"],
+        "experience_years": analysis["experience_years"],
+        "prescore": prescore.score,
+        "analysis_source": source,
+        "scoring_key": key,
+        **compact_updates,
+    }
+
+async def _run_after_debounce(run: RescoreRun):
+    try:
+        await asyncio.sleep(settings.rescore_debounce_seconds)
+        run.status = "running"
+        run.started_at = datetime.now(timezone.utc)
+        _emit(run)
+        await _run(run)
+        run.status = "completed"
+    except asyncio.CancelledError:
+        # schedule_rescore already reported the cancellation.
+        run.status = "cancelled"
+        run.finished_at = datetime.now(timezone.utc)
+        raise
+    except Exception as e:
+        print(f"Rescore of job {run.job_id} failed: {e}")
+        run.status = "failed"
+        run.error = str(e)
+    run.finished_at = datetime.now(timezone.utc)
+    _emit(run)
+
+async def _run(run: RescoreRun):
+    async with AsyncSessionLocal() as db:
+        job = await db.get(Job, run.job_id)
+        if job is None:
+            raise ValueError("Job not found")
+        key = scoring_key(job)
+        profile = JobProfile.from_job(job)
+        threshold = prescore_threshold(job)
+        budget = resume_token_budget(job)
+        stale = (Candidate.job_id == run.job_id) & Candidate.scoring_key.is_distinct_from(key)
+        run.total = await db.scalar(select(func.count()).select_from(Candidate).where(stale))
+
+    workers = asyncio.Semaphore(max(1, settings.rescore_concurrency))
+
+    async def rescore(candidate, prescore):
+        async with workers:
+            return await _rescore_one(run, job, key, candidate, prescore, threshold, budget)
+
+    last_id = None
+    while True:
+        query = select(
+            Candidate.id, Candidate.resume_text, Candidate.resume_compact, Candidate.compact_budget,
+            Candidate.analysis_source, Candidate.scoring_key
+        ).where(stale)
+        if last_id is not None:
+            query = query.where(Candidate.id > last_id)
+        async with AsyncSessionLocal() as db:
+            page = (await db.execute(query.order_by(Candidate.id).limit(PAGE_SIZE))).all()
+        if not page:
+            return
+        last_id = page[-1].id
+
+        scores = profile.score_many([candidate.resume_text or "" for candidate in page])
+        updates = await asyncio.gather(*(
+            rescore(candidate, prescore) for candidate, prescore in zip(page, scores)
+        ))
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(Candidate), list(updates))
+            await db.commit()
+        run.processed += len(page)
+        _emit(run)
@@ -0,0 +1,92 @@
+"""Full-text and skill search over a user's candidates.
+
+Matching uses the trigger-maintained ``candidates.search_vector``
+column (GIN-indexed).  The query is parsed with both the ``english`` and the
+``simple`` configuration and either may match, so names and emails (indexed
+unstemmed as well as stemmed) are found as typed.  Skill filters use the GIN
+index on ``candidates.skills_matched``.  Results are ranked with ``ts_rank_cd``,
+highlighted with ``ts_headline`` and paged with a (rank, id) keyset cursor.
+Only the rows on the returned page are highlighted.
+"""
+import math
+from typing import Optional
+from uuid import UUID
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from services.pagination import encode_cursor, decode_cursor
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+
+_POSTGRES_SEARCH = """
+WITH q AS (SELECT websearch_to_tsquery('english', :q) || websearch_to_tsquery('simple', :q) AS query),
+page AS (
+    SELECT c.id, {rank} AS rank
+    FROM candidates c
+    JOIN jobs j ON j.id = c.job_id, q
+    WHERE j.user_id = :user_id
+      {match}
+      {skills}
+      {keyset}
+    ORDER BY rank DESC, c.id
+    LIMIT :limit
+)
+SELECT c.id, c.job_id, c.name, c.email, c.ai_score, c.status, c.skills_matched, page.rank,
+       {highlight} AS highlight
+FROM page
+JOIN candidates c ON c.id = page.id, q
+ORDER BY page.rank DESC, c.id
+"""
+
+def _postgres_query(q: Optional[str], skills: list[str], cursor: Optional[list]) -> str:
+    if q:
+        rank = "ts_rank_cd(c.search_vector, q.query)"
+        match = "AND c.search_vector @@ q.query"
+        highlight = (
+            "ts_headline('english', coalesce(c.resume_text, ''), q.query, "
+            f"'MaxFragments=2, MaxWords=20, MinWords=5, StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}')"
+        )
+    else:
+        # Skill-only searches are ordered by AI score.
+        rank = "c.ai_score::float4"
+        match = ""
+        highlight = "NULL"
+    return _POSTGRES_SEARCH.format(
+        rank=rank,
+        match=match,
+        skills="AND c.skills_matched @> CAST(:skills AS text[])" if skills else "",
+        keyset=f"AND ({rank} < :cursor_rank OR ({rank} = :cursor_rank AND c.id > :cursor_id))" if cursor else "",
+        highlight=highlight
+    )
+
+async def search_candidates(
+    db: AsyncSession,
+    user_id: UUID,
+    q: Optional[str],
+    skills: list[str],
+    limit: int,
+    cursor: Optional[str] = None
+) -> tuple[list[dict], Optional[str]]:
+    """Return one page of ranked matches and the cursor for the next page."""
+    keyset = decode_cursor(cursor, 2) if cursor else None
+    params = {"user_id": user_id, "limit": limit, "q": q or ""}
+    if skills:
+        params["skills"] = skills
+    if keyset:
+        try:
+            params["cursor_rank"] = float(keyset[0])
+            params["cursor_id"] = UUID(str(keyset[1]))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if not math.isfinite(params["cursor_rank"]):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    sql = _postgres_query(q, skills, keyset)
+    rows = (await db.execute(text(sql), params)).mappings().all()
+    hits = [dict(row) for row in rows]
+    next_cursor = None
+    if len(hits) == limit:
+        last = hits[-1]
+        next_cursor = encode_cursor(last["rank"], str(last["id"]))
+    return hits, next_cursor
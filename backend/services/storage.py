@@ -0,0 +1,125 @@
+"""Content-addressed blob store for uploaded resumes.
+
+Uploads are copied to disk in fixed-size chunks and hashed as they are
+written, so a file is never held in memory as a whole.  Blobs are stored at
+``<root>/<aa>/<bb>/<sha256>``.  Identical files uploaded to different jobs
+share one blob on disk.
+"""
+import asyncio
+import hashlib
+import os
+import uuid
+import zipfile
+from dataclasses import dataclass
+from typing import BinaryIO, Optional
+from fastapi import UploadFile
+from config import get_settings
+from services import telemetry
+
+settings = get_settings()
+
+class BlobTooLargeError(Exception):
+    def __init__(self, max_bytes: int):
+        super().__init__(f"File exceeds the {max_bytes // (1024 * 1024)} MB upload limit")
+        self.max_bytes = max_bytes
+
+@dataclass
+class StoredBlob:
+    sha256: str
+    path: str
+    size: int
+    deduplicated: bool = False
+
+class BlobStore:
+    def __init__(self, root: str, chunk_size: int):
+        self.root = root
+        self.chunk_size = chunk_size
+        self.bytes_written = 0
+        self.bytes_deduplicated = 0
+        os.makedirs(os.path.join(self.root, "tmp"), exist_ok=True)
+
+    def path_for(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def _save_fileobj(self, source: BinaryIO, max_bytes: int) -> StoredBlob:
+        tmp_path = os.path.join(self.root, "tmp", uuid.uuid4().hex)
+        hasher = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp_path, "wb") as out:
+                while chunk := source.read(self.chunk_size):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise BlobTooLargeError(max_bytes)
+                    hasher.update(chunk)
+                    out.write(chunk)
+
+            sha256 = hasher.hexdigest()
+            path = self.path_for(sha256)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+                self.bytes_deduplicated += size
+                telemetry.upload_bytes.inc("deduplicated", amount=size)
+                return StoredBlob(sha256=sha256, path=path, size=size, deduplicated=True)
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+            self.bytes_written += size
+            telemetry.upload_bytes.inc("written", amount=size)
+            return StoredBlob(sha256=sha256, path=path, size=size)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    async def save_upload(self, upload: UploadFile, max_bytes: Optional[int] = None) -> StoredBlob:
+        """Stream an uploaded file into the store, enforcing the size limit."""
+        max_bytes = max_bytes or settings.max_upload_bytes
+        if upload.size is not None and upload.size > max_bytes:
+            raise BlobTooLargeError(max_bytes)
+        await upload.seek(0)
+        return await asyncio.to_thread(self._save_fileobj, upload.file, max_bytes)
+
+    def _save_member(self, archive: zipfile.ZipFile, member: str, max_bytes: int) -> StoredBlob:
+        info = archive.getinfo(member)
+        if info.file_size > max_bytes:
+            raise BlobTooLargeError(max_bytes)
+        with archive.open(info) as source:
+            return self._save_fileobj(source, max_bytes)
+
+    def _save_archive_member(self, archive_path: str, member: str, max_bytes: int) -> StoredBlob:
+        with zipfile.ZipFile(archive_path) as archive:
+            return self._save_member(archive, member, max_bytes)
+
+    def _save_archive_members(self, archive_path: str, members: list[str], max_bytes: int) -> dict:
+        results = {}
+        with zipfile.ZipFile(archive_path) as archive:
+            for member in members:
+                try:
+                    results[member] = self._save_member(archive, member, max_bytes)
+                except (BlobTooLargeError, KeyError, zipfile.BadZipFile, OSError, RuntimeError) as e:
+                    results[member] = e
+        return results
+
+    async def save_archive_member(self, archive_path: str, member: str, max_bytes: Optional[int] = None) -> StoredBlob:
+        """Decompress one ZIP member straight into the store."""
+        return await asyncio.to_thread(
+            self._save_archive_member, archive_path, member, max_bytes or settings.max_upload_bytes
+        )
+
+    async def save_archive_members(self, archive_path: str, members: list[str], max_bytes: Optional[int] = None) -> dict:
+        """Decompress several ZIP members, one at a time, with one pass over the directory.
+
+        Returns ``{member: StoredBlob or the exception that member raised}``.
+        """
+        return await asyncio.to_thread(
+            self._save_archive_members, archive_path, members, max_bytes or settings.max_upload_bytes
+        )
+
+    def stats(self) -> dict:
+        return {
+            "bytes_written": self.bytes_written,
+            "bytes_deduplicated": self.bytes_deduplicated,
+        }
+
+blob_store = BlobStore(root=settings.blob_store_dir, chunk_size=settings.upload_chunk_size)
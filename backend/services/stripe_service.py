@@ -12,6 +12,10 @@ PLANS = {
         "price": 0,
         "jobs_limit": 1,
         "resumes_limit": 50,
+        # Per-tenant request rates and share of contended Gemini capacity
+        "ai_requests_per_minute": 10,
+        "uploads_per_minute": 10,
+        "ai_weight": 1,
         "features": ["Basic AI parsing", "Manual emails"]
     },
     "pro": {
@@ -20,6 +24,9 @@ PLANS = {
         "price_id": settings.stripe_price_pro,
         "jobs_limit": 5,
         "resumes_limit": 500,
+        "ai_requests_per_minute": 60,
+        "uploads_per_minute": 60,
+        "ai_weight": 4,
         "features": ["Advanced AI ranking", "Automated emails", "Custom templates"]
     },
     "business": {
@@ -28,6 +35,9 @@ PLANS = {
         "price_id": settings.stripe_price_business,
         "jobs_limit": 20,
         "resumes_limit": -1,  # Unlimited
+        "ai_requests_per_minute": 240,
+        "uploads_per_minute": 240,
+        "ai_weight": 8,
         "features": ["Unlimited resumes", "Team access", "ATS integration", "Priority support"]
     }
 }
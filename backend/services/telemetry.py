@@ -0,0 +1,289 @@
+"""Prometheus metrics for the whole app, served on ``GET /metrics``.
+
+Counters and histograms are plain dicts updated without locks: almost every
+update happens on the event loop, and the few made from worker threads
+(blob writes) can at worst lose an increment under contention.
+
+Each uvicorn worker keeps its own values.  When ``metrics_dir`` is set, every
+worker writes a snapshot of its values to ``<metrics_dir>/<pid>.json`` every
+``metrics_snapshot_interval_seconds``, and ``/metrics`` adds up its own live
+values and the other workers' snapshots.  Snapshots of exited workers keep
+counting towards counters and histograms, so totals never go backwards;
+their gauges are dropped once the snapshot is stale.
+
+A request-scoped ``RequestMetrics`` (via ``current_request``) collects the
+number and duration of the SQL statements each request runs, and their
+shapes when the request is profiled (see ``services.query_profiler``).
+"""
+import asyncio
+import contextvars
+import glob
+import json
+import os
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Optional, Sequence
+from config import get_settings
+from services.query_profiler import QueryProfile, finish_profile, profile_headers, wants_profile
+
+settings = get_settings()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+class Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values: dict[tuple, object] = {}
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value: float, *labels):
+        self.values[labels] = value
+
+    def inc(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) - amount
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        # [per-bucket counts (last one is +Inf), sum]
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+class Registry:
+    def __init__(self):
+        self.metrics: dict[str, Metric] = {}
+
+    def _add(self, metric: Metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def snapshot(self) -> dict:
+        return {
+            name: [[list(labels), value] for labels, value in list(metric.values.items())]
+            for name, metric in self.metrics.items()
+        }
+
+    def _merged(self, snapshots: list[tuple[dict, bool]]) -> dict[str, dict[tuple, object]]:
+        merged = {}
+        for name, metric in self.metrics.items():
+            values = {}
+            for labels, value in list(metric.values.items()):
+                values[labels] = [list(value[0]), value[1]] if isinstance(metric, Histogram) else value
+            for snapshot, fresh in snapshots:
+                if isinstance(metric, Gauge) and not fresh:
+                    continue
+                for labels, value in snapshot.get(name, ()):
+                    labels = tuple(labels)
+                    if isinstance(metric, Histogram):
+                        if len(value[0]) != len(metric.buckets) + 1:
+                            continue
+                        entry = values.setdefault(labels, [[0] * (len(metric.buckets) + 1), 0.0])
+                        entry[0] = [a + b for a, b in zip(entry[0], value[0])]
+                        entry[1] += value[1]
+                    else:
+                        values[labels] = values.get(labels, 0) + value
+            merged[name] = values
+        return merged
+
+    def render(self, snapshots: list[tuple[dict, bool]] = ()) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        merged = self._merged(list(snapshots))
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            for labels, value in sorted(merged[name].items()):
+                pairs = list(zip(metric.labelnames, labels))
+                if isinstance(metric, Histogram):
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets + (float("inf"),), value[0]):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else _number(bound)
+                        lines.append(f"{name}_bucket{_labels(pairs + [('le', le)])} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(pairs)} {_number(value[1])}")
+                    lines.append(f"{name}_count{_labels(pairs)} {cumulative}")
+                else:
+                    lines.append(f"{name}{_labels(pairs)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+registry = Registry()
+
+# HTTP
+http_requests = registry.counter("hiremind_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+http_duration = registry.histogram("hiremind_http_request_duration_seconds", "HTTP request latency, until the response body is sent.", ("method", "route"))
+http_in_flight = registry.gauge("hiremind_http_requests_in_flight", "HTTP requests being handled.")
+http_exceptions = registry.counter("hiremind_http_unhandled_exceptions_total", "Requests that ended in an unhandled exception.", ("route", "exception"))
+http_db_queries = registry.histogram("hiremind_http_request_db_queries", "SQL statements run per HTTP request.", ("route",), buckets=COUNT_BUCKETS)
+http_db_duration = registry.histogram("hiremind_http_request_db_seconds", "Time spent in SQL statements per HTTP request.", ("route",))
+
+# Database
+db_queries = registry.counter("hiremind_db_queries_total", "SQL statements executed.")
+db_query_duration = registry.histogram("hiremind_db_query_duration_seconds", "SQL statement latency.")
+db_pool_wait = registry.histogram("hiremind_db_pool_wait_seconds", "Time spent waiting for a pooled connection.")
+
+# Gemini
+llm_requests = registry.counter("hiremind_llm_requests_total", "Gemini calls by operation and outcome.", ("operation", "outcome"))
+llm_duration = registry.histogram("hiremind_llm_request_duration_seconds", "Gemini call latency, excluding time queued for a slot.", ("operation",))
+llm_tokens = registry.counter("hiremind_llm_tokens_total", "Gemini tokens by direction (estimated when the API reports none).", ("direction",))
+
+# Resume extraction and uploads
+extraction_duration = registry.histogram("hiremind_extraction_duration_seconds", "Resume text extraction time.", ("format",))
+extraction_pages = registry.counter("hiremind_extraction_pages_total", "Resume pages parsed.")
+extraction_errors = registry.counter("hiremind_extraction_errors_total", "Resume extractions that failed or timed out.")
+upload_bytes = registry.counter("hiremind_blob_bytes_total", "Bytes received by the blob store, by outcome.", ("outcome",))
+
+@dataclass
+class RequestMetrics:
+    db_queries: int = 0
+    db_seconds: float = 0.0
+    profile: Optional[QueryProfile] = None
+
+current_request: contextvars.ContextVar[Optional[RequestMetrics]] = contextvars.ContextVar("current_request", default=None)
+
+def record_query(seconds: float, statement: str):
+    db_queries.inc()
+    db_query_duration.observe(seconds)
+    request = current_request.get()
+    if request is not None:
+        request.db_queries += 1
+        request.db_seconds += seconds
+        if request.profile is not None:
+            request.profile.record(statement, seconds)
+
+def route_label(scope) -> str:
+    """The matched route template, so path parameters do not become labels."""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and DB work per route."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        request = RequestMetrics(profile=QueryProfile() if wants_profile(scope) else None)
+        token = current_request.set(request)
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if request.profile is not None:
+                    message["headers"] = [
+                        *message.get("headers", ()),
+                        *profile_headers(request.profile, request.db_queries, request.db_seconds),
+                    ]
+            await send(message)
+
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_in_flight.dec()
+            current_request.reset(token)
+            route = route_label(scope)
+            method = scope["method"]
+            http_requests.inc(method, route, str(status_code))
+            http_duration.observe(time.perf_counter() - started, method, route)
+            http_db_queries.observe(request.db_queries, route)
+            http_db_duration.observe(request.db_seconds, route)
+            if request.profile is not None:
+                finish_profile(
+                    request.profile, request.db_queries, request.db_seconds,
+                    method=method, path=scope["path"], route=route, status=status_code
+                )
+
+def _snapshot_path(pid: int) -> str:
+    return os.path.join(settings.metrics_dir, f"{pid}.json")
+
+def _write_snapshot(payload: str):
+    os.makedirs(settings.metrics_dir, exist_ok=True)
+    path = _snapshot_path(os.getpid())
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+def write_snapshot():
+    if settings.metrics_dir:
+        _write_snapshot(json.dumps(registry.snapshot()))
+
+def _read_snapshots() -> list[tuple[dict, bool]]:
+    if not settings.metrics_dir:
+        return []
+    own = _snapshot_path(os.getpid())
+    stale_before = time.time() - settings.metrics_snapshot_interval_seconds * 3
+    snapshots = []
+    for path in glob.glob(os.path.join(settings.metrics_dir, "*.json")):
+        if path == own:
+            continue
+        try:
+            with open(path) as f:
+                snapshots.append((json.load(f), os.path.getmtime(path) >= stale_before))
+        except (OSError, ValueError):
+            continue
+    return snapshots
+
+def render_metrics() -> str:
+    """This worker's live values plus every other worker's latest snapshot."""
+    return registry.render(_read_snapshots())
+
+async def run_snapshot_writer():
+    while True:
+        await asyncio.sleep(settings.metrics_snapshot_interval_seconds)
+        try:
+            # Serialize on the loop so no value changes mid-snapshot.
+            await asyncio.to_thread(_write_snapshot, json.dumps(registry.snapshot()))
+        except OSError as e:
+            print(f"Metrics snapshot error: {e}")
@@ -0,0 +1,21 @@
+import asyncio
+import services.ai as ai
+
+def analyze(monkeypatch, reply):
+    async def generate(prompt, tenant_id=None):
+        return reply
+    monkeypatch.setattr(ai.settings, "gemini_api_key", "test-key")
+    monkeypatch.setattr(ai.llm_client, "generate", generate)
+    return asyncio.run(ai.analyze_resume("Python engineer", "Backend role", ["python"]))
+
+def test_analysis_score_is_an_integer(monkeypatch):
+    analysis = analyze(monkeypatch, 'Sure: {"score": "82", "summary": "Solid."}')
+    assert analysis["score"] == 82
+    assert analysis["skills_matched"] == [] and analysis["experience_years"] == 0
+    assert "fallback" not in analysis
+
+def test_unusable_analysis_falls_back(monkeypatch):
+    for reply in ('{"score": null, "summary": "?"}', '{"summary": "no score"}', '{"score": "high"}', "[]"):
+        analysis = analyze(monkeypatch, reply)
+        assert analysis["fallback"] is True
+        assert isinstance(analysis["score"], int)
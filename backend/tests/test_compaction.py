@@ -0,0 +1,64 @@
+from services.compaction import compact_resume, _is_noise
+
+RESUME = """Jane Doe
+jane.doe@example.com | +1 (555) 123-4567 | linkedin.com/in/janedoe
+Senior Backend Engineer
+
+Summary
+Backend engineer with 8 years building Python services.
+
+Experience
+Acme Corp - Senior Engineer
+2019 - 2023
+Led a team of
+5
+engineers migrating billing to FastAPI and PostgreSQL.
+Initech - Software Engineer
+2015-2019
+1
+Jane Doe - Resume
+Built Django APIs and Celery pipelines.
+
+Education
+BSc Computer Science, 2011 - 2015
+2
+Jane Doe - Resume
+
+References
+Available on request
+3
+Jane Doe - Resume
+"""
+
+def test_employment_dates_are_not_phone_numbers():
+    assert not _is_noise("2019 - 2023")
+    assert not _is_noise("2018-2021")
+    assert not _is_noise("(2015 - 2019)")
+    assert _is_noise("+1 (555) 123-4567")
+    assert _is_noise("jane.doe@example.com | 07700 900123")
+
+def test_compaction_keeps_experience_evidence():
+    text = compact_resume(RESUME, 0).text
+    assert "2019 - 2023" in text
+    assert "2015-2019" in text
+    assert "2011 - 2015" in text
+    # A lone number is content; the 1, 2, 3 page sequence is not.
+    assert "\n5\n" in text
+    assert "\n1\n" not in text and "\n2\n" not in text
+    assert "555" not in text
+    assert text.count("Jane Doe - Resume") == 1
+    assert "Available on request" not in text
+
+def test_repeated_job_titles_are_kept():
+    resume = "\f".join([
+        "Jane Doe - Resume\nJane Doe\nExperience\nAcme Corp\nSoftware Engineer\n"
+        "Built billing services in Python.\nMentored two junior engineers.\nPage footer",
+        "Jane Doe - Resume\nInitech\nSoftware Engineer\nMaintained Django APIs.\n"
+        "Ran the on-call rotation.\nOwned the release process.\nPage footer",
+        "Jane Doe - Resume\nGlobex\nSoftware Engineer\nWrote data pipelines.\n"
+        "Cut batch runtimes in half.\nIntroduced typed configs.\nPage footer",
+    ])
+    text = compact_resume(resume, 0).text
+    assert text.count("Software Engineer") == 3
+    assert text.count("Jane Doe - Resume") == 1
+    assert text.count("Page footer") == 1
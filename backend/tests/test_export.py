@@ -0,0 +1,12 @@
+from services.export import _csv_value
+
+def test_formulas_are_escaped():
+    assert _csv_value("=HYPERLINK(\"http://evil\")") == "'=HYPERLINK(\"http://evil\")"
+    assert _csv_value("@SUM(A1:A2)") == "'@SUM(A1:A2)"
+    assert _csv_value("+cmd|' /C calc'!A0") == "'+cmd|' /C calc'!A0"
+    assert _csv_value("-2+3") == "'-2+3"
+
+def test_phone_numbers_are_not_escaped():
+    assert _csv_value("+1 555 010 0199") == "+1 555 010 0199"
+    assert _csv_value("+44 (20) 7946-0958") == "+44 (20) 7946-0958"
+    assert _csv_value("Jane Doe") == "Jane Doe"
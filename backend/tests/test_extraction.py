@@ -0,0 +1,91 @@
+import asyncio
+import docx
+import pytest
+from services.extraction import extract_resume_text, shutdown_extraction_pool
+
+@pytest.fixture(scope="module", autouse=True)
+def extraction_pool():
+    yield
+    shutdown_extraction_pool()
+
+def extract(path):
+    return asyncio.run(extract_resume_text(str(path)))
+
+def test_docx_round_trip(tmp_path):
+    document = docx.Document()
+    document.add_paragraph("Jane Doe")
+    document.add_paragraph("Senior Backend Engineer with FastAPI and PostgreSQL")
+    table = document.add_table(rows=1, cols=2)
+    table.rows[0].cells[0].text = "Python"
+    table.rows[0].cells[1].text = "8 years"
+    path = tmp_path / "resume.docx"
+    document.save(path)
+
+    result = extract(path)
+    assert result.error is None
+    assert result.format == "docx"
+    assert "Senior Backend Engineer with FastAPI and PostgreSQL" in result.text
+    assert "Python | 8 years" in result.text
+
+def _pdf(lines: list[str]) -> bytes:
+    """A one-page PDF showing ``lines`` in Helvetica."""
+    text = "".join(f"({line}) Tj 0 -16 Td " for line in lines)
+    content = f"BT /F1 12 Tf 72 720 Td {text}ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+def test_pdf(tmp_path):
+    path = tmp_path / "resume.pdf"
+    path.write_bytes(_pdf(["Jane Doe", "Senior Backend Engineer"]))
+
+    result = extract(path)
+    assert result.error is None
+    assert result.format == "pdf"
+    assert result.pages == 1
+    assert "Jane Doe" in result.text
+    assert "Senior Backend Engineer" in result.text
+
+def test_rtf(tmp_path):
+    path = tmp_path / "resume.rtf"
+    path.write_bytes(
+        b"{\\rtf1\\ansi{\\fonttbl{\\f0 Arial;}}{\\info{\\author Recruiter}}"
+        b"\\f0 Jane Doe\\par Senior Backend Engineer \\endash  Caf\\'e9 Systems\\par}"
+    )
+
+    result = extract(path)
+    assert result.error is None
+    assert result.format == "rtf"
+    assert "Jane Doe\nSenior Backend Engineer – Café Systems" in result.text
+    assert "Arial" not in result.text and "Recruiter" not in result.text
+
+def test_plain_text(tmp_path):
+    path = tmp_path / "resume.txt"
+    path.write_bytes(b"\xef\xbb\xbf" + "Jane Doe\nSenior Backend Engineer in Zürich\n".encode("utf-8"))
+
+    result = extract(path)
+    assert result.error is None
+    assert result.format == "text"
+    assert result.text.startswith("Jane Doe\nSenior Backend Engineer in Zürich")
+
+def test_unsupported_binary(tmp_path):
+    path = tmp_path / "photo.bin"
+    path.write_bytes(bytes(range(256)) * 4)
+
+    result = extract(path)
+    assert result.text == ""
+    assert result.error == "Unsupported file type"
@@ -0,0 +1,18 @@
+from services.query_profiler import QueryProfile, statement_shape
+
+def test_in_lists_of_any_length_share_a_shape():
+    two = statement_shape("SELECT c.id FROM candidates c WHERE c.id IN ($1::UUID, $2::UUID)")
+    three = statement_shape("SELECT c.id FROM candidates c WHERE c.id IN ($1::UUID, $2::UUID, $3::UUID)")
+    assert two == three == "SELECT c.id FROM candidates c WHERE c.id IN (?::UUID, ...)"
+
+def test_multi_row_inserts_share_a_shape():
+    statement = "INSERT INTO t (a, b) VALUES ($1::UUID, $2::VARCHAR), ($3::UUID, $4::VARCHAR)"
+    assert statement_shape(statement) == "INSERT INTO t (a, b) VALUES (?::UUID, ?::VARCHAR), ..."
+
+def test_repeated_shapes_count_as_duplicates():
+    profile = QueryProfile()
+    for i in range(5):
+        profile.record(f"SELECT jobs.title FROM jobs WHERE jobs.id = ${i + 1}::UUID", 0.001)
+    profile.record("SELECT 1", 0.001)
+    assert profile.duplicates == 4
+    assert profile.report(6, 0.006, method="GET", path="/jobs")["shapes"][0]["count"] == 5
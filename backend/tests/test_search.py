@@ -0,0 +1,45 @@
+"""Runs against ``DATABASE_URL`` with schema.sql applied; skipped without it."""
+import asyncio
+import uuid
+import pytest
+from sqlalchemy import delete, insert
+from database import AsyncSessionLocal, engine
+from models import User, Job, Candidate
+from services.search import search_candidates
+
+async def _search_by_name(queries: list[str]) -> dict[str, list[str]]:
+    try:
+        async with engine.connect():
+            pass
+    except (OSError, ConnectionError):
+        pytest.skip("Postgres is not reachable at DATABASE_URL")
+
+    async with AsyncSessionLocal() as db:
+        user = User(email=f"search-{uuid.uuid4().hex[:12]}@example.com", password_hash="!", full_name="Search Test")
+        db.add(user)
+        await db.flush()
+        job = Job(user_id=user.id, title="Backend Engineer", description="Python APIs", skills=["python"])
+        db.add(job)
+        await db.flush()
+        await db.execute(insert(Candidate), [
+            {"job_id": job.id, "name": "Serena Williams", "email": "serena@example.com",
+             "resume_text": "Python engineer building payment APIs.", "ai_score": 70},
+            {"job_id": job.id, "name": "Tom Jones", "email": "tom@example.com",
+             "resume_text": "Go engineer running data pipelines.", "ai_score": 60},
+        ])
+        await db.commit()
+        try:
+            results = {}
+            for q in queries:
+                hits, _ = await search_candidates(db, user.id, q, [], 10)
+                results[q] = [hit["name"] for hit in hits]
+            return results
+        finally:
+            await db.execute(delete(User).where(User.id == user.id))
+            await db.commit()
+            await engine.dispose()
+
+def test_search_finds_candidates_by_name():
+    results = asyncio.run(_search_by_name(["Williams", "serena williams", "Python Williams", "serena@example.com"]))
+    for q, names in results.items():
+        assert names == ["Serena Williams"], q
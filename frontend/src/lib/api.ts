@@ -2,6 +2,9 @@ import axios from "axios";
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
 
+// Starts the final chunk of a streamed description that failed part-way.
+const STREAM_ERROR_MARKER = "\x1e";
+
 const api = axios.create({
     baseURL: API_URL,
     headers: {
@@ -55,23 +58,135 @@ export const jobsApi = {
     delete: (id: string) => api.delete(`/jobs/${id}`),
     generateDescription: (id: string) =>
         api.post(`/jobs/${id}/generate-description`),
+    getRescore: (id: string) => api.get(`/jobs/${id}/rescore`),
+    // Streams the description as it is written; abort the signal to cancel generation.
+    generateDescriptionStream: async (id: string, onChunk: (text: string) => void, signal?: AbortSignal) => {
+        const token = typeof window !== "undefined" ? localStorage.getItem("token") : null;
+        const response = await fetch(`${API_URL}/jobs/${id}/generate-description/stream`, {
+            method: "POST",
+            headers: token ? { Authorization: `Bearer ${token}` } : {},
+            signal,
+        });
+        if (!response.ok || !response.body) throw new Error(`Request failed with status ${response.status}`);
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let text = "";
+        // Set once the server reports that generation failed part-way.
+        let error: string | null = null;
+        for (;;) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            let chunk = decoder.decode(value, { stream: true });
+            if (error !== null) {
+                error += chunk;
+                continue;
+            }
+            const marker = chunk.indexOf(STREAM_ERROR_MARKER);
+            if (marker >= 0) {
+                error = chunk.slice(marker + 1);
+                chunk = chunk.slice(0, marker);
+            }
+            if (chunk) {
+                text += chunk;
+                onChunk(chunk);
+            }
+        }
+        if (error !== null) throw new Error(error.trim() || "The description could not be completed");
+        return text;
+    },
 };
 
 // Candidates API
 export const candidatesApi = {
-    getByJob: (jobId: string, status?: string, sortBy?: string) =>
+    // The next page's cursor is returned in the X-Next-Cursor response header.
+    // One page per call: 50 candidates unless `limit` is given (max 200).
+    // Pass the X-Next-Cursor response header back as `cursor` for the next page.
+    getByJob: (jobId: string, status?: string, sortBy?: string, cursor?: string, limit?: number) =>
         api.get(`/candidates/job/${jobId}`, {
-            params: { status_filter: status, sort_by: sortBy },
+            params: { status_filter: status, sort_by: sortBy, cursor, limit },
         }),
     getOne: (id: string) => api.get(`/candidates/${id}`),
+    search: (q?: string, skills?: string[], cursor?: string) =>
+        api.get("/candidates/search", {
+            params: { q, skills, cursor },
+            paramsSerializer: { indexes: null },
+        }),
     upload: (jobId: string, formData: FormData) =>
         api.post(`/candidates/job/${jobId}/upload`, formData, {
             headers: { "Content-Type": "multipart/form-data" },
         }),
+    bulkUpload: (jobId: string, formData: FormData) =>
+        api.post(`/candidates/job/${jobId}/bulk-upload`, formData, {
+            headers: { "Content-Type": "multipart/form-data" },
+        }),
+    getBatch: (batchId: string) => api.get(`/candidates/batches/${batchId}`),
+    importCandidates: (jobId: string, formData: FormData, analyze = true) =>
+        api.post(`/candidates/job/${jobId}/import`, formData, {
+            headers: { "Content-Type": "multipart/form-data" },
+            params: { analyze },
+        }),
+    getImport: (importId: string) => api.get(`/candidates/imports/${importId}`),
+    export: (jobId: string, params?: {
+        format?: 'csv' | 'ndjson';
+        columns?: string[];
+        status_filter?: string;
+        sort_by?: string;
+    }) =>
+        api.get(`/candidates/job/${jobId}/export`, {
+            params: { ...params, columns: params?.columns?.join(',') },
+            responseType: 'blob',
+        }),
     updateStatus: (id: string, status: string) =>
         api.put(`/candidates/${id}/status`, { status }),
-    reanalyze: (id: string) => api.post(`/candidates/${id}/reanalyze`),
+    bulkUpdateStatus: (data: {
+        status: string;
+        candidate_ids?: string[];
+        job_id?: string;
+        current_status?: string;
+        min_score?: number;
+        max_score?: number;
+        send_emails?: boolean;
+    }) => api.post('/candidates/bulk-status', data),
+    reanalyze: (id: string, bypassCache?: boolean) =>
+        api.post(`/candidates/${id}/reanalyze`, null, {
+            params: { bypass_cache: bypassCache },
+        }),
     delete: (id: string) => api.delete(`/candidates/${id}`),
 };
 
+// Dashboard API
+export const dashboardApi = {
+    stats: (days?: number) => api.get("/dashboard/stats", { params: { days } }),
+};
+
+// Live progress (Server-Sent Events). EventSource cannot send headers, so the
+// token is passed as a query parameter. Returns a function that closes the stream.
+export type ProgressHandlers = {
+    candidate?: (data: any) => void;
+    batch?: (data: any) => void;
+    rescore?: (data: any) => void;
+};
+
+const subscribe = (path: string, handlers: ProgressHandlers) => {
+    const token = typeof window !== "undefined" ? localStorage.getItem("token") : null;
+    const source = new EventSource(`${API_URL}${path}?token=${encodeURIComponent(token || "")}`);
+    (Object.keys(handlers) as (keyof ProgressHandlers)[]).forEach((event) => {
+        source.addEventListener(event, (e) => handlers[event]?.(JSON.parse((e as MessageEvent).data)));
+    });
+    if (path.startsWith("/events/batches/")) {
+        // The server ends batch streams when the batch completes; don't reconnect.
+        source.addEventListener("batch", (e) => {
+            if (JSON.parse((e as MessageEvent).data).status === "completed") source.close();
+        });
+    }
+    return () => source.close();
+};
+
+export const eventsApi = {
+    subscribeToJob: (jobId: string, handlers: ProgressHandlers) =>
+        subscribe(`/events/jobs/${jobId}`, handlers),
+    subscribeToBatch: (batchId: string, handlers: ProgressHandlers) =>
+        subscribe(`/events/batches/${batchId}`, handlers),
+};
+
 export default api;